@@ -0,0 +1,102 @@
+"""
+Record benchmark results as json and fail any benchmark which regresses against a stored baseline.
+
+Results are machine-specific, so no baseline is committed: save one with `--benchmark-save-baseline` before making
+changes, then re-run the benchmarks to compare.
+"""
+
+from __future__ import annotations
+
+import json
+import platform
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+pytest_plugins = ["pytester", "pytest_ipynb2._pytester_helpers"]
+
+RESULTS = Path(__file__).parent / ".results" / "results.json"
+BASELINE = Path(__file__).parent / ".results" / "baseline.json"
+TOLERANCE = {"seconds": 0.005, "bytes": 1024 * 1024}
+"""Absolute differences, by unit, which never count as a regression, to avoid failing on noise in tiny results."""
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """Add options for where to store results and how to compare them."""
+    group = parser.getgroup("benchmarks")
+    group.addoption("--benchmark-json", type=Path, default=RESULTS, help="write results to this file.")
+    group.addoption("--benchmark-baseline", type=Path, default=BASELINE, help="compare results to this file.")
+    group.addoption(
+        "--benchmark-threshold",
+        type=float,
+        default=1.5,
+        help="fail if a result is more than this factor worse than the baseline. Default: %(default)s",
+    )
+    group.addoption(
+        "--benchmark-save-baseline",
+        action="store_true",
+        default=False,
+        help="store the results as the new baseline instead of comparing to the existing one.",
+    )
+
+
+class Benchmarks:
+    """Results of all benchmarks in the session, as `{benchmark: {metric_unit: value}}`."""
+
+    def __init__(self, config: pytest.Config) -> None:
+        """Load the baseline, if there is one."""
+        self.config = config
+        self.results: dict[str, dict[str, float]] = {}
+        baselinefile: Path = config.getoption("benchmark_baseline")
+        self.baseline: dict[str, dict[str, float]] = (
+            json.loads(baselinefile.read_text())["results"] if baselinefile.exists() else {}
+        )
+        self.threshold: float = config.getoption("benchmark_threshold")
+
+    def record(self, benchmark: str, **metrics: float) -> None:
+        """Record the results of `benchmark` and fail if any of them regressed. Metric names end with their unit."""
+        __tracebackhide__ = True
+        self.results[benchmark] = metrics
+        if self.config.getoption("benchmark_save_baseline"):
+            return
+        baseline = self.baseline.get(benchmark, {})
+        regressions = [
+            f"{metric}: {value:.6g} (baseline: {baseline[metric]:.6g})"
+            for metric, value in metrics.items()
+            if metric in baseline
+            and value > baseline[metric] * self.threshold
+            and value - baseline[metric] > TOLERANCE[metric.rsplit("_", 1)[-1]]
+        ]
+        if regressions:
+            pytest.fail(f"{benchmark} regressed by more than x{self.threshold}:\n" + "\n".join(regressions))
+
+    def save(self) -> None:
+        """Write the results, and update the baseline if `--benchmark-save-baseline`."""
+        results = {
+            "python": sys.version,
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "results": self.results,
+        }
+        self._write(self.config.getoption("benchmark_json"), results)
+        if self.config.getoption("benchmark_save_baseline"):
+            results["results"] = {**self.baseline, **self.results}
+            self._write(self.config.getoption("benchmark_baseline"), results)
+
+    @staticmethod
+    def _write(path: Path, results: dict) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(results, indent=2) + "\n")
+
+
+@pytest.fixture(scope="session")
+def benchmarks(pytestconfig: pytest.Config) -> Generator[Benchmarks, None, None]:
+    """Record results with `benchmarks.record()`, they are saved at the end of the session."""
+    results = Benchmarks(pytestconfig)
+    yield results
+    results.save()
@@ -0,0 +1,136 @@
+"""
+Benchmarks of parsing & collecting generated notebooks, varying one axis at a time from a default notebook.
+
+Run with `pytest benchmarks`, see `conftest.py` for options.
+"""
+
+import time
+import tracemalloc
+
+import pytest
+
+from pytest_ipynb2._parser import Notebook
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic, synthetic_notebook
+from pytest_ipynb2.plugin import Cell
+
+REPEATS = 3
+"""Parsing is repeated and the fastest time recorded."""
+
+DEFAULT = {"cells": 40, "testcells": 4, "cellsize": 10, "outputsize": 0, "magicdensity": 0.0}
+
+AXES = {
+    "cells": [200, 1000],
+    "testcells": [10, 40],
+    "cellsize": [100, 500],
+    "outputsize": [10_000, 1_000_000],
+    "magicdensity": [0.1, 0.5],
+}
+
+CASES = [
+    pytest.param(ExampleDirSpec(notebooks={"synthetic": synthetic_notebook(**DEFAULT)}), DEFAULT, id="default"),
+    *(
+        pytest.param(
+            ExampleDirSpec(notebooks={"synthetic": synthetic_notebook(**{**DEFAULT, axis: value})}),
+            {**DEFAULT, axis: value},
+            id=f"{axis}-{value}",
+        )
+        for axis, values in AXES.items()
+        for value in values
+    ),
+]
+
+
+@pytest.mark.parametrize(["example_dir", "params"], CASES, indirect=["example_dir"])
+def test_parse(example_dir: ExampleDir, params: dict, benchmarks, request: pytest.FixtureRequest):
+    path = example_dir.path / "synthetic.ipynb"
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        parsed = Notebook(path)
+        timings.append(time.perf_counter() - start)
+    assert len(list(parsed.muggled_testcells.ids())) == params["testcells"]
+    benchmarks.record(request.node.name, parse_seconds=min(timings))
+
+
+@pytest.mark.parametrize(["example_dir", "params"], CASES, indirect=["example_dir"])
+def test_collect(
+    example_dir: ExampleDir,
+    params: dict,
+    benchmarks,
+    request: pytest.FixtureRequest,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    getobj = Cell._getobj  # noqa: SLF001
+    getobj_seconds = []
+
+    def timed_getobj(self: Cell):
+        start = time.perf_counter()
+        try:
+            return getobj(self)
+        finally:
+            getobj_seconds.append(time.perf_counter() - start)
+
+    monkeypatch.setattr(Cell, "_getobj", timed_getobj)
+    # The cached example dir may belong to an earlier test, so is not the current directory
+    args = [str(example_dir.path), "-p", "no:cacheprovider"]
+
+    start = time.perf_counter()
+    items, _ = example_dir.pytester.inline_genitems(*args)
+    collect_seconds = time.perf_counter() - start
+    assert len(items) == params["testcells"]
+
+    # Measured separately, as tracing memory allocations slows everything down
+    tracemalloc.start()
+    try:
+        example_dir.pytester.inline_genitems(*args)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    benchmarks.record(
+        request.node.name,
+        collect_seconds=collect_seconds,
+        getobj_seconds=sum(getobj_seconds[: len(items)]),
+        peak_bytes=peak_bytes,
+    )
+
+
+PARAMETRIZED = 10_000
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        pytest.param(
+            ExampleDirSpec(
+                notebooks={
+                    "parametrized": [
+                        "import pytest",
+                        add_ipytest_magic(
+                            f"@pytest.mark.parametrize('n', range({PARAMETRIZED}))\ndef test_n(n):\n    assert n >= 0",
+                        ),
+                    ],
+                },
+            ),
+            id=f"{PARAMETRIZED}",
+        ),
+    ],
+    indirect=True,
+)
+def test_collect_parametrized(example_dir: ExampleDir, benchmarks, request: pytest.FixtureRequest):
+    args = [str(example_dir.path), "-p", "no:cacheprovider"]
+
+    start = time.perf_counter()
+    items, _ = example_dir.pytester.inline_genitems(*args)
+    collect_seconds = time.perf_counter() - start
+    assert len(items) == PARAMETRIZED
+    assert len({type(item) for item in items}) == 1
+
+    tracemalloc.start()
+    try:
+        example_dir.pytester.inline_genitems(*args)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    benchmarks.record(request.node.name, collect_seconds=collect_seconds, peak_bytes=peak_bytes)
@@ -0,0 +1,163 @@
+"""Capture output from notebook cells in bounded buffers."""
+
+from __future__ import annotations
+
+import io
+import sys
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from typing import Any, Final, TextIO
+
+DEFAULT_LIMIT: Final[int] = 10_000
+"""Default number of characters to keep from each of stdout and stderr per cell."""
+
+
+class RingBuffer(io.TextIOBase):
+    r"""
+    A text stream which only keeps the last `limit` characters written to it.
+
+    Examples:
+        >>> buffer = RingBuffer(limit=10)
+        >>> print("Loading", "." * 20, "done", file=buffer)
+        >>> buffer.getvalue()
+        '[... 24 characters truncated ...]\n.... done\n'
+    """
+
+    def __init__(self, limit: int) -> None:
+        super().__init__()
+        self.limit = limit
+        self._chunks: deque[str] = deque()
+        self._length = 0
+        self.truncated = 0
+        """Number of characters discarded so far."""
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self._chunks.append(text)
+        self._length += len(text)
+        while self._length - len(self._chunks[0]) >= self.limit:
+            self._discard(len(self._chunks.popleft()))
+        if self._length > self.limit:
+            excess = self._length - self.limit
+            self._chunks[0] = self._chunks[0][excess:]
+            self._discard(excess)
+        return len(text)
+
+    def _discard(self, length: int) -> None:
+        self._length -= length
+        self.truncated += length
+
+    def getvalue(self) -> str:
+        """Return the retained output, prefixed by a note if anything was discarded."""
+        retained = "".join(self._chunks)
+        if self.truncated:
+            return f"[... {self.truncated} characters truncated ...]\n{retained}"
+        return retained
+
+
+class CapturedOutput:
+    """Bounded stdout and stderr of a cell."""
+
+    def __init__(self, limit: int) -> None:
+        self.stdout = RingBuffer(limit)
+        self.stderr = RingBuffer(limit)
+
+    def sections(self, cellname: str) -> list[tuple[str, str]]:
+        """Report sections for any captured output, in the format used by `pytest.CollectReport.sections`."""
+        outputs = (("stdout", self.stdout.getvalue()), ("stderr", self.stderr.getvalue()))
+        return [(f"Captured {stream} {cellname}", output) for stream, output in outputs if output]
+
+
+@contextmanager
+def capture(limit: int) -> Generator[CapturedOutput | None, None, None]:
+    """
+    Redirect `sys.stdout` and `sys.stderr` to bounded buffers. Capture nothing if `limit` is 0.
+
+    Only output from the current thread is captured, so that cells executing concurrently in several threads each
+    capture their own output.
+    """
+    if not limit:
+        yield None
+        return
+    captured = CapturedOutput(limit)
+    with _ROUTER.route(captured):
+        yield captured
+
+
+class _ThreadStream(io.TextIOBase):
+    """Stands in for `sys.stdout` or `sys.stderr`: writes to the current thread's buffer, if any, else `original`."""
+
+    def __init__(self, original: TextIO, buffers: threading.local, name: str) -> None:
+        super().__init__()
+        self.original = original
+        self._buffers = buffers
+        self._name = name
+
+    def _target(self) -> TextIO:
+        captured: CapturedOutput | None = getattr(self._buffers, "captured", None)
+        if captured is None:
+            return self.original
+        return getattr(captured, self._name)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.original, name)
+
+
+class _Router:
+    """
+    Installs `_ThreadStream`s as `sys.stdout` and `sys.stderr` while any thread is capturing output.
+
+    pytest's own capturing replaces `sys.stdout` and `sys.stderr` in the main thread around each test, independently of
+    the threads building modules. So the streams are only put back once the last thread stops capturing if they are
+    still the ones installed here, and `_ThreadStream.original` is then exactly what pytest last installed. If pytest
+    replaced them meanwhile they are left alone, and they are installed again when the next thread starts capturing.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._users = 0
+        self._buffers = threading.local()
+
+    def _installed(self, stream: TextIO) -> bool:
+        return isinstance(stream, _ThreadStream) and stream._buffers is self._buffers  # noqa: SLF001
+
+    @contextmanager
+    def route(self, captured: CapturedOutput) -> Generator[None, None, None]:
+        previous = getattr(self._buffers, "captured", None)
+        self._buffers.captured = captured
+        with self._lock:
+            self._users += 1
+            if not self._installed(sys.stdout):
+                sys.stdout = _ThreadStream(sys.stdout, self._buffers, "stdout")
+            if not self._installed(sys.stderr):
+                sys.stderr = _ThreadStream(sys.stderr, self._buffers, "stderr")
+        try:
+            yield
+        finally:
+            self._buffers.captured = previous
+            with self._lock:
+                self._users -= 1
+                if self._users == 0:
+                    if self._installed(sys.stdout):
+                        sys.stdout = sys.stdout.original
+                    if self._installed(sys.stderr):
+                        sys.stderr = sys.stderr.original
+
+
+_ROUTER = _Router()
@@ -3,7 +3,7 @@ from __future__ import annotations
 import sys
 import types
 from contextlib import suppress
-from functools import cached_property
+from functools import cache, cached_property
 from pathlib import Path
 from typing import TYPE_CHECKING
 
@@ -120,11 +120,22 @@ class CellPath(Path):
             """Rebless children to include our overrides from the Mixin."""
             # TODO(MusicalNinjaDad): #22 Handle Tests grouped in Class
             for item in super().collect():  # pytype: disable=attribute-error
-                item_type = type(item)
-                type_with_mixin = types.new_class(item_type.__name__, (CellPath.PytestItemMixin, item_type))
-                item.__class__ = type_with_mixin
+                item.__class__ = CellPath.PytestItemMixin.with_mixin(type(item))
                 yield item
 
+        @staticmethod
+        @cache
+        def with_mixin(item_type: type) -> type:
+            """
+            A subclass of `item_type` including the Mixin, created once per `item_type`.
+
+            Sharing one class between all items of the same type avoids creating thousands of classes for thousands of
+            parametrized tests.
+            """
+            if issubclass(item_type, CellPath.PytestItemMixin):
+                return item_type
+            return types.new_class(item_type.__name__, (CellPath.PytestItemMixin, item_type))
+
     @staticmethod
     def patch_pytest_absolutepath() -> dict[tuple[ModuleType, str], FunctionType]:
         """Patch _pytest.pathlib functions."""
@@ -0,0 +1,87 @@
+"""
+Importable names for cell modules, so that objects defined in notebook cells can be pickled.
+
+Each cell module is registered in `sys.modules` as `pytest_ipynb2._cells.<name>` while its tests run. Pickle stores
+functions and classes by module name, so they can be sent to a process pool: forked children inherit `sys.modules`;
+spawned children import this module while unpickling, which installs `CellModuleFinder` to rebuild the cell module
+from the notebook.
+"""
+
+from __future__ import annotations
+
+import base64
+import importlib.abc
+import importlib.util
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from ._cellpath import CELL_PREFIX
+from ._display import headless
+from ._parser import Notebook
+
+if TYPE_CHECKING:
+    from importlib.machinery import ModuleSpec
+    from types import ModuleType
+    from typing import Final
+
+__path__: list[str] = []
+"""Makes this module a package, so that `pytest_ipynb2._cells.<name>` can be imported via `CellModuleFinder`."""
+
+PACKAGE: Final[str] = __name__
+
+
+def modulename(notebook: Path, cellid: int) -> str:
+    """
+    The importable name of the module for the test cell `cellid` in `notebook`.
+
+    The absolute path of the notebook is encoded in the name, so that any process can rebuild the module.
+    """
+    encoded = base64.b32encode(str(notebook.absolute()).encode()).decode().rstrip("=").lower()
+    return f"{PACKAGE}.{CELL_PREFIX.lower()}{cellid}_{encoded}"
+
+
+def _decode(name: str) -> tuple[Path, int]:
+    cell, encoded = name.removeprefix(f"{PACKAGE}.{CELL_PREFIX.lower()}").split("_", 1)
+    padded = encoded.upper() + "=" * (-len(encoded) % 8)
+    return Path(base64.b32decode(padded).decode()), int(cell)
+
+
+class CellModuleFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """
+    Rebuild a cell module which is not in `sys.modules`, e.g. in a spawned child process.
+
+    All code cells above the test cell, and the test cell, are executed headless - as in the parent, but without
+    checkpoints, timeouts, output capture or assertion rewriting, and skipping cells with the default `SKIPTAGS`.
+    """
+
+    def find_spec(
+        self,
+        fullname: str,
+        path: object = None,  # noqa: ARG002
+        target: ModuleType | None = None,  # noqa: ARG002
+    ) -> ModuleSpec | None:
+        if not fullname.startswith(f"{PACKAGE}."):
+            return None
+        return importlib.util.spec_from_loader(fullname, self)
+
+    def create_module(self, spec: ModuleSpec) -> None:  # noqa: ARG002
+        return None
+
+    def exec_module(self, module: ModuleType) -> None:
+        notebook, cellid = _decode(module.__name__)
+        parsed = Notebook(notebook)
+        sources = [
+            (codecellid, parsed.muggled_codecells[codecellid])
+            for codecellid in parsed.muggled_codecells.ids()
+            if codecellid < cellid
+        ]
+        sources.append((cellid, parsed.muggled_testcells[cellid]))
+        with headless(module.__dict__):
+            for codecellid, source in sources:
+                filename = f"{notebook}[{CELL_PREFIX}{codecellid}]"
+                exec(compile(str(source), filename=filename, mode="exec"), module.__dict__)  # noqa: S102
+
+
+if not any(isinstance(finder, CellModuleFinder) for finder in sys.meta_path):
+    sys.meta_path.append(CellModuleFinder())
@@ -0,0 +1,68 @@
+"""Select only those test cells which have changed since they last passed."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Final
+
+    import pytest
+
+CACHE_KEY: Final[str] = "ipynb2/passedcells"
+
+
+class ChangedCells:
+    """
+    Plugin to deselect test cells whose fingerprint is unchanged since all their tests last passed.
+
+    A cell's fingerprint covers its own source and the sources of all code cells executed before it, see
+    `_parser.Notebook.fingerprint`. The fingerprints of cells where every test passed are stored in the pytest cache.
+    """
+
+    def __init__(self, config: pytest.Config) -> None:
+        self.config = config
+        self.passed: dict[str, str] = config.cache.get(CACHE_KEY, {})
+        """Fingerprints of cells which passed in a previous run, indexed by nodeid."""
+        self.fingerprints: dict[str, str] = {}
+        """Fingerprints of cells collected in this run, indexed by nodeid."""
+        self.pending: dict[str, set[str]] = defaultdict(set)
+        """Nodeids of items which have not yet passed, indexed by the nodeid of their cell."""
+        self.failed: set[str] = set()
+        """Nodeids of cells with at least one failure or error."""
+
+    def unchanged(self, nodeid: str, fingerprint: str) -> bool:
+        """Did the cell pass last time with the same fingerprint?"""
+        return self.passed.get(nodeid) == fingerprint
+
+    def collected(self, nodeid: str, fingerprint: str) -> None:
+        """Record the fingerprint of a cell which will be run."""
+        self.fingerprints[nodeid] = fingerprint
+
+    def pytest_itemcollected(self, item: pytest.Item) -> None:
+        cellnodeid = item.nodeid.split("::")[0]
+        if cellnodeid in self.fingerprints:
+            self.pending[cellnodeid].add(item.nodeid)
+
+    def pytest_collectreport(self, report: pytest.CollectReport) -> None:
+        if report.failed and report.nodeid in self.fingerprints:
+            self.failed.add(report.nodeid)
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        cellnodeid = report.nodeid.split("::")[0]
+        if cellnodeid not in self.fingerprints:
+            return
+        if report.failed:
+            self.failed.add(cellnodeid)
+        elif report.when == "call" or report.skipped:
+            self.pending[cellnodeid].discard(report.nodeid)
+
+    def pytest_sessionfinish(self) -> None:
+        """Store fingerprints of fully passed cells, forget those of failed cells, leave all others unchanged."""
+        for nodeid, fingerprint in self.fingerprints.items():
+            if nodeid in self.failed:
+                self.passed.pop(nodeid, None)
+            elif not self.pending[nodeid]:
+                self.passed[nodeid] = fingerprint
+        self.config.cache.set(CACHE_KEY, self.passed)
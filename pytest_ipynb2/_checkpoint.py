@@ -0,0 +1,185 @@
+"""Save and restore the namespace of a notebook after expensive, deterministic setup cells."""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+import io
+import os
+import pickle
+import sys
+import threading
+from contextlib import suppress
+from types import FunctionType, ModuleType
+from typing import TYPE_CHECKING
+
+from ._cells import PACKAGE as CELLS
+from ._snapshots import rebound
+
+try:
+    import cloudpickle
+except ImportError:  # optional, to pickle functions defined in notebook cells
+    cloudpickle = None
+else:
+    # Rather than by reference to a cell module, which executes the notebook again when imported elsewhere
+    cloudpickle.register_pickle_by_value(sys.modules[CELLS])
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import Any, Final
+
+CACHE_DIR: Final[str] = "ipynb2-checkpoints"
+"""Directory inside the pytest cache in which checkpoints are stored."""
+
+
+class _ImportedModule:
+    """Stand-in for a module in a pickled namespace, which is imported again on restore."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+
+class _Pickler(pickle.Pickler):
+    """
+    Refuses to pickle functions and classes defined in notebook cells. Used if cloudpickle is not installed.
+
+    They would be pickled by reference to their cell module, which is rebuilt by executing the notebook's cells when
+    it is unpickled in another process, defeating the point of a checkpoint.
+    """
+
+    def reducer_override(self, obj: object) -> object:
+        if _celldefined(obj):
+            msg = f"{obj!r} is defined in a notebook cell"
+            raise pickle.PicklingError(msg)
+        return NotImplemented
+
+
+if cloudpickle is not None:
+
+    class _CloudPickler(cloudpickle.Pickler):
+        """
+        Pickles functions defined in notebook cells by value, but still refuses classes defined in notebook cells.
+
+        Unpickling a class in the process which pickled it returns the original class, so its methods could not be
+        rebound to the namespace being restored, see `Checkpoints.load`, without changing the original.
+        """
+
+        def reducer_override(self, obj: object) -> object:
+            if isinstance(obj, type) and _celldefined(obj):
+                msg = f"{obj!r} is defined in a notebook cell"
+                raise pickle.PicklingError(msg)
+            return super().reducer_override(obj)
+
+
+def _celldefined(obj: object) -> bool:
+    return isinstance(obj, (type, FunctionType)) and getattr(obj, "__module__", "").startswith(f"{CELLS}.")
+
+
+def _dumps(value: object) -> bytes:
+    buffer = io.BytesIO()
+    (_Pickler if cloudpickle is None else _CloudPickler)(buffer).dump(value)
+    return buffer.getvalue()
+
+
+class Checkpoints:
+    """
+    Checkpoints of the namespace after setup cells, stored as pickles.
+
+    A checkpoint's filename contains a hash of the notebook and cell, so that only the checkpoint for the latest
+    version of each cell is kept, and the cell's fingerprint, so that it is only restored if neither it nor any of the
+    code cells above it have changed, and with the same version of python.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+
+    def path(self, notebook: str, cellid: int, fingerprint: str) -> Path:
+        """The file for a checkpoint after cell `cellid` of `notebook`, with its `fingerprint`."""
+        cell = hashlib.sha256(f"{notebook}[{cellid}]".encode()).hexdigest()[:16]
+        return self.directory / f"{cell}-{fingerprint}-py{sys.version_info.major}{sys.version_info.minor}.pickle"
+
+    def save(self, path: Path, namespace: dict[str, Any]) -> list[str]:
+        """
+        Pickle all non-dunder names in `namespace` to `path`, replacing any older checkpoints of the same cell.
+
+        Returns:
+            The names which could not be pickled. No checkpoint is saved if there are any.
+        """
+        pickled, unpicklable = self.dumps(namespace)
+        if not unpicklable:
+            self.write(path, pickled)
+        return unpicklable
+
+    @staticmethod
+    def dumps(namespace: dict[str, Any], *, partial: bool = False) -> tuple[bytes | None, list[str]]:
+        """
+        Pickle all non-dunder names in `namespace`.
+
+        Returns:
+            The pickle and the names which could not be pickled. If there are any, the pickle is `None`, unless
+            `partial`, when it contains all other names.
+        """
+        contents = {
+            name: _ImportedModule(value.__name__) if isinstance(value, ModuleType) else value
+            for name, value in namespace.items()
+            if not (name.startswith("__") and name.endswith("__"))
+        }
+        with suppress(Exception):  # anything can happen while pickling arbitrary objects
+            return _dumps(contents), []
+        # if every value can be pickled on its own, it is their combination which cannot
+        unpicklable = sorted(name for name, value in contents.items() if not _picklable(value)) or sorted(contents)
+        if partial:
+            with suppress(Exception):
+                return _dumps({name: value for name, value in contents.items() if name not in unpicklable}), unpicklable
+        return None, unpicklable
+
+    def write(self, path: Path, pickled: bytes) -> None:
+        """Write a pickled namespace to `path`, replacing any older checkpoints of the same cell."""
+        for older in self.directory.glob(f"{path.name.split('-')[0]}-*.pickle"):
+            older.unlink(missing_ok=True)
+        # atomic for concurrent pytest-xdist workers and threads
+        partial = path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.partial")
+        partial.write_bytes(pickled)
+        partial.replace(path)
+
+    @classmethod
+    def restore(cls, path: Path, namespace: dict[str, Any]) -> bool:
+        """Update `namespace` from the checkpoint at `path`. Returns `False` if there is no usable checkpoint."""
+        if (contents := cls.load(path, namespace)) is None:
+            return False
+        namespace.update(contents)
+        return True
+
+    @staticmethod
+    def load(path: Path, namespace: dict[str, Any]) -> dict[str, Any] | None:
+        """
+        The namespace in the checkpoint at `path`, to restore into `namespace`. `None` if it is not usable.
+
+        Modules are imported again. Functions defined in notebook cells, which cloudpickle restores with their own
+        copy of the globals they use, are rebound to `namespace` so that they see later changes to it. Functions which
+        are not directly in the namespace, e.g. in a list, keep their own copy.
+        """
+        try:
+            contents = pickle.loads(path.read_bytes())  # noqa: S301 - only our own checkpoints are read
+        except FileNotFoundError:
+            return None
+        except Exception:  # noqa: BLE001 - e.g. a class in the pickle no longer exists
+            path.unlink(missing_ok=True)
+            return None
+        restored = {}
+        for name, value in contents.items():
+            if isinstance(value, _ImportedModule):
+                restored[name] = importlib.import_module(value.name)
+            elif _celldefined(value) and isinstance(value, FunctionType):
+                restored[name] = rebound(value, namespace)
+            else:
+                restored[name] = value
+        return restored
+
+
+def _picklable(value: object) -> bool:
+    try:
+        _dumps(value)
+    except Exception:  # noqa: BLE001
+        return False
+    return True
@@ -0,0 +1,103 @@
+"""
+A long-lived pytest process which keeps imports, parsed notebooks and setup cell namespaces warm between runs.
+
+Runs are forwarded to the daemon over a unix socket by `pytest-ipynb2`, see `_forward`.
+
+Each run is a fresh `pytest.main()` inside the daemon, so configuration, conftests and test modules are loaded again.
+Only third-party modules (e.g. IPython, pandas), parsed notebooks and the namespaces after each setup cell are kept.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import socketserver
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from . import _inprocess
+from ._forward import send, socketpath
+from .plugin import WarmCache
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import BinaryIO, Final
+
+    import pytest
+
+IDLE_TIMEOUT: Final[float] = 3600
+"""Seconds without any runs after which the daemon stops."""
+
+
+class _Messages(io.TextIOBase):
+    """Text stream sending everything written to it to the client as `{"out": text}` messages."""
+
+    def __init__(self, stream: BinaryIO) -> None:
+        super().__init__()
+        self.stream = stream
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        send(self.stream, {"out": text})
+        return len(text)
+
+
+class _RunHandler(socketserver.StreamRequestHandler):
+    server: Daemon
+
+    def handle(self) -> None:
+        request = json.loads(self.rfile.readline())
+        if request.get("stop"):
+            self.server.stopped = True
+            send(self.wfile, {"exit": 0})
+            return
+        exitcode = self.server.run(request["args"], Path(request["cwd"]), _Messages(self.wfile))
+        send(self.wfile, {"exit": int(exitcode)})
+
+
+class Daemon(socketserver.UnixStreamServer):
+    """Serve pytest runs, one at a time, until stopped or idle for `idle_timeout` seconds."""
+
+    def __init__(self, path: Path, idle_timeout: float = IDLE_TIMEOUT) -> None:
+        path.unlink(missing_ok=True)  # left over from a daemon which did not stop cleanly
+        super().__init__(str(path), _RunHandler)
+        path.chmod(0o600)
+        self.path = path
+        self.timeout = idle_timeout
+        self.stopped = False
+        self.warm = WarmCache()
+
+    def handle_timeout(self) -> None:
+        self.stopped = True
+
+    def serve(self) -> None:
+        try:
+            while not self.stopped:
+                self.handle_request()
+        finally:
+            self.server_close()
+            self.path.unlink(missing_ok=True)
+
+    def run(self, args: list[str], cwd: Path, output: io.TextIOBase) -> int | pytest.ExitCode:
+        """Run pytest in `cwd`, sending the output to the client."""
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            return _inprocess.run(args, [self.warm], cwd)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Entry point for `pytest-ipynb2 serve`."""
+    parser = argparse.ArgumentParser(prog="pytest-ipynb2 serve")
+    parser.add_argument("--socket", type=Path, default=None, help="default: based on the current directory")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT, help="seconds, default: %(default)s")
+    options = parser.parse_args(argv)
+    Daemon(options.socket or socketpath(Path.cwd()), options.idle_timeout).serve()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Execute notebook cells without rendering any rich output."""
+
+from __future__ import annotations
+
+import builtins
+import os
+import sys
+import threading
+import warnings
+from contextlib import contextmanager, suppress
+from typing import TYPE_CHECKING
+
+import IPython.display
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from typing import Any, Final
+
+MPL_BACKEND: Final[str] = "agg"
+"""Non-interactive matplotlib backend to use while executing cells."""
+
+
+def nodisplay(*objs: Any, **kwargs: Any) -> None:
+    """Replacement for `IPython.display.display` which renders nothing."""
+
+
+def _display_modules() -> list[Any]:
+    """Modules which provide `display`, whichever version of IPython is installed."""
+    modules = [IPython.display]
+    if (display_functions := sys.modules.get("IPython.core.display_functions")) is not None:
+        modules.append(display_functions)
+    return modules
+
+
+def _provide_display(namespace: dict[str, Any], display: Any) -> None:
+    """Add `display` to the builtins used by `namespace`, as it would be in a kernel."""
+    namespace_builtins = namespace.setdefault("__builtins__", dict(vars(builtins)))
+    if isinstance(namespace_builtins, dict):
+        namespace_builtins.setdefault("display", display)
+
+
+@contextmanager
+def headless(namespace: dict[str, Any], *, keep_display: bool = False) -> Generator[None, None, None]:
+    """
+    Execute cells in `namespace` as if there were a kernel, but without rendering any output.
+
+    - `display` is a builtin, available without an import, as it would be in a kernel.
+    - `display` and `IPython.display.display` do nothing.
+    - matplotlib uses the non-interactive "agg" backend unless a backend was already chosen, either via `MPLBACKEND`
+        or by importing `matplotlib.pyplot`. (`%matplotlib ...` magics are commented out of the cells.) The previous
+        backend is restored once the cells have been executed.
+
+    Arguments:
+        namespace: the namespace in which the cells are executed.
+        keep_display: only provide `display`, don't replace it or the matplotlib backend.
+    """
+    if keep_display:
+        _provide_display(namespace, IPython.display.display)
+        yield
+        return
+
+    _provide_display(namespace, nodisplay)
+    _PATCHES.acquire()
+    try:
+        yield
+    finally:
+        _PATCHES.release()
+
+
+class _Patches:
+    """
+    The process-wide replacements made by `headless`, shared by cells executing concurrently in several threads.
+
+    They are applied when the first cell starts executing and reverted when the last cell finishes.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._users = 0
+        self._originals: list[tuple[Any, Any]] = []
+        self._env_backend = False
+        self._mpl_backend: Any = None
+        """The unresolved backend in `matplotlib.rcParams`, if it was replaced."""
+        self._filter: tuple[Any, ...] | None = None
+        """The entry added to `warnings.filters`, which is removed again rather than restoring all filters."""
+
+    def acquire(self) -> None:
+        with self._lock:
+            self._users += 1
+            if self._users == 1:
+                self._apply()
+
+    def release(self) -> None:
+        with self._lock:
+            self._users -= 1
+            if self._users == 0:
+                self._revert()
+
+    def _apply(self) -> None:
+        self._originals = [(module, module.display) for module in _display_modules()]
+        self._env_backend = "MPLBACKEND" not in os.environ and "matplotlib" not in sys.modules
+        if self._env_backend:
+            os.environ["MPLBACKEND"] = MPL_BACKEND
+        elif "MPLBACKEND" not in os.environ and "matplotlib.pyplot" not in sys.modules:
+            matplotlib = sys.modules["matplotlib"]
+            # resolving an automatic backend, e.g. via `get_backend()`, would import `matplotlib.pyplot`
+            self._mpl_backend = dict.__getitem__(matplotlib.rcParams, "backend")
+            matplotlib.use(MPL_BACKEND)
+        for module, _ in self._originals:
+            module.display = nodisplay
+        # Not `warnings.catch_warnings()`, which would be exited by whichever thread finishes last, restoring the
+        # filters as they were when the first cell started and discarding changes made by any thread in the meantime
+        warnings.filterwarnings("ignore", ".*non-interactive, and thus cannot be shown", UserWarning)
+        self._filter = warnings.filters[0]
+
+    def _revert(self) -> None:
+        if self._filter is not None:
+            # "ignore" is never cached in the warning registries, so they do not need invalidating
+            with suppress(ValueError):  # a cell already reset the filters
+                warnings.filters.remove(self._filter)
+            self._filter = None
+        for module, original in self._originals:
+            module.display = original
+        self._originals = []
+        if self._env_backend:
+            del os.environ["MPLBACKEND"]
+            if "matplotlib" in sys.modules:  # a cell imported matplotlib, which took its backend from the variable
+                # `rcParamsOrig` is saved before matplotlib reads `MPLBACKEND`
+                self._mpl_backend = dict.__getitem__(sys.modules["matplotlib"].rcParamsOrig, "backend")
+        if self._mpl_backend is not None:
+            matplotlib = sys.modules["matplotlib"]
+            if isinstance(self._mpl_backend, str):
+                matplotlib.use(self._mpl_backend, force=False)  # also switches pyplot, if a cell imported it
+            else:  # matplotlib's sentinel for choosing a backend automatically
+                matplotlib.rcParams["backend"] = self._mpl_backend
+            self._mpl_backend = None
+
+
+_PATCHES = _Patches()
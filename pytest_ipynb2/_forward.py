@@ -0,0 +1,121 @@
+"""
+Forward pytest runs to a warm daemon, see `_daemon`.
+
+Only uses the standard library, so that forwarding a run does not pay for importing pytest, IPython or nbformat.
+
+- `pytest-ipynb2 [pytest args]` forwards a run to the daemon, starting it first if needed, and streams the output.
+- `pytest-ipynb2 serve` starts the daemon in the foreground.
+- `pytest-ipynb2 stop` stops the daemon.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import Any, BinaryIO, Final
+
+SOCKET_ENV: Final[str] = "PYTEST_IPYNB2_SOCKET"
+"""Environment variable to override the path of the daemon's socket."""
+STARTUP_TIMEOUT: Final[float] = 30
+"""Seconds to wait for a newly started daemon to accept connections."""
+INTERNAL_ERROR: Final[int] = 3
+"""`pytest.ExitCode.INTERNAL_ERROR`, if the daemon dies during a run."""
+
+
+def socketpath(directory: Path) -> Path:
+    """The socket of the daemon serving runs started in `directory`, one per user and directory."""
+    if env := os.environ.get(SOCKET_ENV):
+        return Path(env)
+    digest = hashlib.sha256(str(directory.resolve()).encode()).hexdigest()[:12]
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return Path(tempfile.gettempdir()) / f"pytest-ipynb2-{uid}-{digest}.sock"
+
+
+def send(stream: BinaryIO, message: dict[str, Any]) -> None:
+    """Send a message as a line of json."""
+    stream.write(json.dumps(message).encode() + b"\n")
+    stream.flush()
+
+
+def _connect(path: Path) -> socket.socket | None:
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(str(path))
+    except (FileNotFoundError, ConnectionRefusedError):
+        client.close()
+        return None
+    return client
+
+
+def _start(path: Path) -> socket.socket:
+    """Start a daemon in the background and connect to it."""
+    subprocess.Popen(  # noqa: S603
+        [sys.executable, "-m", "pytest_ipynb2._daemon", "--socket", str(path)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while (client := _connect(path)) is None:
+        if time.monotonic() > deadline:
+            msg = f"pytest-ipynb2 daemon did not start listening on {path}"
+            raise TimeoutError(msg)
+        time.sleep(0.05)
+    return client
+
+
+def _request(message: dict[str, Any], client: socket.socket) -> int:
+    """Send `message`, write any output received to stdout and return the exit code."""
+    with client, client.makefile("rwb") as stream:
+        send(stream, message)
+        for line in stream:
+            response = json.loads(line)
+            if "out" in response:
+                sys.stdout.write(response["out"])
+                sys.stdout.flush()
+            if "exit" in response:
+                return response["exit"]
+    return INTERNAL_ERROR  # pragma: no cover
+
+
+def forward(args: Sequence[str], path: Path) -> int:
+    """Forward a run to the daemon at `path`, starting it if needed. Returns the exit code after writing the output."""
+    return _request({"args": list(args), "cwd": str(Path.cwd())}, _connect(path) or _start(path))
+
+
+def stop(path: Path) -> int:
+    """Stop the daemon at `path`, if it is running."""
+    if (client := _connect(path)) is None:
+        return 0
+    return _request({"stop": True}, client)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Entry point for `pytest-ipynb2`."""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not hasattr(socket, "AF_UNIX"):  # pragma: no cover - no unix sockets, so no daemon: run pytest directly
+        return subprocess.call([sys.executable, "-m", "pytest", *argv])  # noqa: S603
+    if argv[:1] == ["serve"]:
+        return subprocess.call([sys.executable, "-m", "pytest_ipynb2._daemon", *argv[1:]])  # noqa: S603
+    path = socketpath(Path.cwd())
+    if argv == ["stop"]:
+        return stop(path)
+    if sys.stdout.isatty() and not any(arg.startswith("--color") for arg in argv):
+        argv.insert(0, "--color=yes")
+    return forward(argv, path)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""Limit how many notebooks with memory-hungry setup cells are executed at once, across all pytest-xdist workers."""
+
+from __future__ import annotations
+
+import fnmatch
+import os
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+
+from ._locks import FileSemaphore
+
+if TYPE_CHECKING:
+    from contextlib import AbstractContextManager
+    from typing import Any, Final
+
+    from ._parser import Notebook
+
+WORKERINPUT_KEY: Final[str] = "ipynb2_heavy_slots"
+
+
+class HeavyNotebooks:
+    """
+    Plugin which hands out `ipynb2_heavy_concurrency` slots to heavy notebooks.
+
+    A notebook is heavy if any of its cells is tagged `HEAVYTAG`, or its path relative to the rootdir matches one of
+    the `ipynb2_heavy_notebooks` globs. Each slot is a lock file in a directory for this run, which the controller -
+    or the only process, without pytest-xdist - sends to the workers and removes at the end of the run. The directory
+    is only created once a heavy notebook is executed.
+
+    A slot is only held while the cells for one test cell are executed during collection, not until its tests have
+    finished, so this limits the memory needed to execute the cells, not the memory retained by their namespaces.
+    """
+
+    def __init__(self, config: pytest.Config) -> None:
+        concurrency = config.getini("ipynb2_heavy_concurrency")
+        try:
+            slots = int(concurrency)
+        except ValueError:
+            slots = 0
+        if slots < 1:
+            msg = f"ipynb2_heavy_concurrency must be a positive integer, not {concurrency!r}"
+            raise pytest.UsageError(msg)
+        workerinput: dict[str, Any] | None = getattr(config, "workerinput", None)
+        self.owner = workerinput is None
+        if workerinput is None:
+            directory = Path(tempfile.gettempdir()) / f"pytest-ipynb2-heavy-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        else:
+            directory = Path(workerinput[WORKERINPUT_KEY])
+        self.semaphore = FileSemaphore(directory, slots)
+        self.rootpath = config.rootpath
+        self.globs: list[str] = config.getini("ipynb2_heavy_notebooks")
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_configure_node(self, node: Any) -> None:
+        """Send the directory to a pytest-xdist worker."""
+        node.workerinput[WORKERINPUT_KEY] = str(self.semaphore.directory)
+
+    def pytest_unconfigure(self) -> None:
+        if self.owner:
+            shutil.rmtree(self.semaphore.directory, ignore_errors=True)
+
+    def isheavy(self, path: Path, notebook: Notebook) -> bool:
+        """Is the notebook at `path` tagged as heavy, or does it match `ipynb2_heavy_notebooks`?"""
+        if notebook.heavy:
+            return True
+        try:
+            relative = path.relative_to(self.rootpath).as_posix()
+        except ValueError:
+            relative = path.as_posix()
+        return any(fnmatch.fnmatch(relative, glob) for glob in self.globs)
+
+    def slot(self) -> AbstractContextManager[int]:
+        """Hold one of the slots, waiting until one is free."""
+        return self.semaphore.slot()
@@ -0,0 +1,89 @@
+"""Attribute the time spent importing modules to the notebook cells which first imported them."""
+
+from __future__ import annotations
+
+import builtins
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from typing import Any
+
+    import pytest
+
+
+@dataclass
+class CellImports:
+    """Modules first imported by a cell and the time it spent importing them."""
+
+    cellname: str
+    duration: float = 0.0
+    modules: int = 0
+    """Number of modules added to `sys.modules`, including any imported indirectly."""
+    names: list[str] = field(default_factory=list)
+    """Names used in the cell's import statements which added modules to `sys.modules`."""
+
+    def __str__(self) -> str:
+        return f"{self.duration:.2f}s {self.modules:>5} modules {self.cellname}: {', '.join(self.names)}"
+
+
+class ImportReport:
+    """
+    Plugin to attribute the time spent on imports to the notebook cells which triggered them, like `-X importtime`.
+
+    Only imports which add modules to `sys.modules` are recorded, so a module is attributed to the first cell which
+    imported it, even though setup cells are executed once for each test cell below them.
+    """
+
+    def __init__(self) -> None:
+        self.notebooks: dict[str, dict[str, CellImports]] = defaultdict(dict)
+        """Imports indexed by notebook nodeid, then cell name."""
+
+    @contextmanager
+    def attribute(self, notebook: str, cellname: str, namespace: dict[str, Any]) -> Generator[None, None, None]:
+        """Record the imports made by statements executed in `namespace`, via its `__builtins__`."""
+        namespace_builtins = namespace.setdefault("__builtins__", dict(vars(builtins)))
+        if not isinstance(namespace_builtins, dict):
+            yield
+            return
+        original = namespace_builtins["__import__"]
+
+        def timed_import(name: str, *args: Any, **kwargs: Any) -> Any:
+            before = len(sys.modules)
+            start = time.perf_counter()
+            try:
+                return original(name, *args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                if (modules := len(sys.modules) - before) > 0:
+                    imports = self.notebooks[notebook].setdefault(cellname, CellImports(cellname))
+                    imports.duration += duration
+                    imports.modules += modules
+                    imports.names.append(name)
+
+        namespace_builtins["__import__"] = timed_import
+        try:
+            yield
+        finally:
+            namespace_builtins["__import__"] = original
+
+    def pytest_terminal_summary(self, terminalreporter: pytest.TerminalReporter) -> None:
+        terminalreporter.write_sep("=", "ipynb2 imports")
+        if not self.notebooks:
+            terminalreporter.write_line("no modules imported by notebook cells")
+        totals = {
+            notebook: sum(imports.duration for imports in cells.values()) for notebook, cells in self.notebooks.items()
+        }
+        for notebook, total in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+            cells = self.notebooks[notebook]
+            modules = sum(imports.modules for imports in cells.values())
+            terminalreporter.write_line(f"{total:.2f}s {modules:>5} modules {notebook}")
+            cumulative = 0.0
+            for imports in cells.values():
+                cumulative += imports.duration
+                terminalreporter.write_line(f"    {imports} (cumulative {cumulative:.2f}s)")
@@ -0,0 +1,37 @@
+"""Run pytest repeatedly in a long-lived process."""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+
+def islocal(module: object, directory: Path) -> bool:
+    """Was the module imported from `directory`, but not a virtualenv there - i.e. is it a conftest, test or project?"""
+    if (filename := getattr(module, "__file__", None)) is None:
+        return False
+    path = Path(filename).resolve()
+    return path.is_relative_to(directory) and not path.is_relative_to(Path(sys.prefix).resolve())
+
+
+def run(args: Sequence[str], plugins: Sequence[object], cwd: Path) -> int | pytest.ExitCode:
+    """Run pytest in `cwd`, then unload any modules imported from `cwd` so that changes are seen next time."""
+    modules = set(sys.modules)
+    syspath = sys.path[:]
+    previous = Path.cwd()
+    os.chdir(cwd)
+    try:
+        return pytest.main(list(args), plugins=list(plugins))
+    finally:
+        os.chdir(previous)
+        sys.path[:] = syspath
+        for name in set(sys.modules) - modules:
+            if islocal(sys.modules[name], cwd.resolve()):
+                del sys.modules[name]
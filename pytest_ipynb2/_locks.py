@@ -0,0 +1,82 @@
+"""Locks between processes, such as pytest-xdist workers, using lock files."""
+
+from __future__ import annotations
+
+import contextlib
+import sys
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from pathlib import Path
+    from typing import BinaryIO, Final
+
+if sys.platform == "win32":  # pragma: no cover
+    import msvcrt
+
+    def _lock(file: BinaryIO, *, blocking: bool) -> bool:
+        mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+        while True:
+            try:
+                msvcrt.locking(file.fileno(), mode, 1)
+            except OSError:
+                if not blocking:
+                    return False
+                continue  # LK_LOCK only retries for 10 seconds
+            return True
+
+    def _unlock(file: BinaryIO) -> None:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock(file: BinaryIO, *, blocking: bool) -> bool:
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    def _unlock(file: BinaryIO) -> None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def filelock(path: Path) -> Generator[None, None, None]:
+    """Hold an exclusive lock on `path`, waiting until no other process holds it. The file is created if needed."""
+    with path.open("a+b") as file:
+        _lock(file, blocking=True)
+        try:
+            yield
+        finally:
+            _unlock(file)
+
+
+class FileSemaphore:
+    """Let at most `slots` processes or threads in at once, each holding the lock on one of the files in `directory`."""
+
+    POLL: Final[float] = 0.05
+    """Seconds to wait before trying all slots again, when they are all taken."""
+
+    def __init__(self, directory: Path, slots: int) -> None:
+        self.directory = directory
+        self.slots = slots
+
+    @contextlib.contextmanager
+    def slot(self) -> Generator[int, None, None]:
+        """Hold the first free slot, waiting until one is free. Yields the slot's number."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        while True:
+            for slot in range(self.slots):
+                with (self.directory / f"slot{slot}.lock").open("a+b") as file:
+                    if not _lock(file, blocking=False):
+                        continue
+                    try:
+                        yield slot
+                    finally:
+                        _unlock(file)
+                    return
+            time.sleep(self.POLL)
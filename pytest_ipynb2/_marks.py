@@ -0,0 +1,83 @@
+"""Use tags from notebook cells as pytest markers."""
+
+from __future__ import annotations
+
+import keyword
+from typing import TYPE_CHECKING
+
+from _pytest.mark.expression import Expression
+
+if TYPE_CHECKING:
+    from collections.abc import Collection, Iterable
+    from typing import Final
+
+    import pytest
+
+MAX_EVALUATIONS: Final[int] = 1024
+"""Give up trying to prove that a marker expression can never match after this many evaluations."""
+
+
+def markers_from_tags(tags: Iterable[str]) -> list[str]:
+    """The tags which are valid marker names (e.g. `slow` but not `hide-input`)."""
+    return [tag for tag in tags if tag.isidentifier() and not keyword.iskeyword(tag)]
+
+
+def register_markers(config: pytest.Config, markers: Iterable[str]) -> None:
+    """Register markers from cell tags, so that they are not reported as unknown or rejected by `--strict-markers`."""
+    registered = {line.split(":")[0].split("(")[0].strip() for line in config.getini("markers")}
+    for marker in markers:
+        if marker not in registered:
+            config.addinivalue_line("markers", f"{marker}: tag in notebook cell metadata")
+            registered.add(marker)
+
+
+class _Unknown(Exception):  # noqa: N818 - used for control flow, not an error
+    """Raised when a marker expression queries a marker which may or may not be present."""
+
+    def __init__(self, key: tuple[str, tuple]) -> None:
+        self.key = key
+
+
+def never_matches(markexpr: str, markers: Collection[str]) -> bool:
+    """
+    Can we prove that `markexpr` is `False` for every item with `markers`, whatever other markers the item has?
+
+    Items in a cell may have more markers than the cell itself (e.g. from decorators), which are only known after
+    the cell has been executed. So any marker not in `markers`, or queried with keyword arguments, may or may not be
+    present. Each combination of these unknown markers is evaluated until one matches.
+
+    Examples:
+        >>> never_matches("not slow", ["slow"])
+        True
+        >>> never_matches("slow", ["gpu"])
+        False
+        >>> never_matches("gpu and not slow", ["slow"])
+        True
+        >>> never_matches("slow or gpu", ["slow"])
+        False
+    """
+    try:
+        expression = Expression.compile(markexpr)
+    except Exception:  # noqa: BLE001 - ParseError on older versions of pytest, SyntaxError on newer
+        return False  # leave pytest to report the invalid expression
+    pending: list[dict[tuple[str, tuple], bool]] = [{}]
+    evaluations = 0
+    while pending:
+        if (evaluations := evaluations + 1) > MAX_EVALUATIONS:
+            return False
+        assumptions = pending.pop()
+
+        def matcher(name: str, /, _assumptions: dict = assumptions, **kwargs: object) -> bool:
+            if name in markers and not kwargs:
+                return True
+            key = (name, tuple(sorted(kwargs.items())))
+            if key not in _assumptions:
+                raise _Unknown(key)
+            return _assumptions[key]
+
+        try:
+            if expression.evaluate(matcher):
+                return False
+        except _Unknown as unknown:
+            pending.extend(({**assumptions, unknown.key: True}, {**assumptions, unknown.key: False}))
+    return True
@@ -0,0 +1,108 @@
+"""Account for the memory used by executing notebook cells."""
+
+from __future__ import annotations
+
+import gc
+import os
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from types import ModuleType
+    from typing import Final
+
+    import pytest
+
+TOP: Final[int] = 10
+"""Number of measurements to show in the terminal summary."""
+
+
+def rss() -> int | None:
+    """Current resident set size of this process in bytes, if available on this platform."""
+    try:
+        with open("/proc/self/statm") as statm:  # noqa: PTH123
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _mib(size: int | None) -> str:
+    return "?" if size is None else f"{size / 2**20:+.1f}MiB"
+
+
+@dataclass
+class Measurement:
+    """Memory used while executing a cell (or all cells needed for a test cell's module)."""
+
+    label: str
+    peak: int
+    """Peak additional memory traced by `tracemalloc` during execution."""
+    retained: int
+    """Additional memory traced by `tracemalloc` which was still allocated after execution."""
+    rss: int | None
+    """Change in resident set size during execution."""
+
+    def __str__(self) -> str:
+        return f"peak {_mib(self.peak)} retained {_mib(self.retained)} rss {_mib(self.rss)} {self.label}"
+
+
+class MemoryReport:
+    """Plugin to measure memory used by setup cells and test cell modules and report the top consumers."""
+
+    def __init__(self) -> None:
+        self.measurements: list[Measurement] = []
+        self.released: dict[str, weakref.ref[ModuleType]] = {}
+        """Modules of cells which have been torn down, indexed by nodeid."""
+        self._started = False
+        self._peaks: list[int] = []
+        """Absolute peaks of any measurements in progress, which nested measurements have reset."""
+
+    def pytest_configure(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+
+    def pytest_unconfigure(self) -> None:
+        if self._started:
+            tracemalloc.stop()
+
+    @contextmanager
+    def measure(self, label: str) -> Generator[None, None, None]:
+        """Record the memory used by the code executed inside this context."""
+        before, peak_so_far = tracemalloc.get_traced_memory()
+        if self._peaks:  # nested measurement: preserve the outer peak before resetting it
+            self._peaks[-1] = max(self._peaks[-1], peak_so_far)
+        self._peaks.append(0)
+        rss_before = rss()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            after, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, self._peaks.pop())
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            rss_after = rss()
+            rss_delta = None if rss_before is None or rss_after is None else rss_after - rss_before
+            self.measurements.append(Measurement(label, peak - before, after - before, rss_delta))
+
+    def released_module(self, nodeid: str, module: ModuleType) -> None:
+        """Track a cell's module after teardown, to report it if it is still alive at the end of the session."""
+        self.released[nodeid] = weakref.ref(module)
+
+    def pytest_terminal_summary(self, terminalreporter: pytest.TerminalReporter) -> None:
+        terminalreporter.write_sep("=", "ipynb2 memory")
+        if not self.measurements:
+            terminalreporter.write_line("no cells executed")
+        top = sorted(self.measurements, key=lambda measurement: measurement.peak, reverse=True)[:TOP]
+        for measurement in top:
+            terminalreporter.write_line(str(measurement))
+        gc.collect()
+        if alive := [nodeid for nodeid, module in self.released.items() if module() is not None]:
+            terminalreporter.write_line("cell modules still alive after teardown:")
+            for nodeid in alive:
+                terminalreporter.write_line(f"    {nodeid}")
@@ -3,16 +3,50 @@
 from __future__ import annotations
 
 import ast
+import hashlib
+import mmap
+import os
 from functools import cached_property
 from typing import TYPE_CHECKING, Protocol, overload
 
 import IPython.core.inputtransformer2
 import nbformat
 
+from ._trace import NOTRACE
+
 if TYPE_CHECKING:
     from collections.abc import Collection, Generator, Iterator, Sequence
     from pathlib import Path
-    from typing import Self, SupportsIndex
+    from typing import Final, Self, SupportsIndex
+
+    from ._trace import NoTracer
+
+SKIPTAGS: Final[tuple[str, ...]] = ("ipynb2-skip",)
+"""Cells with any of these tags in their metadata are never executed."""
+CHECKPOINTTAG: Final[str] = "ipynb2-checkpoint"
+"""Tag for setup cells after which the namespace may be saved and restored in later runs."""
+CHECKPOINTCOMMENT: Final[str] = "# ipynb2: checkpoint"
+"""Alternative to `CHECKPOINTTAG`, as a line in the cell's source."""
+HEAVYTAG: Final[str] = "ipynb2-heavy"
+"""Tag for any cell in a notebook whose setup needs so much memory that only a few may be executed at once."""
+SERIALTAG: Final[str] = "ipynb2-serial"
+"""Tag for any cell in a notebook which is not thread-safe, so its cells are never executed on a thread pool."""
+TESTMAGIC: Final[str] = r"%%ipytest"
+"""Cell magic which identifies a test cell."""
+
+
+def mayhavetests(filepath: Path) -> bool:
+    """
+    Does the raw file contain `%%ipytest` anywhere? A cheap check, without reading the json, before parsing a notebook.
+
+    `True` may be a false positive, e.g. the magic mentioned in a markdown cell. `False` means there are no test cells,
+    unless the notebook was saved with its text escaped in some other way than standard json.
+    """
+    with filepath.open("rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:  # cannot mmap an empty file
+            return False
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as contents:
+            return contents.find(TESTMAGIC.encode()) != -1
 
 
 class MagicFinder(ast.NodeVisitor):
@@ -51,6 +85,58 @@ class MagicFinder(ast.NodeVisitor):
         self.generic_visit(node)
 
 
+class BindingFinder(ast.NodeVisitor):
+    """Identifies the names which code binds in the namespace it is executed in, without executing it."""
+
+    def __init__(self) -> None:
+        self.names: set[str] = set()
+        super().__init__()
+
+    def visit_Name(self, node: ast.Name):  # noqa: N802
+        if isinstance(node.ctx, ast.Store):
+            self.names.add(node.id)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef):  # noqa: N802
+        """Only the name is bound, the body has its own scope."""
+        self.names.add(node.name)
+
+    visit_AsyncFunctionDef = visit_FunctionDef  # noqa: N815
+    visit_ClassDef = visit_FunctionDef  # noqa: N815
+
+    def visit_Lambda(self, node: ast.Lambda):  # noqa: N802
+        """The body has its own scope."""
+
+    def visit_comprehension(self, node: ast.comprehension):
+        """The targets have their own scope, only assignment expressions in the conditions bind names."""
+        self.visit(node.iter)
+        for condition in node.ifs:
+            self.visit(condition)
+
+    def visit_Import(self, node: ast.Import | ast.ImportFrom):  # noqa: N802
+        for alias in node.names:
+            if alias.name != "*":
+                self.names.add(alias.asname or alias.name.split(".")[0])
+
+    visit_ImportFrom = visit_Import  # noqa: N815
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler):  # noqa: N802
+        if node.name is not None:
+            self.names.add(node.name)
+        self.generic_visit(node)
+
+    def visit_MatchAs(self, node: ast.MatchAs | ast.MatchStar):  # noqa: N802
+        if node.name is not None:
+            self.names.add(node.name)
+        self.generic_visit(node)
+
+    visit_MatchStar = visit_MatchAs  # noqa: N815
+
+    def visit_MatchMapping(self, node: ast.MatchMapping):  # noqa: N802
+        if node.rest is not None:
+            self.names.add(node.rest)
+        self.generic_visit(node)
+
+
 class CellSource:
     """
     Contains source code of a ipynb cell.
@@ -90,6 +176,17 @@ class CellSource:
         finder.visit(tree)
         return finder.magiclines
 
+    @cached_property
+    def bindings(self) -> set[str]:
+        """
+        The names bound by the cell at the top level, as far as can be seen without executing it.
+
+        Names bound indirectly, e.g. via `global` in a function, `globals()` or `from ... import *`, are missing.
+        """
+        finder = BindingFinder()
+        finder.visit(ast.parse(str(self)))
+        return finder.names
+
     def commentout(self, lines: Collection[int]) -> Self:
         return type(self)([f"# {line}" if lineno in lines else line for lineno, line in enumerate(self, start=1)])
 
@@ -146,40 +243,116 @@ class Notebook:
     The relevant bits of an ipython Notebook.
 
     Attributes:
-        muggled_codecells (SourceList): The code cells *excluding* any identified as test cells.
-            With magic & ipytest lines commented out.
+        muggled_codecells (SourceList): The code cells *excluding* any identified as test cells or tagged with one of
+            `skiptags`. With magic & ipytest lines commented out.
         muggled_testcells (SourceList): The code cells which are identified as containing tests,
             based upon the presence of the `%%ipytest` magic. With magic & ipytest lines commented out.
+        celltags (list[list[str]]): The tags from the metadata of every cell, indexed by cell id.
+        checkpoints (set[int]): The ids of setup cells marked as checkpoints, via `CHECKPOINTTAG` or
+            `CHECKPOINTCOMMENT`.
+        heavy (bool): Whether any cell is tagged with `HEAVYTAG`.
+        threadsafe (bool): Whether no cell is tagged with `SERIALTAG`.
     """
 
-    def __init__(self, filepath: Path) -> None:
+    def __init__(self, filepath: Path, skiptags: Collection[str] = SKIPTAGS, tracer: NoTracer = NOTRACE) -> None:
         self.muggled_codecells: SourceList
-        """The code cells *excluding* any identified as test cells. With magic & ipytest lines commented out."""
+        """
+        The code cells *excluding* any identified as test cells or tagged with one of `skiptags`.
+        With magic & ipytest lines commented out.
+        """
         self.muggled_testcells: SourceList
         """
         The code cells which are identified as containing tests, based upon the presence of the `%%ipytest`magic.
         With magic & ipytest lines commented out.
         """
-
-        contents = nbformat.read(fp=str(filepath), as_version=4)
-        nbformat.validate(contents)
+        self.celltags: list[list[str]]
+        """The tags from the metadata of every cell, indexed by cell id."""
+        self.checkpoints: set[int]
+        """The ids of setup cells marked as checkpoints, via `CHECKPOINTTAG` or `CHECKPOINTCOMMENT`."""
+        self.heavy: bool
+        """Whether any cell is tagged with `HEAVYTAG`."""
+        self.threadsafe: bool
+        """Whether no cell is tagged with `SERIALTAG`."""
+
+        with tracer.span("read", path=str(filepath)):
+            contents = nbformat.read(fp=str(filepath), as_version=4)
+        with tracer.span("validate", path=str(filepath)):
+            nbformat.validate(contents)
         cells: list[Cell] = contents.cells
 
-        for cell in cells:
+        for cellid, cell in enumerate(cells):
             cell.source = CellSource(cell.source)  # type: ignore[attr-defined]  # fulfils protocol after this conversion
+            if cell.cell_type == "code":
+                with tracer.span("muggle", path=str(filepath), cell=cellid):
+                    cell.source.muggled  # noqa: B018 - cached_property
 
         def _istestcell(cell: Cell) -> bool:
-            return cell.cell_type == "code" and any(line.strip().startswith(r"%%ipytest") for line in cell.source)
+            return cell.cell_type == "code" and any(line.strip().startswith(TESTMAGIC) for line in cell.source)
 
         def _iscodecell(cell: Cell) -> bool:
             return cell.cell_type == "code"
 
+        def _isskipped(cell: Cell) -> bool:
+            return any(tag in skiptags for tag in cell.metadata.get("tags", []))
+
         self.muggled_codecells = SourceList(
-            cell.source.muggled if _iscodecell(cell) and not _istestcell(cell) else None for cell in cells
+            cell.source.muggled if _iscodecell(cell) and not _istestcell(cell) and not _isskipped(cell) else None
+            for cell in cells
         )
         self.muggled_testcells = SourceList(cell.source.muggled if _istestcell(cell) else None for cell in cells)
+        self.celltags = [list(cell.metadata.get("tags", [])) for cell in cells]
+        self.heavy = any(HEAVYTAG in tags for tags in self.celltags)
+        self.threadsafe = not any(SERIALTAG in tags for tags in self.celltags)
+        self._prefix_fingerprints: dict[int, str] = {}
+        self.checkpoints = {
+            cellid
+            for cellid in self.muggled_codecells.ids()
+            if CHECKPOINTTAG in self.celltags[cellid]
+            or any(line.strip() == CHECKPOINTCOMMENT for line in self.muggled_codecells[cellid])
+        }
+
+    def fingerprint(self, testcellid: int) -> str:
+        """
+        A stable hash of the test cell `testcellid` and the code cells above it which are executed before it.
+
+        Only muggled code cells contribute, so editing a markdown cell, another test cell or any cell below
+        `testcellid` does not change the fingerprint.
+        """
+        return _digest([*self.muggled_codecells[:testcellid], self.muggled_testcells[testcellid]])
+
+    def prefix_fingerprint(self, codecellid: int) -> str:
+        """A stable hash of the code cell `codecellid` and the code cells above it which are executed before it."""
+        if (fingerprint := self._prefix_fingerprints.get(codecellid)) is None:
+            sources = [*self.muggled_codecells[:codecellid], self.muggled_codecells[codecellid]]
+            fingerprint = self._prefix_fingerprints[codecellid] = _digest(sources)
+        return fingerprint
+
+
+def _digest(sources: list[CellSource]) -> str:
+    digest = hashlib.sha256()
+    for source in sources:
+        digest.update(str(source).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class NotebookCache:
+    """Parsed notebooks for a long-lived process, re-parsed whenever the file's modification time or size changes."""
+
+    def __init__(self) -> None:
+        self._notebooks: dict[Path, tuple[tuple[int, int, tuple[str, ...]], Notebook]] = {}
+
+    def get(self, filepath: Path, skiptags: Collection[str] = SKIPTAGS, tracer: NoTracer = NOTRACE) -> Notebook:
+        """The parsed notebook at `filepath`, parsing it again only if it has changed."""
+        stat = filepath.stat()
+        key = (stat.st_mtime_ns, stat.st_size, tuple(skiptags))
+        cached = self._notebooks.get(filepath)
+        if cached is None or cached[0] != key:
+            cached = self._notebooks[filepath] = (key, Notebook(filepath, skiptags=skiptags, tracer=tracer))
+        return cached[1]
 
 
 class Cell(Protocol):
     source: CellSource
     cell_type: str
+    metadata: dict
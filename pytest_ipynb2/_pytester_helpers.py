@@ -2,11 +2,16 @@
 
 from __future__ import annotations
 
+import hashlib
+import os
+import shutil
 import sys
+import tempfile
 from dataclasses import dataclass, field
 from functools import cached_property
+from itertools import zip_longest
 from pathlib import Path
-from textwrap import indent
+from textwrap import dedent, indent
 from typing import TYPE_CHECKING, Protocol
 from warnings import warn
 
@@ -33,6 +38,8 @@ class CollectionTree:
     ```
     assert CollectionTree.from_items(pytester.genitems([...])) == CollectionTree.from_dict({...})
     ```
+
+    If the trees differ, the assertion message shows the first differing node and the path to it, see `diff()`.
     """
 
     @classmethod
@@ -43,33 +50,32 @@ class CollectionTree:
         It is intended that this function is passed the result of `pytester.genitems()`
 
         Returns: a CollectionTree with the Session as the root.
+
+        Each item's parents are only walked until reaching a node which is already in the tree, so this takes time
+        proportional to the number of nodes in the tree. Children are in the order they were first reached.
         """
         if not items:
-            # If we don't specifically handle this here, then `all([])` returns `True` in _walk_up_tree
             msg = "Items list is empty."
             raise ValueError(msg)
 
-        return cls._walk_up_tree([cls(node=item, children=None) for item in items])
-
-    @classmethod
-    def _walk_up_tree(cls, branches: list[Self]) -> Self:
-        """
-        Walk up the collection tree from a list of branches/leaves until reaching the `pytest.Session`.
-
-        Returns: the Session `CollectionTree`.
-        """
-        parents = (branch.node.parent for branch in branches)
-        branches_byparent = {
-            parent: [branch for branch in branches if branch.node.parent == parent]
-            for parent in parents
-        }  # fmt: skip
-        parent_trees = [cls(node=parent, children=list(children)) for parent, children in branches_byparent.items()]
-
-        if all(isinstance(parent.node, pytest.Session) for parent in parent_trees):
-            assert len(parent_trees) == 1, "We should only ever have one Session."  # noqa: S101
-            return next(iter(parent_trees))
-
-        return cls._walk_up_tree(parent_trees)
+        trees: dict[int, Self] = {}
+        """Trees indexed by `id(node)`, pytest nodes hash by nodeid which is not unique."""
+        roots: list[Self] = []
+        for item in items:
+            branch = cls(node=item, children=None)
+            node = item.parent
+            while node is not None:
+                if (tree := trees.get(id(node))) is not None:
+                    tree.children.append(branch)
+                    break
+                branch = trees[id(node)] = cls(node=node, children=[branch])
+                node = node.parent
+            else:
+                roots.append(branch)
+
+        assert len(roots) == 1, "We should only ever have one Session."  # noqa: S101
+        assert isinstance(roots[0].node, pytest.Session), "The root should be a Session."  # noqa: S101
+        return roots[0]
 
     @classmethod
     def from_dict(cls, tree: dict[tuple[str, type], dict | None]) -> Self:
@@ -163,13 +169,44 @@ class CollectionTree:
         """The actual collected node."""
 
     def __eq__(self, other: Self) -> bool:
-        """CollectionTrees are equal if their children and node attributes are equal."""
+        """CollectionTrees are equal if their node and children attributes are equal."""
         try:
             other_children = other.children
             other_node = other.node
         except AttributeError:
             return NotImplemented
-        return self.children == other_children and self.node == other_node
+        return self.node == other_node and self.children == other_children
+
+    def diff(self, other: CollectionTree) -> list[str]:
+        """
+        Describe the first difference between this tree and `other`: the path to it and the two differing subtrees.
+
+        Trees are compared top-down, stopping at the first difference, so the result stays short for large trees.
+        Returns an empty list if the trees are equal.
+        """
+        return self._diff(self, other, path=[])
+
+    @classmethod
+    def _diff(cls, mine: CollectionTree | None, theirs: CollectionTree | None, path: list[str]) -> list[str]:
+        """`diff()` for subtrees `mine` & `theirs`, either of which may be `None` if it is missing, below `path`."""
+        if mine is not None and theirs is not None and mine.node == theirs.node:
+            if mine.children is None and theirs.children is None:
+                return []
+            if mine.children is not None and theirs.children is not None:
+                below = [*path, repr(mine.node)]
+                for mychild, theirchild in zip_longest(mine.children, theirs.children):
+                    if difference := cls._diff(mychild, theirchild, below):
+                        return difference
+                return []
+        location = [indent(node, "    " * depth) for depth, node in enumerate(path)] or ["(root)"]
+        return [
+            "First difference below:",
+            *location,
+            "Left:",
+            *(indent(repr(mine).rstrip(), "    ").splitlines() if mine is not None else ["    (missing)"]),
+            "Right:",
+            *(indent(repr(theirs).rstrip(), "    ").splitlines() if theirs is not None else ["    (missing)"]),
+        ]
 
     def __repr__(self) -> str:
         """Indented, multiline representation of the tree to simplify interpreting test failures."""
@@ -224,10 +261,30 @@ class ExampleDirSpec:
 
     def __hash__(self) -> int:
         files = tuple(self.files)
-        notebooks = tuple((notebook, "\n".join(contents)) for notebook, contents in self.notebooks.items())
+        notebooks = tuple(
+            (
+                notebook,
+                "\n".join(contents),
+                tuple(getattr(cell, "tags", ()) for cell in contents),
+                tuple(getattr(cell, "outputs", ()) for cell in contents),
+            )
+            for notebook, contents in self.notebooks.items()
+        )
         return hash((self.conftest, self.ini, files, notebooks))
 
 
+class TaggedSource(str):
+    """Source for a notebook cell in `ExampleDirSpec.notebooks`, to be created with `tags` and stored `outputs`."""
+
+    __slots__ = ("outputs", "tags")
+
+    def __new__(cls, source: str, tags: tuple[str, ...] = (), outputs: tuple[str, ...] = ()) -> Self:
+        tagged = super().__new__(cls, source)
+        tagged.tags = tags
+        tagged.outputs = outputs
+        return tagged
+
+
 class FunctionRequest(Protocol):
     config: pytest.Config
     function: FunctionType
@@ -238,8 +295,93 @@ class ExampleDirRequest(FunctionRequest):
     param: ExampleDirSpec
 
 
+class ExampleDirStore:
+    """
+    Content-addressed store of the directories described by `ExampleDirSpec`s, each created once per session.
+
+    Shared by all xdist workers: each directory is created under a temporary name and renamed into place, so workers
+    racing to create the same directory never see a partial one.
+    """
+
+    def __init__(self, path: Path, examples: Path) -> None:
+        """Store directories under `path`. Relative `ExampleDirSpec.files` are relative to `examples`."""
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.examples = examples
+
+    def get(self, example: ExampleDirSpec) -> Path:
+        """The directory containing the files described by `example`, created if it is not yet in the store."""
+        stored = self.path / self.digest(example)
+        if not stored.is_dir():
+            partial = Path(tempfile.mkdtemp(prefix=f"{stored.name}.", dir=self.path))
+            self._create(example, partial)
+            try:
+                partial.rename(stored)
+            except OSError:  # another worker got there first
+                shutil.rmtree(partial)
+        return stored
+
+    def digest(self, example: ExampleDirSpec) -> str:
+        """A hash of everything which ends up in the directory, including the contents of `example.files`."""
+        digest = hashlib.sha256()
+        for part in (str(example.path), example.conftest, example.ini):
+            digest.update(part.encode() + b"\0")
+        for file in map(self.examples.joinpath, example.files):
+            paths = sorted(file.rglob("*")) if file.is_dir() else [file]
+            for path in (path for path in paths if path.is_file()):
+                digest.update(str(path.relative_to(file.parent)).encode() + b"\0" + path.read_bytes() + b"\0")
+        for notebook, contents in example.notebooks.items():
+            digest.update(notebook.encode() + b"\0")
+            for cell in contents:
+                tags, outputs = getattr(cell, "tags", ()), getattr(cell, "outputs", ())
+                digest.update(repr((str(cell), tuple(tags), tuple(outputs))).encode() + b"\0")
+        return digest.hexdigest()[:16]
+
+    def _create(self, example: ExampleDirSpec, directory: Path) -> None:
+        """Create the files described by `example` in `directory`, as `pytester.makeconftest()` etc. would."""
+        (directory / example.path).mkdir(parents=True, exist_ok=True)
+        if example.conftest:
+            (directory / "conftest.py").write_text(dedent(example.conftest).strip(), encoding="utf-8")
+
+        if example.ini:
+            (directory / "tox.ini").write_text(dedent(f"[pytest]\n{example.ini}").strip(), encoding="utf-8")
+
+        for filetocopy in map(self.examples.joinpath, example.files):
+            if filetocopy.is_dir():
+                shutil.copytree(filetocopy, directory, symlinks=True, dirs_exist_ok=True)
+            else:
+                shutil.copy(filetocopy, directory / filetocopy.name)
+
+        for notebook, contents in example.notebooks.items():
+            nbnode = nbformat.v4.new_notebook()
+            for cellsource in contents:
+                cellnode = nbformat.v4.new_code_cell(str(cellsource))
+                if tags := getattr(cellsource, "tags", ()):
+                    cellnode.metadata["tags"] = list(tags)
+                cellnode.outputs = [
+                    nbformat.v4.new_output("stream", name="stdout", text=output)
+                    for output in getattr(cellsource, "outputs", ())
+                ]
+                nbnode.cells.append(cellnode)
+            nbformat.write(nb=nbnode, fp=directory / example.path / f"{notebook}.ipynb")
+
+
+@pytest.fixture(scope="session")
+def example_dir_store(
+    pytestconfig: pytest.Config,
+    tmp_path_factory: pytest.TempPathFactory,
+) -> ExampleDirStore:  # pragma: no cover
+    """Session-wide store of example directories, shared with any other xdist workers in the same run."""
+    basetemp = tmp_path_factory.getbasetemp()
+    if "PYTEST_XDIST_WORKER" in os.environ:  # each worker has its own basetemp, inside a shared one
+        basetemp = basetemp.parent
+    # As `pytester.copy_example()`
+    examples = pytestconfig.rootpath / (pytestconfig.getini("pytester_example_dir") or "")
+    return ExampleDirStore(basetemp / "example_dirs", examples)
+
+
 @pytest.fixture(scope="module")
-def example_dir_cache() -> dict[ExampleDirSpec, ExampleDir]: # pragma: no cover
+def example_dir_cache() -> dict[ExampleDirSpec, ExampleDir]:  # pragma: no cover
     return {}
 
 
@@ -248,26 +390,18 @@ def example_dir(
     request: ExampleDirRequest,
     pytester: pytest.Pytester,
     example_dir_cache: dict[ExampleDirSpec, ExampleDir],
+    example_dir_store: ExampleDirStore,
 ) -> ExampleDir:
-    """Parameterised fixture. Requires a list of `Path`s to copy into a pytester instance."""
+    """
+    Parameterised fixture. Requires an `ExampleDirSpec` describing the files to create in a pytester instance.
+
+    The files are created once per session in the `example_dir_store` and copied from there. Within a module, tests
+    with the same `ExampleDirSpec` share the same pytester instance & run results.
+    """
     example = request.param
     if (cached_dir := example_dir_cache.get(example)) is None:
-        (pytester.path / example.path).mkdir(parents=True, exist_ok=True)
-        if example.conftest: # pragma: no cover
-            pytester.makeconftest(request.param.conftest)
-
-        if example.ini: # pragma: no cover
-            pytester.makeini(f"[pytest]\n{example.ini}")
-
-        for filetocopy in example.files:
-            pytester.copy_example(str(filetocopy))
-
-        for notebook, contents in example.notebooks.items():
-            nbnode = nbformat.v4.new_notebook()
-            for cellsource in contents:
-                cellnode = nbformat.v4.new_code_cell(cellsource)
-                nbnode.cells.append(cellnode)
-            nbformat.write(nb=nbnode, fp=pytester.path / example.path / f"{notebook}.ipynb")
+        # Copied, not hardlinked, as some tests edit the files
+        shutil.copytree(example_dir_store.get(example), pytester.path, symlinks=True, dirs_exist_ok=True)
         cached_dir = example_dir_cache[example] = ExampleDir(pytester=pytester, args=example.args)
     elif request.config.get_verbosity() >= 3:  # noqa: PLR2004 # pragma: no cover
         # 1st keyword is the test name (incl. any parametrized id)
@@ -281,6 +415,72 @@ def add_ipytest_magic(source: str) -> str:
     return f"%%ipytest\n\n{source}"
 
 
+def add_tags(source: str, *tags: str) -> TaggedSource:
+    """Add tags to the cell's metadata."""
+    return TaggedSource(source, tags, getattr(source, "outputs", ()))
+
+
+def add_output(source: str, output: str) -> TaggedSource:
+    """Add `output` to the cell's stored outputs, as if it had been printed when the notebook was last run."""
+    return TaggedSource(source, getattr(source, "tags", ()), (*getattr(source, "outputs", ()), output))
+
+
+def synthetic_notebook(
+    cells: int = 20,
+    testcells: int = 4,
+    cellsize: int = 10,
+    outputsize: int = 0,
+    magicdensity: float = 0.0,
+) -> list[str]:
+    """
+    Cell sources for a generated notebook, for `ExampleDirSpec.notebooks`, to benchmark the plugin at scale.
+
+    - `cells`: number of code cells, including the test cells
+    - `testcells`: number of `%%ipytest` cells, spread evenly through the notebook, the last cell is always a test
+        cell. Each contains one test, which checks a variable from the setup cell above it.
+    - `cellsize`: lines of code in each cell
+    - `outputsize`: characters of stored stdout in each cell
+    - `magicdensity`: fraction of the lines in each cell which are line magics (`0.0` - `1.0`)
+
+    Example:
+        >>> notebook = synthetic_notebook(cells=3, testcells=1, cellsize=4, magicdensity=0.5)
+        >>> print(notebook[1])
+        v1_0 = 0
+        %time _ = 0
+        v1_2 = 2
+        %time _ = 0
+        >>> print(notebook[2])
+        %%ipytest
+        <BLANKLINE>
+        %time _ = 0
+        _ = 0
+        def test_cell2():
+            assert v1_2 == 2
+    """
+    testcellids = {round((n + 1) * cells / testcells) - 1 for n in range(testcells)}
+
+    def ismagic(lineno: int) -> bool:
+        return int((lineno + 1) * magicdensity) > int(lineno * magicdensity)
+
+    def setupcell(cellid: int) -> str:
+        return "\n".join("%time _ = 0" if ismagic(n) else f"v{cellid}_{n} = {n}" for n in range(cellsize))
+
+    def testcell(cellid: int) -> str:
+        # Only the test itself is 2 lines, so magics are added to reach `cellsize`, as long as it is bigger than 2.
+        magics = ["%time _ = 0" for n in range(cellsize - 2) if ismagic(n)]
+        filler = [f"_ = {n}" for n in range(cellsize - 2 - len(magics))]
+        setupcellid = max((n for n in range(cellid) if n not in testcellids), default=None)
+        lineno = max((n for n in range(cellsize) if not ismagic(n)), default=None)
+        check = "True" if setupcellid is None or lineno is None else f"v{setupcellid}_{lineno} == {lineno}"
+        return add_ipytest_magic("\n".join([*magics, *filler, f"def test_cell{cellid}():", f"    assert {check}"]))
+
+    notebook = []
+    for cellid in range(cells):
+        source = testcell(cellid) if cellid in testcellids else setupcell(cellid)
+        notebook.append(add_output(source, "x" * outputsize) if outputsize else source)
+    return notebook
+
+
 def pytest_configure(config: pytest.Config) -> None:
     # Tests will be needed if this ever becomes public functionality
     """Register autoskip & xfail_for marks."""
@@ -302,8 +502,15 @@ def pytest_collection_modifyitems(items: list[pytest.Function]) -> None:  # prag
     # Tests will be needed if this ever becomes public functionality
     """xfail on presence of a custom marker: `xfail_for(tests:list[str], reasons:list[str])`."""  # noqa: D403
     for item in items:
-        test_name = item.originalname.removeprefix("test_")
         if xfail_for := item.get_closest_marker("xfail_for"):
+            test_name = item.originalname.removeprefix("test_")
             for xfail_test, reason in xfail_for.kwargs.items():
                 if xfail_test == test_name:
                     item.add_marker(pytest.mark.xfail(reason=reason, strict=True))
+
+
+def pytest_assertrepr_compare(op: str, left: object, right: object) -> list[str] | None:
+    """Show only the first difference between two `CollectionTree`s, rather than both complete trees."""
+    if op == "==" and isinstance(left, CollectionTree) and isinstance(right, CollectionTree):
+        return ["CollectionTrees are not equal", *left.diff(right)]
+    return None
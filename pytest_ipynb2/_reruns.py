@@ -0,0 +1,97 @@
+"""Re-run failed tests from notebooks without executing the cells above them again."""
+
+from __future__ import annotations
+
+import bdb
+import unittest
+from typing import TYPE_CHECKING
+
+import pytest
+
+from ._cellpath import CellPath
+
+if TYPE_CHECKING:
+    from typing import Any, Final, Literal
+
+RERUN: Final[str] = "rerun"
+"""Outcome of the reports from a failed attempt which was re-run."""
+
+
+class Reruns:
+    """
+    Plugin to re-run failing tests from notebooks up to `count` times.
+
+    Between attempts only the test item itself is torn down, not its `Cell`, so the cell's module is reused. Before
+    each re-run the module's namespace is reset from a snapshot taken after the module was built, see `Cell.reset`,
+    rather than executing the setup cells and test cell again.
+    """
+
+    def __init__(self, count: int) -> None:
+        self.count = count
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtest_protocol(self, item: pytest.Item, nextitem: pytest.Item | None) -> bool | None:
+        if not isinstance(item.path, CellPath) or not isinstance(item, pytest.Function):
+            return None
+        item.ihook.pytest_runtest_logstart(nodeid=item.nodeid, location=item.location)
+        for attempt in range(self.count + 1):
+            if attempt:
+                item.getparent(pytest.Module).reset()
+            retry = attempt < self.count and not (item.session.shouldfail or item.session.shouldstop)
+            reports = self._runtestprotocol(item, nextitem, retry=retry)
+            retry = retry and any(report.failed for report in reports[:-1])
+            for report in reports:
+                if retry and report.failed:
+                    report.outcome = RERUN  # type: ignore[assignment]
+                item.ihook.pytest_runtest_logreport(report=report)
+            if not retry:
+                break
+        item.ihook.pytest_runtest_logfinish(nodeid=item.nodeid, location=item.location)
+        return True
+
+    @staticmethod
+    def _runtestprotocol(item: pytest.Item, nextitem: pytest.Item | None, *, retry: bool) -> list[pytest.TestReport]:
+        """
+        `_pytest.runner.runtestprotocol`, without logging the reports.
+
+        If `retry` and the setup or call fails, only the item itself is torn down, not its parents.
+        """
+        hasrequest = hasattr(item, "_request")
+        if hasrequest and not item._request:  # noqa: SLF001
+            item._initrequest()  # noqa: SLF001
+        try:
+            reports = [_call_and_report(item, "setup")]
+            if reports[0].passed:
+                reports.append(_call_and_report(item, "call"))
+            if item.session.shouldfail or item.session.shouldstop:
+                nextitem = None
+            elif retry and any(report.failed for report in reports):
+                nextitem = item.parent  # SetupState only uses `nextitem.listchain()`
+            reports.append(_call_and_report(item, "teardown", nextitem=nextitem))
+        finally:
+            if hasrequest:
+                item._request = False  # noqa: SLF001
+                item.funcargs = None
+        return reports
+
+    def pytest_report_teststatus(self, report: pytest.TestReport) -> tuple[str, str, tuple[str, dict]] | None:
+        if report.outcome == RERUN:
+            return RERUN, "R", ("RERUN", {"yellow": True})
+        return None
+
+
+def _call_and_report(item: pytest.Item, when: Literal["setup", "call", "teardown"], **kwargs: Any) -> pytest.TestReport:
+    """`_pytest.runner.call_and_report`, without logging the report, via pytest's public hooks."""
+    reraise: tuple[type[BaseException], ...] = (pytest.exit.Exception,)
+    if not item.config.getoption("usepdb"):
+        reraise += (KeyboardInterrupt,)
+    hook = getattr(item.ihook, f"pytest_runtest_{when}")
+    call = pytest.CallInfo.from_call(lambda: hook(item=item, **kwargs), when=when, reraise=reraise)
+    report = item.ihook.pytest_runtest_makereport(item=item, call=call)
+    if (
+        call.excinfo is not None
+        and not hasattr(report, "wasxfail")
+        and not isinstance(call.excinfo.value, (pytest.skip.Exception, unittest.SkipTest, bdb.BdbQuit))
+    ):
+        item.ihook.pytest_exception_interact(node=item, call=call, report=report)
+    return report
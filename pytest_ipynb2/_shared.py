@@ -0,0 +1,115 @@
+"""Execute each notebook's setup cells once per run and share the resulting namespace with all pytest-xdist workers."""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+
+from ._checkpoint import Checkpoints
+from ._locks import filelock
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from contextlib import AbstractContextManager
+    from typing import Any, Final
+
+WORKERINPUT_KEY: Final[str] = "ipynb2_shared_setup"
+
+
+class SharedSetup:
+    """
+    Plugin for `--ipynb2-share-setup`: pickled namespaces after the setup cells of each test cell, for this run only.
+
+    The controller - or the only process, without pytest-xdist - creates a temporary directory, sends its path to the
+    workers and removes it at the end of the run. The first worker to need a namespace holds a lock on it while
+    executing the setup cells, then pickles the namespace. Other workers wait for the lock, then restore the namespace.
+    Names which cannot be pickled are left out, and the setup cells which bind them are executed again after restoring
+    the rest. If they cannot be attributed to any cell, the namespace is marked as unshareable, and every worker
+    executes its setup cells itself.
+    """
+
+    def __init__(self, config: pytest.Config) -> None:
+        workerinput: dict[str, Any] | None = getattr(config, "workerinput", None)
+        self.owner = workerinput is None
+        if workerinput is None:
+            self.directory = Path(tempfile.mkdtemp(prefix="pytest-ipynb2-setup-"))
+        else:
+            self.directory = Path(workerinput[WORKERINPUT_KEY])
+        self.checkpoints = Checkpoints(self.directory)
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_configure_node(self, node: Any) -> None:
+        """Send the directory to a pytest-xdist worker."""
+        node.workerinput[WORKERINPUT_KEY] = str(self.directory)
+
+    def pytest_unconfigure(self) -> None:
+        if self.owner:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def path(self, notebook: str, cellid: int, fingerprint: str) -> Path:
+        """The file for the namespace after cell `cellid` of `notebook`, with its `fingerprint`."""
+        return self.checkpoints.path(notebook, cellid, fingerprint)
+
+    def lock(self, path: Path) -> AbstractContextManager:
+        """Lock the namespace at `path` while it is computed, unless it is already available or cannot be shared."""
+        if path.exists() or not self.shareable(path):
+            return contextlib.nullcontext()
+        return filelock(path.with_suffix(".lock"))
+
+    @staticmethod
+    def shareable(path: Path) -> bool:
+        """Has no worker found that the namespace at `path` cannot be pickled?"""
+        return not path.with_suffix(".unpicklable").exists()
+
+    def save(
+        self,
+        path: Path,
+        namespace: dict[str, Any],
+        bindings: dict[int, set[str]],
+    ) -> tuple[list[str], list[int] | None]:
+        """
+        Pickle `namespace` to `path`, leaving out any names which cannot be pickled.
+
+        Arguments:
+            path: the file for the namespace.
+            namespace: the namespace after the setup cells.
+            bindings: the names bound by each setup cell, to find the cells which bind the names that are left out.
+
+        Returns:
+            The names which could not be pickled, and the ids of the setup cells to execute again after restoring the
+            others. `None` if some of the names are not bound by any cell, when the namespace is marked as unshareable.
+        """
+        pickled, unpicklable = self.checkpoints.dumps(namespace, partial=True)
+        reexecute = [cellid for cellid, names in sorted(bindings.items()) if names.intersection(unpicklable)]
+        rebound = set().union(*(bindings[cellid] for cellid in reexecute))
+        if pickled is None or not rebound.issuperset(unpicklable):
+            path.with_suffix(".unpicklable").touch()
+            return unpicklable, None
+        if reexecute:  # before the namespace, which other workers are waiting for
+            path.with_suffix(".reexecute").write_text(json.dumps(reexecute))
+        self.checkpoints.write(path, pickled)
+        return unpicklable, reexecute
+
+    def restore(self, path: Path, namespace: dict[str, Any], execute: Callable[[int], object]) -> bool:
+        """
+        Update `namespace` from the namespace shared at `path`. Returns `False` if it is not available.
+
+        Names which could not be pickled are bound again by passing the ids of the setup cells which bind them to
+        `execute`. The restored names are then applied again, in case these cells also bound names which a later cell
+        had changed.
+        """
+        if (contents := self.checkpoints.load(path, namespace)) is None:
+            return False
+        namespace.update(contents)
+        reexecute = path.with_suffix(".reexecute")
+        if reexecute.exists():
+            for cellid in json.loads(reexecute.read_text()):
+                execute(cellid)
+            namespace.update(contents)
+        return True
@@ -0,0 +1,88 @@
+"""Keep in-memory copies of notebook namespaces, to avoid executing setup cells again in a long-lived process."""
+
+from __future__ import annotations
+
+import copy
+from types import FunctionType, ModuleType
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any
+
+
+def copy_namespace(namespace: dict[str, Any], rebind: dict[str, Any] | None = None) -> dict[str, Any] | None:
+    """
+    A deep copy of the non-dunder names in `namespace`, or `None` if it cannot be copied.
+
+    Modules are not copied. Functions defined in the namespace are rebound to `rebind`, by default the copy itself, so
+    that they see the copied globals once the copy is used to update `rebind`. Classes, and any functions which are not
+    directly in the namespace, are shared between all copies and still refer to the original namespace.
+    """
+    contents = {name: value for name, value in namespace.items() if not (name.startswith("__") and name.endswith("__"))}
+    memo: dict[int, Any] = {id(value): value for value in contents.values() if isinstance(value, ModuleType)}
+    try:
+        copied: dict[str, Any] = copy.deepcopy(contents, memo)
+    except Exception:  # noqa: BLE001 - anything can happen while copying arbitrary objects
+        return None
+    for name, value in copied.items():
+        if isinstance(value, FunctionType) and value.__globals__ is namespace:
+            copied[name] = rebound(value, copied if rebind is None else rebind)
+    return copied
+
+
+def rebound(function: FunctionType, globals_: dict[str, Any]) -> FunctionType:
+    """A copy of `function` which uses `globals_` as its globals."""
+    copied = FunctionType(function.__code__, globals_, function.__name__, function.__defaults__, function.__closure__)
+    copied.__kwdefaults__ = function.__kwdefaults__
+    copied.__qualname__ = function.__qualname__
+    copied.__dict__.update(function.__dict__)
+    return copied
+
+
+def reset_namespace(namespace: dict[str, Any], snapshot: dict[str, Any], *, clear: bool = True) -> bool:
+    """
+    Update `namespace` in place with a copy of `snapshot`, removing any other non-dunder names first if `clear`.
+
+    Returns `False`, leaving `namespace` unchanged, if the snapshot cannot be copied.
+    """
+    if (copied := copy_namespace(snapshot, rebind=namespace)) is None:  # pragma: no cover - it was copied once
+        return False
+    if clear:
+        for name in [name for name in namespace if not (name.startswith("__") and name.endswith("__"))]:
+            del namespace[name]
+    namespace.update(copied)
+    return True
+
+
+class Snapshots:
+    """
+    Copies of notebook namespaces after each setup cell, valid as long as the fingerprint of the cell is unchanged.
+
+    At most one snapshot is kept per cell, so memory use is bounded by the number of setup cells, not the number of
+    versions of a notebook.
+    """
+
+    def __init__(self) -> None:
+        self._snapshots: dict[tuple[str, int], tuple[str, dict[str, Any] | None]] = {}
+        """(fingerprint, snapshot) indexed by (notebook nodeid, cell id). `None` if the namespace couldn't be copied."""
+
+    def __contains__(self, key: tuple[str, int, str]) -> bool:
+        """Is there a snapshot - or a record that no snapshot can be taken - for (notebook, cellid, fingerprint)?"""
+        notebook, cellid, fingerprint = key
+        return self._snapshots.get((notebook, cellid), ("", None))[0] == fingerprint
+
+    def take(self, notebook: str, cellid: int, fingerprint: str, namespace: dict[str, Any]) -> None:
+        """Store a copy of `namespace` after executing `cellid`, replacing any snapshot of an older version."""
+        self._snapshots[notebook, cellid] = (fingerprint, copy_namespace(namespace))
+
+    def restore(self, notebook: str, cellid: int, fingerprint: str, namespace: dict[str, Any]) -> bool:
+        """Update `namespace` with a copy of the snapshot after `cellid`, if there is one with the same fingerprint."""
+        stored, snapshot = self._snapshots.get((notebook, cellid), ("", None))
+        if stored != fingerprint or snapshot is None:
+            return False
+        return reset_namespace(namespace, snapshot, clear=False)
+
+    def discard(self, notebook: str) -> None:
+        """Forget all snapshots of `notebook`."""
+        for key in [key for key in self._snapshots if key[0] == notebook]:
+            del self._snapshots[key]
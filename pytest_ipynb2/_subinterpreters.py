@@ -0,0 +1,284 @@
+"""
+Run each notebook in its own subinterpreter, see PEP 734, so that notebooks cannot affect each other's global state.
+
+Each notebook is run by a separate pytest session inside a subinterpreter. The session's collected items and the
+serialized reports of all its tests are sent back as json, and the main session collects `IsolatedCell`s and
+`IsolatedItem`s which replay these reports in place of running the tests. The subinterpreters are started as soon as
+the notebooks are found, from a thread pool, so notebooks run in parallel: each subinterpreter has its own GIL.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+import pytest
+
+from ._cellpath import CellPath
+from ._marks import register_markers
+
+try:
+    from concurrent import interpreters
+except ImportError:  # before python 3.14
+    interpreters = None
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from concurrent.futures import Future
+    from pathlib import Path
+    from typing import Any, Final
+
+BACKENDS: Final[tuple[str, ...]] = ("inprocess", "subinterpreter")
+"""Values for `--ipynb2-backend`."""
+INCOMPATIBLE: Final[dict[str, str]] = {
+    "ipynb2_changed": "--ipynb2-changed",
+    "ipynb2_memory": "--ipynb2-memory",
+    "ipynb2_imports": "--ipynb2-imports",
+    "ipynb2_trace": "--ipynb2-trace",
+    "ipynb2_watch": "--ipynb2-watch",
+    "ipynb2_share_setup": "--ipynb2-share-setup",
+    "ipynb2_threads": "--ipynb2-threads",
+}
+"""Options whose state lives in the main session, so they cannot be combined with running notebooks elsewhere."""
+FAILED_TO_RUN: Final[tuple[int, ...]] = (pytest.ExitCode.INTERNAL_ERROR, pytest.ExitCode.USAGE_ERROR)
+"""Exit codes of a notebook's session which mean it could not run the notebook at all."""
+
+_BOOTSTRAP: Final[str] = """
+import json, sys
+sys.path[:] = json.loads(request)["syspath"]
+from pytest_ipynb2._subinterpreters import run
+results.put(run(request))
+"""
+
+
+def unavailable(config: pytest.Config) -> str | None:
+    """Why notebooks cannot be run in subinterpreters with this python and these options, if they cannot."""
+    if interpreters is None:
+        return f"concurrent.interpreters is not available in python {sys.version_info.major}.{sys.version_info.minor}"
+    for option, flag in INCOMPATIBLE.items():
+        if config.getoption(option):
+            return f"it cannot be combined with {flag}"
+    return None
+
+
+def innerargs(config: pytest.Config, notebook: Path) -> list[str]:
+    """Arguments for the session running `notebook`: the same rootdir, ini, selection and relevant options."""
+    args = [str(notebook), f"--rootdir={config.rootpath}", "--capture=sys", "-p", "no:faulthandler"]
+    args += ["-p", "no:lfplugin", "-p", "no:nfplugin"]  # only the main session should update the cache
+    if config.inipath is not None:
+        args += ["-c", str(config.inipath)]
+    if keyword := config.getoption("keyword"):
+        args += ["-k", keyword]
+    if markexpr := config.getoption("markexpr"):
+        args += ["-m", markexpr]
+    if config.getoption("collectonly"):
+        args.append("--collect-only")
+    if reruns := config.getoption("ipynb2_reruns"):
+        args.append(f"--ipynb2-reruns={reruns}")
+    if config.getoption("ipynb2_keep_display"):
+        args.append("--ipynb2-keep-display")
+    return args
+
+
+def run(request: str) -> str:
+    """
+    Run pytest for a notebook in the current interpreter. Called inside the subinterpreter.
+
+    Arguments:
+        request: json with the arguments for pytest as "args".
+
+    Returns:
+        json with the pytest "exitcode", its terminal "output", the collected "items", the serialized reports of
+        failed collections as "collectreports" and the serialized reports for each item's tests as "reports".
+    """
+    recorder = _Recorder()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        exitcode = pytest.main(json.loads(request)["args"], plugins=[recorder])
+    results = {
+        "exitcode": int(exitcode),
+        "output": output.getvalue(),
+        "items": recorder.items,
+        "collectreports": recorder.collectreports,
+        "reports": recorder.reports,
+    }
+    return json.dumps(results, default=str)
+
+
+class _Recorder:
+    """Plugin for the session inside the subinterpreter, which records items and serialized reports."""
+
+    def __init__(self) -> None:
+        self.config: pytest.Config | None = None
+        self.items: list[dict[str, Any]] = []
+        self.collectreports: list[dict[str, Any]] = []
+        self.reports: dict[str, list[dict[str, Any]]] = {}
+
+    def pytest_configure(self, config: pytest.Config) -> None:
+        self.config = config
+
+    def pytest_collectreport(self, report: pytest.CollectReport) -> None:
+        if report.failed:
+            self.collectreports.append(self._serialize(report))
+
+    def pytest_collection_finish(self, session: pytest.Session) -> None:
+        self.items = [
+            {
+                "cell": item.getparent(pytest.Module).name,
+                "name": item.nodeid.split("::", 1)[-1],
+                "markers": [self._marker(mark) for mark in item.iter_markers()],
+            }
+            for item in session.items
+        ]
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        self.reports.setdefault(report.nodeid, []).append(self._serialize(report))
+
+    def _serialize(self, report: pytest.CollectReport | pytest.TestReport) -> dict[str, Any]:
+        return self.config.hook.pytest_report_to_serializable(config=self.config, report=report)
+
+    @staticmethod
+    def _marker(mark: pytest.Mark) -> list[Any]:
+        """The marker's name, args and kwargs, or only its name if its arguments cannot be represented as json."""
+        try:
+            json.dumps([mark.args, mark.kwargs])
+        except (TypeError, ValueError):
+            return [mark.name]
+        return [mark.name, mark.args, mark.kwargs]
+
+
+class SubinterpreterBackend:
+    """Plugin for `--ipynb2-backend=subinterpreter`: runs each notebook in a subinterpreter on a thread pool."""
+
+    def __init__(self, config: pytest.Config) -> None:
+        self.config = config
+        self.executor = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="ipynb2-subinterpreter")
+        self.runs: dict[Path, Future[dict[str, Any]]] = {}
+
+    def submit(self, notebook: Path) -> None:
+        """Start running `notebook` in a new subinterpreter."""
+        request = json.dumps({"args": innerargs(self.config, notebook), "syspath": sys.path})
+        self.runs[notebook] = self.executor.submit(self._interpret, request)
+
+    @staticmethod
+    def _interpret(request: str) -> dict[str, Any]:
+        interpreter = interpreters.create()
+        try:
+            results = interpreters.create_queue()
+            interpreter.prepare_main(request=request, results=results)
+            interpreter.exec(_BOOTSTRAP)
+            return json.loads(results.get())
+        finally:
+            interpreter.close()
+
+    def collect(self, notebook: pytest.File) -> list[IsolatedCell] | None:
+        """
+        The cells of `notebook` with their results from the subinterpreter.
+
+        Returns `None` if the notebook could not be run in a subinterpreter, e.g. as it imports an extension module
+        which does not support subinterpreters, after warning that it will be run in-process instead.
+        """
+        try:
+            results = self.runs.pop(notebook.path).result()
+        except Exception as exception:  # noqa: BLE001 - the notebook can still be run in-process
+            reason = f"{type(exception).__name__}: {exception}"
+        else:
+            if results["exitcode"] not in FAILED_TO_RUN:
+                return self._cells(notebook, results)
+            reason = results["output"].strip()
+        msg = f"Could not run {notebook.nodeid} in a subinterpreter, running it in-process instead.\n{reason}"
+        notebook.warn(pytest.PytestWarning(msg))
+        return None
+
+    def _cells(self, notebook: pytest.File, results: dict[str, Any]) -> list[IsolatedCell]:
+        hook = self.config.hook
+        failures: dict[str, pytest.CollectReport] = {}
+        for data in results["collectreports"]:
+            report = hook.pytest_report_from_serializable(config=self.config, data=data)
+            if report.nodeid == notebook.nodeid:
+                raise notebook.CollectError(report.longreprtext)
+            failures[report.nodeid.removeprefix(notebook.nodeid).strip("[]")] = report
+        cells: dict[str, IsolatedCell] = {}
+        for item in results["items"]:
+            if (cell := cells.get(item["cell"])) is None:
+                cell = cells[item["cell"]] = IsolatedCell.create(notebook, item["cell"])
+            cell.items.append(item)
+        for name, report in failures.items():
+            if (cell := cells.get(name)) is None:
+                cell = cells[name] = IsolatedCell.create(notebook, name)
+            cell.failure = report
+        for cell in cells.values():
+            for item in cell.items:
+                item["reports"] = [
+                    hook.pytest_report_from_serializable(config=self.config, data=data)
+                    for data in results["reports"].get(f"{cell.nodeid}::{item['name']}", [])
+                ]
+        return sorted(cells.values(), key=lambda cell: CellPath.get_cellid(str(cell.path)))
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtest_protocol(self, item: pytest.Item, nextitem: pytest.Item | None) -> bool | None:  # noqa: ARG002
+        """Replay the reports from the subinterpreter, instead of running the test."""
+        if not isinstance(item, IsolatedItem):
+            return None
+        item.ihook.pytest_runtest_logstart(nodeid=item.nodeid, location=item.location)
+        for report in item.reports:
+            item.ihook.pytest_runtest_logreport(report=report)
+        item.ihook.pytest_runtest_logfinish(nodeid=item.nodeid, location=item.location)
+        return True
+
+    def pytest_unconfigure(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class IsolatedCell(pytest.Collector):
+    """A test cell which was collected and run in a subinterpreter."""
+
+    path: CellPath
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.items: list[dict[str, Any]] = []
+        self.failure: pytest.CollectReport | None = None
+
+    @classmethod
+    def create(cls, notebook: pytest.File, name: str) -> IsolatedCell:
+        return cls.from_parent(
+            parent=notebook,
+            name=name,
+            nodeid=f"{notebook.nodeid}[{name}]",
+            path=CellPath(f"{notebook.path}[{name}]"),
+        )
+
+    def collect(self) -> Generator[IsolatedItem, None, None]:
+        """
+        Report the cell's collection error from the subinterpreter, or yield its items.
+
+        Markers are replayed with their arguments, as far as json can represent them, or by name only if it cannot.
+        """
+        if self.failure is not None:
+            raise self.CollectError(self.failure.longreprtext)
+        for item in self.items:
+            register_markers(self.config, [name for name, *_ in item["markers"]])
+            isolated = IsolatedItem.from_parent(parent=self, name=item["name"], reports=item["reports"])
+            for name, *arguments in item["markers"]:
+                marker = getattr(pytest.mark, name)
+                isolated.add_marker(marker(*arguments[0], **arguments[1]) if any(arguments) else marker)
+            yield isolated
+
+
+class IsolatedItem(CellPath.PytestItemMixin, pytest.Item):
+    """A test which was run in a subinterpreter, whose reports are replayed by `SubinterpreterBackend`."""
+
+    def __init__(self, *args: Any, reports: list[pytest.TestReport], **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.reports = reports
+
+    def runtest(self) -> None:
+        """Only called if another plugin runs the test protocol first, which cannot run the test here."""
+        msg = f"{self.nodeid} was run in a subinterpreter, its results can only be reported by ipynb2"
+        raise RuntimeError(msg)
@@ -0,0 +1,44 @@
+"""Build the modules for a notebook's test cells concurrently, on a thread pool."""
+
+from __future__ import annotations
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from concurrent.futures import Future
+    from types import ModuleType
+
+
+def gil_enabled() -> bool:
+    """Is the GIL enabled? Always true before python 3.13."""
+    is_gil_enabled: Callable[[], bool] | None = getattr(sys, "_is_gil_enabled", None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+class ThreadedBuilds:
+    """
+    Plugin for `--ipynb2-threads=N`: execute the cells for each test cell in a notebook on a pool of `N` threads.
+
+    Each `Cell` submits its `_build` once the notebook has been collected, then waits for the result when pytest asks
+    it for its module. Collection, and so reporting, still happens in order in the main thread. The cells only run in
+    parallel on a free-threaded build of python, otherwise the threads only overlap while waiting on I/O or in
+    extensions which release the GIL.
+    """
+
+    def __init__(self, threads: int) -> None:
+        self.threads = threads
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="ipynb2")
+
+    def pytest_report_header(self) -> str:
+        gil = "GIL enabled, cells only overlap while waiting" if gil_enabled() else "free-threaded"
+        return f"ipynb2: executing cells on {self.threads} threads ({gil})"
+
+    def submit(self, build: Callable[[], ModuleType]) -> Future[ModuleType]:
+        """Start `build` on the thread pool."""
+        return self.executor.submit(build)
+
+    def pytest_unconfigure(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
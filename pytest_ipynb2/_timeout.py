@@ -0,0 +1,83 @@
+"""Interrupt setup cells which run for too long."""
+
+from __future__ import annotations
+
+import ctypes
+import signal
+import threading
+import traceback
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from types import FrameType, TracebackType
+
+
+class SetupTimeout(BaseException):
+    """
+    Raised inside a setup cell which has exceeded its time budget.
+
+    A `BaseException`, like `KeyboardInterrupt`, so that `except Exception:` in the cell does not swallow it.
+    """
+
+
+class _AsyncSetupTimeout(SetupTimeout):
+    """Raised asynchronously by the watchdog thread, where signals are not available."""
+
+
+def cellstack(tb: TracebackType | None, filename: str) -> str:
+    """Format the frames of a traceback from the first frame executing `filename` onwards, excluding the watchdog."""
+    frames = traceback.extract_tb(tb)
+    start = next((idx for idx, frame in enumerate(frames) if frame.filename == filename), len(frames))
+    return "".join(traceback.format_list([frame for frame in frames[start:] if frame.filename != __file__]))
+
+
+@contextmanager
+def watchdog(seconds: float | None, message: str) -> Generator[None, None, None]:
+    """
+    Raise `SetupTimeout(message)` in the current thread if the code in this context takes longer than `seconds`.
+
+    In the main thread on platforms with `SIGALRM` this also interrupts blocking calls, such as `input()` or reading
+    from a socket. Otherwise a watchdog thread raises the exception asynchronously, which only takes effect once the
+    blocked thread next executes python bytecode.
+    """
+    if not seconds:
+        yield
+        return
+
+    if hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread():
+
+        def alarm(signum: int, frame: FrameType | None) -> None:  # noqa: ARG001
+            raise SetupTimeout(message)
+
+        previous = signal.signal(signal.SIGALRM, alarm)
+        signal.setitimer(signal.ITIMER_REAL, seconds)
+        try:
+            yield
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+        return
+
+    target = ctypes.c_ulong(threading.get_ident())
+    finished = threading.Lock()
+    fired = threading.Event()
+
+    def interrupt() -> None:
+        with finished:
+            ctypes.pythonapi.PyThreadState_SetAsyncExc(target, ctypes.py_object(_AsyncSetupTimeout))
+            fired.set()
+
+    timer = threading.Timer(seconds, interrupt)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield
+    except _AsyncSetupTimeout as timeout:
+        raise SetupTimeout(message).with_traceback(timeout.__traceback__) from None
+    finally:
+        with finished:
+            timer.cancel()
+            if fired.is_set():  # discard the async exception if it has not been raised yet
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(target, None)
@@ -0,0 +1,109 @@
+"""Record where time is spent collecting and running notebooks, as a Chrome / Perfetto trace."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from contextlib import AbstractContextManager
+    from typing import Any, Final
+
+WORKEROUTPUT_KEY: Final[str] = "ipynb2_trace"
+"""Key for the trace events each pytest-xdist worker sends back to the controller."""
+
+
+class NoTracer:
+    """Stand-in for `Tracer` when `--ipynb2-trace` is not given: records nothing."""
+
+    def span(self, name: str, **args: Any) -> AbstractContextManager:  # noqa: ARG002
+        """Do nothing."""
+        return nullcontext()
+
+
+NOTRACE: Final[NoTracer] = NoTracer()
+
+
+class Tracer(NoTracer):
+    """
+    Plugin to record spans in the trace-event format used by Chrome's `about:tracing` and Perfetto.
+
+    Each process is a separate track, named after its pytest-xdist worker id. Workers send their events to the
+    controller via `workeroutput`, which writes a single file for the whole session.
+    """
+
+    def __init__(self, config: pytest.Config, path: str) -> None:
+        self.config = config
+        self.path = Path(path)
+        self.pid = os.getpid()
+        self._epoch = time.time() - time.perf_counter()
+        """Offset from `perf_counter` to wall clock time, to align the tracks from different workers."""
+        track = config.workerinput["workerid"] if hasattr(config, "workerinput") else "pytest"
+        self.events: list[dict[str, Any]] = [
+            {"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": track}},
+        ]
+
+    def _timestamp(self, counter: float) -> float:
+        """Microseconds since the epoch."""
+        return (counter + self._epoch) * 1_000_000
+
+    @contextmanager
+    def span(self, name: str, **args: Any) -> Generator[None, None, None]:
+        """Record the time spent in this context as a complete ("X") event."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": "ipynb2",
+                    "ph": "X",
+                    "ts": self._timestamp(start),
+                    "dur": (end - start) * 1_000_000,
+                    "pid": self.pid,
+                    "tid": threading.get_native_id(),
+                    "args": args,
+                },
+            )
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_setup(self, item: pytest.Item) -> Generator[None, None, None]:
+        with self.span(f"setup {item.nodeid}", nodeid=item.nodeid):
+            yield
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item: pytest.Item) -> Generator[None, None, None]:
+        with self.span(f"call {item.nodeid}", nodeid=item.nodeid):
+            yield
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_teardown(self, item: pytest.Item) -> Generator[None, None, None]:
+        with self.span(f"teardown {item.nodeid}", nodeid=item.nodeid):
+            yield
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node: Any, error: Any) -> None:  # noqa: ARG002
+        """Collect the events from a pytest-xdist worker."""
+        self.events.extend(getattr(node, "workeroutput", {}).get(WORKEROUTPUT_KEY, []))
+
+    @pytest.hookimpl(tryfirst=True)  # before pytest-xdist sends the workeroutput
+    def pytest_sessionfinish(self) -> None:
+        """Send the events to the controller if this is a pytest-xdist worker, otherwise write the trace file."""
+        if hasattr(self.config, "workeroutput"):
+            self.config.workeroutput[WORKEROUTPUT_KEY] = self.events
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps({"traceEvents": self.events, "displayTimeUnit": "ms"}))
+
+    def pytest_terminal_summary(self, terminalreporter: pytest.TerminalReporter) -> None:
+        terminalreporter.write_line(f"ipynb2: trace written to {self.path}")
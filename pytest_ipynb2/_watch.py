@@ -0,0 +1,103 @@
+"""Re-run affected test cells whenever a notebook is saved."""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import TYPE_CHECKING
+
+import pytest
+from _pytest._io import TerminalWriter
+
+from . import _inprocess
+from ._cellpath import CELL_PREFIX, CellPath
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import Final
+
+    from .plugin import WarmCache
+
+POLL_INTERVAL: Final[float] = 0.5
+"""Seconds between checks for modified notebooks."""
+
+
+class _Collected:
+    """Plugin to record the notebooks collected in a run."""
+
+    def __init__(self) -> None:
+        self.notebooks: set[Path] = set()
+
+    def pytest_collection_finish(self, session: pytest.Session) -> None:
+        for item in session.items:
+            cell = item.getparent(pytest.Module)
+            if cell is not None and isinstance(cell.path, CellPath):
+                self.notebooks.add(cell.path.notebook)
+
+
+class Watch:
+    """
+    Run pytest in-process, then poll the collected notebooks and re-run the test cells affected by each change.
+
+    A test cell is affected if its fingerprint - covering the cell and all code cells above it - has changed. The
+    namespace after each unchanged setup cell is restored from an in-memory snapshot, so only the cells from the first
+    changed cell downwards are executed again.
+    """
+
+    def __init__(self, config: pytest.Config, warm: WarmCache) -> None:
+        self.config = config
+        self.warm = warm
+        self.cwd = config.invocation_params.dir
+        args = [str(arg) for arg in config.invocation_params.args if arg != "--ipynb2-watch"]
+        self.args = args
+        """Arguments for the first run."""
+        self.options = [arg for arg in args if arg not in config.args]
+        """Arguments without any paths or nodeids, for re-runs of specific cells."""
+        self.mtimes: dict[Path, int] = {}
+        self.fingerprints: dict[Path, dict[int, str]] = {}
+        """Fingerprints of all test cells in each notebook, indexed by cell id."""
+        self.writer = TerminalWriter()
+
+    def loop(self) -> int | pytest.ExitCode:
+        """Watch until interrupted, returning the exit code of the latest run."""
+        collected = _Collected()
+        exitcode = _inprocess.run(self.args, [self.warm, collected], self.cwd)
+        for path in collected.notebooks:
+            self._update(path)
+        try:
+            while True:
+                if exitcode == pytest.ExitCode.INTERRUPTED:
+                    return exitcode
+                self.writer.sep("#", f"ipynb2: watching notebooks for changes: {len(self.mtimes)}, ctrl-c to stop")
+                while not (nodeids := self._affected()):
+                    time.sleep(POLL_INTERVAL)
+                self.writer.sep("#", f"ipynb2: re-running {len(nodeids)} affected test cells")
+                exitcode = _inprocess.run([*self.options, *nodeids], [self.warm], self.cwd)
+        except KeyboardInterrupt:
+            return exitcode
+
+    def _update(self, path: Path) -> None:
+        """Record the modification time and test cell fingerprints of the notebook at `path`."""
+        mtime = path.stat().st_mtime_ns
+        parsed = self.warm.notebooks.get(path, skiptags=self.config.getini("ipynb2_skip_tags"))
+        self.fingerprints[path] = {cellid: parsed.fingerprint(cellid) for cellid in parsed.muggled_testcells.ids()}
+        self.mtimes[path] = mtime
+
+    def _affected(self) -> list[str]:
+        """The nodeids of test cells which are new or have changed since the last check."""
+        affected = []
+        for path, mtime in self.mtimes.items():
+            try:
+                if path.stat().st_mtime_ns == mtime:
+                    continue
+                previous = self.fingerprints[path]
+                self._update(path)
+            except Exception:  # noqa: BLE001, S112 - deleted, or saved part-way, check again next time
+                continue
+            relative = os.path.relpath(path, self.cwd)
+            affected.extend(
+                f"{relative}[{CELL_PREFIX}{cellid}]"
+                for cellid, fingerprint in self.fingerprints[path].items()
+                if previous.get(cellid) != fingerprint
+            )
+        return affected
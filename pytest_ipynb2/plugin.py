@@ -11,7 +11,15 @@ from __future__ import annotations
 import ast
 import importlib.util
 import linecache
+import math
 import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+from contextlib import ExitStack, contextmanager, nullcontext
+from dataclasses import dataclass
 from types import FunctionType, ModuleType
 from typing import TYPE_CHECKING
 
@@ -21,18 +29,301 @@ import _pytest.nodes
 import _pytest.pathlib
 import pytest
 
+from ._capture import DEFAULT_LIMIT, capture
 from ._cellpath import CELL_PREFIX, CellPath
+from ._cells import modulename
+from ._changes import ChangedCells
+from ._checkpoint import CACHE_DIR, Checkpoints
+from ._display import headless
+from ._heavy import HeavyNotebooks
+from ._imports import ImportReport
+from ._marks import markers_from_tags, never_matches, register_markers
+from ._memory import MemoryReport
+from ._parser import HEAVYTAG, SKIPTAGS, NotebookCache, mayhavetests
 from ._parser import Notebook as _ParsedNotebook
+from ._reruns import Reruns
+from ._shared import SharedSetup
+from ._snapshots import Snapshots, copy_namespace, reset_namespace
+from ._subinterpreters import BACKENDS, IsolatedCell, SubinterpreterBackend, unavailable
+from ._threads import ThreadedBuilds
+from ._timeout import SetupTimeout, cellstack, watchdog
+from ._trace import NOTRACE, NoTracer, Tracer
+from ._watch import Watch
 
 if TYPE_CHECKING:
-    from collections.abc import Generator
+    from collections.abc import Generator, Iterable
+    from contextlib import AbstractContextManager
     from pathlib import Path
 
+    import pluggy
+
 
 ipynb2_notebook = pytest.StashKey[_ParsedNotebook]()
 ipynb2_cellid = pytest.StashKey[int]()
 ipynb2_monkeypatches = pytest.StashKey[dict[tuple[ModuleType, str], FunctionType]]()
 """Original functions indexed by `(module, functionname)` to allow `setattr(module, functionname, original)`."""
+ipynb2_changed = pytest.StashKey[ChangedCells]()
+ipynb2_memory = pytest.StashKey[MemoryReport]()
+ipynb2_imports = pytest.StashKey[ImportReport]()
+ipynb2_tracer = pytest.StashKey[NoTracer]()
+"""A `Tracer` if `--ipynb2-trace` was given, otherwise `NOTRACE`."""
+ipynb2_deselected = pytest.StashKey[list[str]]()
+"""Nodeids of cells deselected before collection, so that none of the cells above them were executed."""
+ipynb2_setupfailure = pytest.StashKey["SetupFailure"]()
+"""The first failure of a setup cell in a notebook, stashed on the `Notebook`."""
+ipynb2_checkpoints = pytest.StashKey[Checkpoints]()
+"""Only present if the cacheprovider plugin is active."""
+ipynb2_heavy = pytest.StashKey[HeavyNotebooks]()
+ipynb2_threads = pytest.StashKey[ThreadedBuilds]()
+"""Only present if `--ipynb2-threads`."""
+ipynb2_subinterpreters = pytest.StashKey[SubinterpreterBackend]()
+"""Only present if `--ipynb2-backend=subinterpreter` and subinterpreters are available."""
+ipynb2_building = pytest.StashKey[Future[ModuleType]]()
+"""The cell's module being built on the thread pool, stashed on the `Cell` if `--ipynb2-threads`."""
+ipynb2_sharedsetup = pytest.StashKey[SharedSetup]()
+"""Only present if `--ipynb2-share-setup`."""
+ipynb2_notebookcache = pytest.StashKey[NotebookCache]()
+"""Parsed notebooks kept by a long-lived process, such as the daemon."""
+ipynb2_snapshots = pytest.StashKey[Snapshots]()
+"""Namespaces after each setup cell kept by a long-lived process, such as the daemon."""
+ipynb2_uncheckpointable = pytest.StashKey[set[int]]()
+"""Ids of checkpoint cells whose namespace could not be pickled, stashed on the `Notebook`."""
+ipynb2_outputlimit = pytest.StashKey[int]()
+"""`ipynb2_setup_output_limit`, 0 for no capture."""
+ipynb2_setuptimeouts = pytest.StashKey[tuple[float, float]]()
+"""`ipynb2_setup_timeout` and `ipynb2_notebook_setup_timeout` in seconds, 0 for no timeout."""
+ipynb2_setuptime = pytest.StashKey[float]()
+"""Total time spent executing setup cells in a notebook, stashed on the `Notebook`."""
+ipynb2_setuplock = pytest.StashKey[threading.Lock]()
+"""Guards the `Notebook`'s setup failure, setup time and first executions against cells building on other threads."""
+ipynb2_firstexecs = pytest.StashKey[dict[int, threading.Event]]()
+"""Set once each setup cell has been executed for the first time, stashed on the `Notebook`."""
+ipynb2_setupoutput = pytest.StashKey[list[tuple[str, str]]]()
+"""Report sections with the output captured from a failing setup cell, stashed on the `Cell`."""
+ipynb2_modulesnapshot = pytest.StashKey["dict | None"]()
+"""Copy of the cell's namespace once built, to reset it before re-runs, stashed on the `Cell` if `--ipynb2-reruns`."""
+ipynb2_prefilter = pytest.StashKey[dict[str, int]]()
+"""Number of notebooks which passed ("hits") or failed ("misses") the `%%ipytest` prefilter."""
+ipynb2_itemindex = pytest.StashKey[int]()
+"""Index of an item in `session.items`, stashed on the item, and of the item being run, stashed on the `Config`."""
+ipynb2_lastitem = pytest.StashKey[int]()
+"""Index in `session.items` of the last item in a `Notebook` or `Cell`, stashed on it."""
+ipynb2_linecache_release = pytest.StashKey[list[str]]()
+"""Filenames to remove from `linecache` once all reports for the current item are complete."""
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """Add commandline and ini options."""
+    group = parser.getgroup("ipynb2", "jupyter notebooks")
+    group.addoption(
+        "--ipynb2-changed",
+        action="store_true",
+        default=False,
+        help="only run test cells which have changed, or whose setup cells have changed, since they last passed.",
+    )
+    group.addoption(
+        "--ipynb2-keep-display",
+        action="store_true",
+        default=False,
+        help="let notebook cells render output via display() and matplotlib, instead of using no-op replacements.",
+    )
+    group.addoption(
+        "--ipynb2-memory",
+        action="store_true",
+        default=False,
+        help="measure the memory used by each setup cell and test cell module and report the top consumers.",
+    )
+    group.addoption(
+        "--ipynb2-imports",
+        action="store_true",
+        default=False,
+        help="report the time spent importing modules, attributed to the notebook cell which first imported them.",
+    )
+    group.addoption(
+        "--ipynb2-trace",
+        action="store",
+        default=None,
+        metavar="FILE",
+        help="write a Chrome / Perfetto trace of reading, muggling and executing notebooks and running tests to FILE.",
+    )
+    group.addoption(
+        "--ipynb2-watch",
+        action="store_true",
+        default=False,
+        help="keep running: re-run the test cells affected by each change to a notebook, from the first changed cell.",
+    )
+    group.addoption(
+        "--ipynb2-share-setup",
+        action="store_true",
+        default=False,
+        help="execute the setup cells for each test cell once per run and share the namespace with all xdist workers.",
+    )
+    group.addoption(
+        "--ipynb2-threads",
+        action="store",
+        type=int,
+        default=0,
+        metavar="N",
+        help="execute the cells for a notebook's test cells on N threads, in parallel on free-threaded python.",
+    )
+    group.addoption(
+        "--ipynb2-backend",
+        action="store",
+        choices=BACKENDS,
+        default="inprocess",
+        help="where to run notebooks: in this process, or each in its own subinterpreter (python 3.14+).",
+    )
+    group.addoption(
+        "--ipynb2-reruns",
+        action="store",
+        type=int,
+        default=0,
+        metavar="N",
+        help="re-run failing test cells up to N times, resetting the cell's namespace instead of executing it again.",
+    )
+    parser.addini(
+        "ipynb2_skip_tags",
+        type="linelist",
+        default=list(SKIPTAGS),
+        help="cells with any of these tags in their metadata are not executed before test cells.",
+    )
+    parser.addini(
+        "ipynb2_setup_output_limit",
+        type="string",
+        default=str(DEFAULT_LIMIT),
+        help="characters of stdout & stderr to keep from each setup cell, only shown if the cell fails. 0: no capture.",
+    )
+    parser.addini(
+        "ipynb2_ignore_checkpoints",
+        type="bool",
+        default=True,
+        help="ignore the copies of notebooks which jupyter saves in `.ipynb_checkpoints` directories.",
+    )
+    parser.addini(
+        "ipynb2_setup_timeout",
+        type="string",
+        default="0",
+        help="seconds each execution of a setup cell may take before it is interrupted. 0: no timeout.",
+    )
+    parser.addini(
+        "ipynb2_notebook_setup_timeout",
+        type="string",
+        default="0",
+        help="total seconds all executions of setup cells in a notebook may take before they are interrupted. 0: none.",
+    )
+    parser.addini(
+        "ipynb2_heavy_notebooks",
+        type="linelist",
+        default=[],
+        help=f"globs, relative to the rootdir, of notebooks to treat as if a cell was tagged `{HEAVYTAG}`.",
+    )
+    parser.addini(
+        "ipynb2_heavy_concurrency",
+        type="string",
+        default="1",
+        help="number of heavy notebooks whose cells may be executed at once, across all xdist workers.",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    """Register optional plugins based on commandline options."""
+    config.stash[ipynb2_deselected] = []
+    config.stash[ipynb2_linecache_release] = []
+    config.stash[ipynb2_prefilter] = {"hits": 0, "misses": 0}
+    config.stash[ipynb2_outputlimit] = _outputlimit(config)
+    config.stash[ipynb2_setuptimeouts] = (
+        _timeout(config, "ipynb2_setup_timeout"),
+        _timeout(config, "ipynb2_notebook_setup_timeout"),
+    )
+    if config.getoption("ipynb2_changed"):
+        if not hasattr(config, "cache"):
+            msg = "--ipynb2-changed requires the cacheprovider plugin."
+            raise pytest.UsageError(msg)
+        config.stash[ipynb2_changed] = ChangedCells(config)
+        config.pluginmanager.register(config.stash[ipynb2_changed], "ipynb2-changed")
+    if config.getoption("ipynb2_memory"):
+        config.stash[ipynb2_memory] = MemoryReport()
+        config.pluginmanager.register(config.stash[ipynb2_memory], "ipynb2-memory")
+    if config.getoption("ipynb2_imports"):
+        config.stash[ipynb2_imports] = ImportReport()
+        config.pluginmanager.register(config.stash[ipynb2_imports], "ipynb2-imports")
+    if hasattr(config, "cache"):
+        config.stash[ipynb2_checkpoints] = Checkpoints(config.cache.mkdir(CACHE_DIR))
+    config.stash[ipynb2_heavy] = HeavyNotebooks(config)
+    config.pluginmanager.register(config.stash[ipynb2_heavy], "ipynb2-heavy")
+    if config.getoption("ipynb2_share_setup"):
+        config.stash[ipynb2_sharedsetup] = SharedSetup(config)
+        config.pluginmanager.register(config.stash[ipynb2_sharedsetup], "ipynb2-share-setup")
+    _configure_executors(config)
+    if (reruns := config.getoption("ipynb2_reruns")) > 0:
+        config.pluginmanager.register(Reruns(reruns), "ipynb2-reruns")
+    config.stash[ipynb2_tracer] = NOTRACE
+    if (tracefile := config.getoption("ipynb2_trace")) is not None:
+        tracer = Tracer(config, str(config.invocation_params.dir / tracefile))
+        config.stash[ipynb2_tracer] = tracer
+        config.pluginmanager.register(tracer, "ipynb2-trace")
+
+
+def _outputlimit(config: pytest.Config) -> int:
+    """`ipynb2_setup_output_limit`, which must be an integer and not negative."""
+    value = config.getini("ipynb2_setup_output_limit")
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        msg = f"ipynb2_setup_output_limit must be a non-negative integer, not {value!r}"
+        raise pytest.UsageError(msg)
+    return limit
+
+
+def _timeout(config: pytest.Config, name: str) -> float:
+    """The ini option `name` in seconds, which must be finite and not negative."""
+    value = config.getini(name)
+    try:
+        seconds = float(value)
+    except ValueError:
+        seconds = math.nan
+    if not math.isfinite(seconds) or seconds < 0:
+        msg = f"{name} must be a non-negative number of seconds, not {value!r}"
+        raise pytest.UsageError(msg)
+    return seconds
+
+
+def _configure_executors(config: pytest.Config) -> None:
+    """Register the plugins which execute cells outside the main thread or interpreter, if requested."""
+    if config.getoption("ipynb2_threads") > 0:
+        _configure_threads(config)
+    if config.getoption("ipynb2_backend") == "subinterpreter":
+        _configure_subinterpreters(config)
+
+
+def _configure_threads(config: pytest.Config) -> None:
+    """Register `ThreadedBuilds`, unless measurements of the whole process would be confused by concurrent cells."""
+    if config.getoption("ipynb2_memory") or config.getoption("ipynb2_imports"):
+        msg = "--ipynb2-threads is ignored with --ipynb2-memory or --ipynb2-imports, which measure the whole process"
+        config.issue_config_time_warning(pytest.PytestConfigWarning(msg), stacklevel=2)
+        return
+    config.stash[ipynb2_threads] = ThreadedBuilds(config.getoption("ipynb2_threads"))
+    config.pluginmanager.register(config.stash[ipynb2_threads], "ipynb2-threads")
+
+
+def _configure_subinterpreters(config: pytest.Config) -> None:
+    """Register `SubinterpreterBackend`, or warn why notebooks will be run in-process."""
+    if (reason := unavailable(config)) is not None:
+        msg = f"--ipynb2-backend=subinterpreter is not available, {reason}: running notebooks in-process"
+        config.issue_config_time_warning(pytest.PytestConfigWarning(msg), stacklevel=2)
+        return
+    config.stash[ipynb2_subinterpreters] = SubinterpreterBackend(config)
+    config.pluginmanager.register(config.stash[ipynb2_subinterpreters], "ipynb2-subinterpreters")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_cmdline_main(config: pytest.Config) -> int | pytest.ExitCode | None:
+    """Run in watch mode instead of a single session, if `--ipynb2-watch` was given."""
+    if config.getoption("ipynb2_watch"):
+        return Watch(config, WarmCache()).loop()
+    return None
 
 
 @pytest.hookimpl(tryfirst=True, hookwrapper=True)
@@ -61,14 +352,74 @@ def pytest_sessionstart(session: pytest.Session) -> Generator[None, None, None]:
     yield
 
 
+def pytest_ignore_collect(collection_path: Path, config: pytest.Config) -> bool | None:
+    """Ignore `.ipynb_checkpoints` directories, unless `ipynb2_ignore_checkpoints` is false."""
+    if collection_path.name == ".ipynb_checkpoints" and config.getini("ipynb2_ignore_checkpoints"):
+        return True
+    return None
+
+
 def pytest_collect_file(file_path: Path, parent: pytest.Collector) -> Notebook | None:
-    """Hook implementation to collect jupyter notebooks."""
+    """Hook implementation to collect jupyter notebooks, skipping any which do not contain `%%ipytest`."""
     if file_path.suffix == ".ipynb":
+        prefilter = parent.config.stash[ipynb2_prefilter]
+        if not mayhavetests(file_path):
+            prefilter["misses"] += 1
+            return None
+        prefilter["hits"] += 1
         nodeid = os.fspath(file_path.relative_to(parent.config.rootpath))
+        if (subinterpreters := parent.config.stash.get(ipynb2_subinterpreters, None)) is not None:
+            subinterpreters.submit(file_path)
         return Notebook.from_parent(parent=parent, path=file_path, nodeid=nodeid)
     return None
 
 
+def pytest_report_collectionfinish(config: pytest.Config) -> str | None:
+    """Report cells which were deselected without being collected."""
+    if deselected := config.stash[ipynb2_deselected]:
+        return f"ipynb2: {len(deselected)} cells deselected before collection"
+    return None
+
+
+def pytest_terminal_summary(terminalreporter: pytest.TerminalReporter) -> None:
+    """Report how many notebooks were skipped without parsing them, as they contain no test cells."""
+    prefilter = terminalreporter.config.stash[ipynb2_prefilter]
+    if prefilter["misses"]:
+        notebooks = prefilter["hits"] + prefilter["misses"]
+        terminalreporter.write_line(f"ipynb2: {prefilter['misses']} of {notebooks} notebooks contain no test cells")
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_make_collect_report(collector: pytest.Collector) -> Generator[None, pluggy.Result, None]:
+    """Add any output captured from a failing setup cell to the report."""
+    outcome = yield
+    report: pytest.CollectReport = outcome.get_result()
+    if report.failed and (sections := collector.stash.get(ipynb2_setupoutput, None)) is not None:
+        report.sections.extend(sections)
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_finish(session: pytest.Session) -> None:
+    """Note the last item in each notebook and cell, as other plugins may have reordered the items."""
+    for index, item in enumerate(session.items):
+        item.stash[ipynb2_itemindex] = index
+        if isinstance(item.path, CellPath):
+            for node in item.listchain():
+                if isinstance(node, (Notebook, Cell)):
+                    node.stash[ipynb2_lastitem] = index
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item: pytest.Item) -> Generator[None, None, None]:
+    """Remove the source of finished cells from `linecache`, after any teardown failures have been reported."""
+    item.config.stash[ipynb2_itemindex] = item.stash.get(ipynb2_itemindex, -1)
+    yield
+    release = item.config.stash[ipynb2_linecache_release]
+    for filename in release:
+        linecache.cache.pop(filename, None)
+    release.clear()
+
+
 @pytest.hookimpl(tryfirst=True, hookwrapper=True)  # ensure exeution order after any other plugins
 def pytest_sessionfinish(session: pytest.Session, exitstatus: int | pytest.ExitCode) -> Generator[None, None, None]:  # noqa: ARG001
     """Revert Monkeypatches based on stashed versions."""
@@ -77,15 +428,64 @@ def pytest_sessionfinish(session: pytest.Session, exitstatus: int | pytest.ExitC
         setattr(module, attr, orig)
 
 
+class WarmCache:
+    """Plugin for runs in a long-lived process, to provide the notebooks and snapshots kept from earlier runs."""
+
+    def __init__(self) -> None:
+        """Start with empty caches."""
+        self.notebooks = NotebookCache()
+        self.snapshots = Snapshots()
+
+    def pytest_configure(self, config: pytest.Config) -> None:
+        """Stash the caches for this run."""
+        config.stash[ipynb2_notebookcache] = self.notebooks
+        config.stash[ipynb2_snapshots] = self.snapshots
+
+
 class Notebook(pytest.File):
     """A collector for jupyter notebooks."""
 
-    def collect(self) -> Generator[Cell, None, None]:
-        """Yield `Cell`s for all cells which contain tests."""
-        parsed = _ParsedNotebook(self.path)
+    def collect(self) -> Iterable[Cell | IsolatedCell]:
+        """
+        Collect `Cell`s for all cells which contain tests.
+
+        Tags in a cell's metadata which are valid marker names are registered and added to the `Cell` as markers.
+        Cells which cannot match the `-m` expression based on these markers are deselected before collection.
+        With `--ipynb2-threads`, all cells start building their modules on the thread pool, unless the notebook is
+        tagged as not thread-safe.
+
+        With `--ipynb2-backend=subinterpreter`, yields the cells collected in the notebook's subinterpreter instead,
+        unless the notebook could not be run there.
+        """
+        subinterpreters = self.config.stash.get(ipynb2_subinterpreters, None)
+        if subinterpreters is not None and (isolated := subinterpreters.collect(self)) is not None:
+            return isolated
+        return self._collect_cells()
+
+    def _collect_cells(self) -> Generator[Cell, None, None]:
+        parse = _ParsedNotebook
+        if (notebookcache := self.config.stash.get(ipynb2_notebookcache, None)) is not None:
+            parse = notebookcache.get
+        skiptags = self.config.getini("ipynb2_skip_tags")
+        parsed = parse(self.path, skiptags=skiptags, tracer=self.config.stash[ipynb2_tracer])
+        changed = self.config.stash.get(ipynb2_changed, None)
+        markexpr = self.config.getoption("markexpr")
+        self.stash[ipynb2_setuplock] = threading.Lock()
+        self.stash[ipynb2_firstexecs] = {}
+        cells: list[Cell] = []
         for testcellid in parsed.muggled_testcells.ids():
             name = f"{CELL_PREFIX}{testcellid}"
             nodeid = f"{self.nodeid}[{name}]"
+            markers = markers_from_tags(parsed.celltags[testcellid])
+            if markexpr and never_matches(markexpr, markers):
+                self.config.stash[ipynb2_deselected].append(nodeid)
+                continue
+            if changed is not None:
+                fingerprint = parsed.fingerprint(testcellid)
+                if changed.unchanged(nodeid, fingerprint):
+                    self.config.stash[ipynb2_deselected].append(nodeid)
+                    continue
+                changed.collected(nodeid, fingerprint)
             cell = Cell.from_parent(
                 parent=self,
                 name=name,
@@ -94,7 +494,47 @@ class Notebook(pytest.File):
             )
             cell.stash[ipynb2_notebook] = parsed
             cell.stash[ipynb2_cellid] = testcellid
-            yield cell
+            register_markers(self.config, markers)
+            for marker in markers:
+                cell.add_marker(marker)
+            cells.append(cell)
+        if (threads := self.config.stash.get(ipynb2_threads, None)) is not None and parsed.threadsafe:
+            for cell in cells:
+                cell.stash[ipynb2_building] = threads.submit(cell._build)  # noqa: SLF001
+        yield from cells
+
+    def teardown(self) -> None:
+        """Release the setup cells' source and any failure, once the tests in all cells are finished."""
+        if _runs_again(self):
+            super().teardown()
+            return
+        prefix = f"{self.path}[{CELL_PREFIX}"
+        self.config.stash[ipynb2_linecache_release].extend(
+            filename for filename in linecache.cache if filename.startswith(prefix)
+        )
+        if ipynb2_setupfailure in self.stash:
+            del self.stash[ipynb2_setupfailure]
+        if ipynb2_setuptime in self.stash:
+            del self.stash[ipynb2_setuptime]
+        if ipynb2_uncheckpointable in self.stash:
+            del self.stash[ipynb2_uncheckpointable]
+        super().teardown()
+
+
+def _runs_again(node: Notebook | Cell) -> bool:
+    """Will any items in `node` run after the item being torn down?"""
+    return node.stash.get(ipynb2_lastitem, -1) > node.config.stash.get(ipynb2_itemindex, -1)
+
+
+@dataclass
+class SetupFailure:
+    """The first exception raised by a setup cell (a non-test code cell) in a notebook."""
+
+    cellid: int
+    """The id of the setup cell which raised."""
+    exception: BaseException
+    collecting: str
+    """The nodeid of the test cell which was being collected at the time."""
 
 
 class Cell(CellPath.PytestItemMixin, pytest.Module):
@@ -109,39 +549,342 @@ class Cell(CellPath.PytestItemMixin, pytest.Module):
         """Don't duplicate the word "Cell" in the repr."""
         return f"<{type(self).__name__} {self.stash[ipynb2_cellid]}>"
 
+    def teardown(self) -> None:
+        """
+        Release the cell's namespace and parsed notebook, once the tests in this cell are finished.
+
+        The namespace is cleared, rather than just dereferenced, as the test functions still reference it via their
+        `__globals__`. Unless snapshots are being kept, as classes in the snapshots still reference it.
+
+        Nothing is released if items in this cell are run again later, e.g. after reordering by another plugin.
+        """
+        if _runs_again(self):
+            super().teardown()
+            return
+        if (module := getattr(self, "_obj", None)) is not None:
+            if sys.modules.get(module.__name__) is module:
+                del sys.modules[module.__name__]
+            if ipynb2_snapshots not in self.config.stash:
+                module.__dict__.clear()
+            self._obj = None
+            if (memory := self.config.stash.get(ipynb2_memory, None)) is not None:
+                memory.released_module(self.nodeid, module)
+        self.config.stash[ipynb2_linecache_release].append(str(self.path))
+        if ipynb2_notebook in self.stash:
+            del self.stash[ipynb2_notebook]
+        if ipynb2_modulesnapshot in self.stash:
+            del self.stash[ipynb2_modulesnapshot]
+        super().teardown()
+
+    def reset(self) -> None:
+        """
+        Reset the cell's namespace in place to how it was once built, before a failing test is re-run.
+
+        If the namespace could not be copied, it is reused as the failed test left it.
+        """
+        module = getattr(self, "_obj", None)
+        snapshot = self.stash.get(ipynb2_modulesnapshot, None)
+        if module is not None and snapshot is not None:
+            reset_namespace(module.__dict__, snapshot)
+
     def _getobj(self) -> ModuleType:
+        """The cell's module, from the thread pool if it is being built there."""
+        if (building := self.stash.get(ipynb2_building, None)) is not None:
+            del self.stash[ipynb2_building]
+            if (exception := building.exception()) is None:
+                return building.result()
+            # Drop the thread pool's frames, so that errors are reported as if the module was built here
+            tb = exception.__traceback__
+            while tb is not None and tb.tb_frame.f_code is not Cell._build.__code__:
+                tb = tb.tb_next
+            raise exception.with_traceback(tb or exception.__traceback__)
+        return self._build()
+
+    def _build(self) -> ModuleType:
         """
         The main magic.
 
         - loads the cell's source
         - applies assertion rewriting
-        - creates a pseudo-module for the cell, with a pseudo-filename
-        - executes all non-test code cells above inside the pseudo-module.__dict__
+        - creates a pseudo-module for the cell, with a pseudo-filename, registered in `sys.modules` under an importable
+            name until teardown so that functions and classes from the notebook can be pickled
+        - executes all non-test code cells above inside the pseudo-module.__dict__, unless one of them already failed
+            while collecting an earlier test cell
+        - starting after the last checkpoint cell above whose namespace was saved in the cache, if any, and saving
+            the namespace after each checkpoint cell executed. In a long-lived process, such as the daemon, in-memory
+            snapshots after every setup cell are also used.
         - then executes the test cell inside the pseudo-module.__dict__
+        - for heavy notebooks, the cells are only executed while holding one of the `ipynb2_heavy_concurrency` slots
+            shared by all workers
+        - all cells are executed `headless`, with no-op replacements for `display()` and a non-interactive matplotlib
+            backend, unless `--ipynb2-keep-display` is given
         - finally adds the test cell to the linecache so that inspect can find the source
         """
         notebook = self.stash[ipynb2_notebook]
         cellid = self.stash[ipynb2_cellid]
 
-        cellsabove = [str(cellsource) for cellsource in notebook.muggled_codecells[:cellid]]
+        self._check_setupfailure(cellid)
+
         testcell_source = str(notebook.muggled_testcells[cellid])
 
         cell_filename = str(self.path)
 
-        testcell_ast = ast.parse(testcell_source, filename=cell_filename)
-        _pytest.assertion.rewrite.rewrite_asserts(
-            mod=testcell_ast,
-            source=bytes(testcell_source, encoding="utf-8"),
-            module_path=str(self.path),
-            config=self.config,
-        )
-
-        testcell = compile(testcell_ast, filename=cell_filename, mode="exec")
+        tracer = self.config.stash[ipynb2_tracer]
+        with tracer.span("rewrite", nodeid=self.nodeid):
+            testcell_ast = ast.parse(testcell_source, filename=cell_filename)
+            _pytest.assertion.rewrite.rewrite_asserts(
+                mod=testcell_ast,
+                source=bytes(testcell_source, encoding="utf-8"),
+                module_path=str(self.path),
+                config=self.config,
+            )
+            testcell = compile(testcell_ast, filename=cell_filename, mode="exec")
 
-        dummy_spec = importlib.util.spec_from_loader(f"{self.name}", loader=None)
+        dummy_spec = importlib.util.spec_from_loader(modulename(self.path.notebook, cellid), loader=None)
         dummy_module = importlib.util.module_from_spec(dummy_spec)
-        for cell in cellsabove:
-            exec(cell, dummy_module.__dict__)  # noqa: S102
-        exec(testcell, dummy_module.__dict__)  # noqa: S102
+        sys.modules[dummy_spec.name] = dummy_module
+        keep_display = self.config.getoption("ipynb2_keep_display")
+        measure = self._measure(f"{self.nodeid} (module)")
+        display = headless(dummy_module.__dict__, keep_display=keep_display)
+        with self._unregister_on_error(dummy_module), self._hold_heavy_slot(), measure, display:
+            setupcellids = [codecellid for codecellid in notebook.muggled_codecells.ids() if codecellid < cellid]
+            with self._lock_shared_setup(setupcellids):
+                for setupcellid in setupcellids[self._restore_checkpoint(setupcellids, dummy_module) :]:
+                    with self._first_execution(setupcellid):
+                        self._exec_setupcell(setupcellid, dummy_module)
+                    if setupcellid in notebook.checkpoints:
+                        self._save_checkpoint(setupcellid, dummy_module)
+                    if setupcellid == setupcellids[-1]:
+                        self._share_setup(setupcellid, dummy_module)
+                    self._take_snapshot(setupcellid, dummy_module)
+            with tracer.span("test exec", nodeid=self.nodeid), self._attribute_imports(self.name, dummy_module):
+                exec(testcell, dummy_module.__dict__)  # noqa: S102
+        if self.config.getoption("ipynb2_reruns") > 0:
+            self.stash[ipynb2_modulesnapshot] = copy_namespace(dummy_module.__dict__)
         linecache.cache[cell_filename] = (0, None, testcell_source.splitlines(keepends=True), cell_filename)
         return dummy_module
+
+    @staticmethod
+    @contextmanager
+    def _unregister_on_error(module: ModuleType) -> Generator[None, None, None]:
+        """Remove `module` from `sys.modules` if building it fails, as the cell will not be set up or torn down."""
+        try:
+            yield
+        except BaseException:
+            if sys.modules.get(module.__name__) is module:
+                del sys.modules[module.__name__]
+            raise
+
+    def _exec_setupcell(self, setupcellid: int, module: ModuleType) -> None:
+        """
+        Execute a non-test code cell inside `module.__dict__`.
+
+        The cell gets a pseudo-filename to identify it in tracebacks. Any exception is also stashed on the
+        `Notebook` so that later test cells do not execute the failing cell again.
+
+        Output is captured in bounded buffers and only reported if the cell fails.
+        """
+        source = str(self.stash[ipynb2_notebook].muggled_codecells[setupcellid])
+        cellname = f"{CELL_PREFIX}{setupcellid}"
+        filename = f"{self.path.notebook}[{cellname}]"
+        linecache.cache[filename] = (0, None, source.splitlines(keepends=True), filename)
+        limit = self.config.stash[ipynb2_outputlimit]
+        measure = self._measure(f"{self.parent.nodeid}[{cellname}] (setup for {self.name})")
+        trace = self.config.stash[ipynb2_tracer].span("setup exec", nodeid=f"{self.parent.nodeid}[{cellname}]")
+        timeout, reason = self._setup_timeout()
+        message = f"Setup cell {self.parent.nodeid}[{cellname}] timed out while collecting {self.nodeid} ({reason})"
+        start = time.perf_counter()
+        with measure, trace, self._attribute_imports(cellname, module), capture(limit) as output:
+            try:
+                with watchdog(timeout, message):
+                    exec(compile(source, filename=filename, mode="exec"), module.__dict__)  # noqa: S102
+            except (Exception, SetupTimeout) as exception:
+                with self.parent.stash[ipynb2_setuplock]:
+                    if ipynb2_setupfailure not in self.parent.stash:
+                        self.parent.stash[ipynb2_setupfailure] = SetupFailure(setupcellid, exception, self.nodeid)
+                if output is not None:
+                    self.stash[ipynb2_setupoutput] = output.sections(f"setup {cellname}")
+                if isinstance(exception, SetupTimeout):
+                    stack = cellstack(exception.__traceback__, filename)
+                    msg = f"{message}\nStack (most recent call last):\n{stack}"
+                    raise self.CollectError(msg) from None
+                raise
+            finally:
+                with self.parent.stash[ipynb2_setuplock]:
+                    self.parent.stash[ipynb2_setuptime] = (
+                        self.parent.stash.get(ipynb2_setuptime, 0.0) + time.perf_counter() - start
+                    )
+
+    def _check_setupfailure(self, cellid: int) -> None:
+        """Raise a `CollectError` if a setup cell up to `cellid` already failed, rather than executing it again."""
+        failure = self.parent.stash.get(ipynb2_setupfailure, None)
+        if failure is not None and failure.cellid <= cellid:
+            exception = "".join(traceback.format_exception_only(type(failure.exception), failure.exception)).strip()
+            msg = (
+                f"Setup cell {self.parent.nodeid}[{CELL_PREFIX}{failure.cellid}] failed"
+                f" while collecting {failure.collecting}, not executing it again.\n{exception}"
+            )
+            raise self.CollectError(msg)
+
+    @contextmanager
+    def _first_execution(self, setupcellid: int) -> Generator[None, None, None]:
+        """
+        Let only one thread execute a setup cell for the first time, so that a failing cell is only executed once.
+
+        Cells building on other threads wait for the first execution to finish, then execute the setup cell themselves
+        unless it failed. Once every setup cell has been executed, the threads no longer wait for each other.
+        """
+        with self.parent.stash[ipynb2_setuplock]:
+            firstexecs = self.parent.stash[ipynb2_firstexecs]
+            first = setupcellid not in firstexecs
+            if first:
+                firstexecs[setupcellid] = threading.Event()
+            executed = firstexecs[setupcellid]
+        if not first:
+            executed.wait()
+            self._check_setupfailure(setupcellid)
+        try:
+            yield
+        finally:
+            if first:
+                executed.set()
+
+    def _restore_checkpoint(self, setupcellids: list[int], module: ModuleType) -> int:
+        """
+        Restore the latest snapshot or saved checkpoint.
+
+        Returns:
+            The number of setup cells which no longer need executing.
+        """
+        checkpoints = self.config.stash.get(ipynb2_checkpoints, None)
+        snapshots = self.config.stash.get(ipynb2_snapshots, None)
+        shared = self.config.stash.get(ipynb2_sharedsetup, None)
+        if checkpoints is None and snapshots is None and shared is None:
+            return 0
+        notebook = self.stash[ipynb2_notebook]
+        tracer = self.config.stash[ipynb2_tracer]
+        for idx in reversed(range(len(setupcellids))):
+            setupcellid = setupcellids[idx]
+            if shared is not None:
+                path = shared.path(self.parent.nodeid, setupcellid, notebook.prefix_fingerprint(setupcellid))
+                with tracer.span("restore shared setup", nodeid=self.parent.nodeid, cell=setupcellid):
+                    if shared.restore(path, module.__dict__, lambda cellid: self._exec_setupcell(cellid, module)):
+                        return idx + 1
+            if snapshots is not None:
+                with tracer.span("restore snapshot", nodeid=self.parent.nodeid, cell=setupcellid):
+                    fingerprint = notebook.prefix_fingerprint(setupcellid)
+                    if snapshots.restore(self.parent.nodeid, setupcellid, fingerprint, module.__dict__):
+                        return idx + 1
+            if checkpoints is None or setupcellid not in notebook.checkpoints:
+                continue
+            path = checkpoints.path(self.parent.nodeid, setupcellid, notebook.prefix_fingerprint(setupcellid))
+            with tracer.span("restore checkpoint", nodeid=self.parent.nodeid, cell=setupcellid):
+                if checkpoints.restore(path, module.__dict__):
+                    return idx + 1
+        return 0
+
+    @contextmanager
+    def _hold_heavy_slot(self) -> Generator[None, None, None]:
+        """
+        Hold one of the `ipynb2_heavy_concurrency` slots while executing the cells, if the notebook is heavy.
+
+        The slot is released once the module is built, although the namespace is retained until teardown.
+        """
+        heavy = self.config.stash[ipynb2_heavy]
+        if not heavy.isheavy(self.path.notebook, self.stash[ipynb2_notebook]):
+            yield
+            return
+        with ExitStack() as slot:
+            with self.config.stash[ipynb2_tracer].span("wait for heavy slot", nodeid=self.nodeid):
+                slot.enter_context(heavy.slot())
+            yield
+
+    def _lock_shared_setup(self, setupcellids: list[int]) -> AbstractContextManager:
+        """Lock the shared namespace after the last setup cell while this worker computes it, if sharing setup."""
+        if (shared := self.config.stash.get(ipynb2_sharedsetup, None)) is None or not setupcellids:
+            return nullcontext()
+        fingerprint = self.stash[ipynb2_notebook].prefix_fingerprint(setupcellids[-1])
+        return shared.lock(shared.path(self.parent.nodeid, setupcellids[-1], fingerprint))
+
+    def _share_setup(self, setupcellid: int, module: ModuleType) -> None:
+        """Save the namespace after the last setup cell for other workers, unless already saved or unshareable."""
+        if (shared := self.config.stash.get(ipynb2_sharedsetup, None)) is None:
+            return
+        notebook = self.stash[ipynb2_notebook]
+        path = shared.path(self.parent.nodeid, setupcellid, notebook.prefix_fingerprint(setupcellid))
+        if path.exists() or not shared.shareable(path):
+            return
+        bindings = {
+            codecellid: notebook.muggled_codecells[codecellid].bindings
+            for codecellid in notebook.muggled_codecells.ids()
+            if codecellid <= setupcellid
+        }
+        with self.config.stash[ipynb2_tracer].span("share setup", nodeid=self.parent.nodeid, cell=setupcellid):
+            unpicklable, reexecute = shared.save(path, module.__dict__, bindings)
+        if reexecute is None:
+            msg = (
+                f"Cannot share the setup of {self.nodeid}, unable to pickle: {', '.join(unpicklable)}."
+                " Executing the setup cells on each worker instead."
+            )
+            self.parent.warn(pytest.PytestWarning(msg))
+        elif reexecute:
+            cells = ", ".join(f"{CELL_PREFIX}{cellid}" for cellid in reexecute)
+            msg = (
+                f"Cannot share all of the setup of {self.nodeid}, unable to pickle: {', '.join(unpicklable)}."
+                f" Executing {cells} again after restoring the rest instead."
+            )
+            self.parent.warn(pytest.PytestWarning(msg))
+
+    def _take_snapshot(self, setupcellid: int, module: ModuleType) -> None:
+        """Keep a copy of the namespace after a setup cell, if snapshots are being kept and there isn't one already."""
+        if (snapshots := self.config.stash.get(ipynb2_snapshots, None)) is None:
+            return
+        key = (self.parent.nodeid, setupcellid, self.stash[ipynb2_notebook].prefix_fingerprint(setupcellid))
+        if key not in snapshots:
+            with self.config.stash[ipynb2_tracer].span("take snapshot", nodeid=self.parent.nodeid, cell=setupcellid):
+                snapshots.take(*key, module.__dict__)
+
+    def _save_checkpoint(self, setupcellid: int, module: ModuleType) -> None:
+        """Save the namespace after a checkpoint cell, unless it is already saved or cannot be pickled."""
+        if (checkpoints := self.config.stash.get(ipynb2_checkpoints, None)) is None:
+            return
+        uncheckpointable = self.parent.stash.setdefault(ipynb2_uncheckpointable, set())
+        notebook = self.stash[ipynb2_notebook]
+        path = checkpoints.path(self.parent.nodeid, setupcellid, notebook.prefix_fingerprint(setupcellid))
+        if setupcellid in uncheckpointable or path.exists():
+            return
+        with self.config.stash[ipynb2_tracer].span("save checkpoint", nodeid=self.parent.nodeid, cell=setupcellid):
+            unpicklable = checkpoints.save(path, module.__dict__)
+        if unpicklable:
+            uncheckpointable.add(setupcellid)
+            msg = (
+                f"Cannot checkpoint {self.parent.nodeid}[{CELL_PREFIX}{setupcellid}],"
+                f" unable to pickle: {', '.join(unpicklable)}"
+            )
+            self.parent.warn(pytest.PytestWarning(msg))
+
+    def _setup_timeout(self) -> tuple[float | None, str]:
+        """The time the next setup cell may take, and the ini option which is the limiting factor."""
+        timeouts: list[tuple[float, str]] = []
+        celltimeout, notebooktimeout = self.config.stash[ipynb2_setuptimeouts]
+        if celltimeout:
+            timeouts.append((celltimeout, f"ipynb2_setup_timeout = {celltimeout:g}s"))
+        if notebooktimeout:
+            remaining = notebooktimeout - self.parent.stash.get(ipynb2_setuptime, 0.0)
+            # a zero timeout would disable the watchdog, so allow a minimal remainder
+            timeouts.append((max(remaining, 1e-6), f"ipynb2_notebook_setup_timeout = {notebooktimeout:g}s"))
+        if not timeouts:
+            return None, ""
+        return min(timeouts)
+
+    def _measure(self, label: str) -> AbstractContextManager:
+        """Measure memory usage if `--ipynb2-memory` was given."""
+        if (memory := self.config.stash.get(ipynb2_memory, None)) is not None:
+            return memory.measure(label)
+        return nullcontext()
+
+    def _attribute_imports(self, cellname: str, module: ModuleType) -> AbstractContextManager:
+        """Record imports made by the cell if `--ipynb2-imports` was given."""
+        if (imports := self.config.stash.get(ipynb2_imports, None)) is not None:
+            return imports.attribute(self.parent.nodeid, f"{self.parent.nodeid}[{cellname}]", module.__dict__)
+        return nullcontext()
@@ -1 +1,9 @@
+import pytest
+
 pytest_plugins = ["pytester", "pytest_ipynb2._pytester_helpers"]
+
+
+@pytest.fixture
+def no_cloudpickle(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Pickle namespaces as if cloudpickle was not installed, for runs in this process."""
+    monkeypatch.setattr("pytest_ipynb2._checkpoint.cloudpickle", None)
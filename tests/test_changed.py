@@ -0,0 +1,84 @@
+from pathlib import Path
+
+import nbformat
+import pytest
+
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "changes": [
+                    "x = 1",
+                    add_ipytest_magic(Path("tests/assets/test_globals.py").read_text()),
+                    "y = 2",
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                ],
+            },
+            args=["--ipynb2-changed"],
+        ),
+    ],
+    indirect=True,
+)
+def test_unchanged_cells_deselected(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=2)
+
+    rerun = example_dir.pytester.runpytest(*example_dir.args)
+    rerun.assert_outcomes()
+    rerun.stdout.fnmatch_lines(["ipynb2: 2 cells deselected before collection"])
+
+    notebook = example_dir.path / "changes.ipynb"
+    nb = nbformat.read(notebook, as_version=4)
+    nb.cells[2].source = "y = 3"
+    nbformat.write(nb, notebook)
+
+    after_change = example_dir.pytester.runpytest(*example_dir.args, "-v")
+    after_change.assert_outcomes(passed=1)
+    after_change.stdout.fnmatch_lines(
+        [
+            "ipynb2: 1 cells deselected before collection",
+            "*[[]Cell3[]]::test_pass PASSED*",
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "failing": [
+                    add_ipytest_magic(Path("tests/assets/test_failing.py").read_text()),
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                ],
+            },
+            args=["--ipynb2-changed"],
+        ),
+    ],
+    indirect=True,
+)
+def test_failed_cells_rerun(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=1, failed=1)
+
+    rerun = example_dir.pytester.runpytest(*example_dir.args)
+    rerun.assert_outcomes(failed=1)
+    rerun.stdout.fnmatch_lines(["ipynb2: 1 cells deselected before collection"])
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={"passing": [add_ipytest_magic(Path("tests/assets/test_passing.py").read_text())]},
+        ),
+    ],
+    indirect=True,
+)
+def test_changed_not_requested(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=1)
+    rerun = example_dir.pytester.runpytest()
+    rerun.assert_outcomes(passed=1)
+    rerun.stdout.no_fnmatch_line("ipynb2:*")
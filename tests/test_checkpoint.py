@@ -0,0 +1,118 @@
+import pytest
+
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic, add_tags
+
+record_execution = "open('executions.txt', 'a').write('{cell}')\n"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "checkpoints": [
+                    "# ipynb2: checkpoint\nimport math\n" + record_execution.format(cell=0) + "data = [math.pi] * 3",
+                    add_ipytest_magic("def test_data():\n    assert data == [math.pi] * 3"),
+                    add_tags(record_execution.format(cell=2) + "extra = len(data)", "ipynb2-checkpoint"),
+                    add_ipytest_magic("def test_extra():\n    assert extra == 3"),
+                    record_execution.format(cell=4),
+                    add_ipytest_magic("def test_data_again():\n    assert data[0] == math.pi"),
+                ],
+            },
+        ),
+    ],
+    indirect=True,
+)
+def test_checkpoints(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=3)
+    assert (example_dir.path / "executions.txt").read_text() == "024"
+    example_dir.pytester.runpytest().assert_outcomes(passed=3)
+    assert (example_dir.path / "executions.txt").read_text() == "0244"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "unpicklable": [
+                    "# ipynb2: checkpoint\n" + record_execution.format(cell=0) + "x = 1\nf = lambda: x",
+                    add_ipytest_magic("def test_f():\n    assert f() == 1"),
+                    add_ipytest_magic("def test_x():\n    assert x == 1"),
+                ],
+            },
+        ),
+    ],
+    indirect=True,
+)
+@pytest.mark.usefixtures("no_cloudpickle")
+def test_unpicklable(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=2, warnings=1)
+    example_dir.runresult.stdout.fnmatch_lines(["*Cannot checkpoint unpicklable.ipynb[[]Cell0], unable to pickle: f"])
+    assert (example_dir.path / "executions.txt").read_text() == "00"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "defined": [
+                    "# ipynb2: checkpoint\n" + record_execution.format(cell=0) + "def f():\n    return 1",
+                    add_ipytest_magic("def test_f():\n    assert f() == 1"),
+                ],
+            },
+        ),
+    ],
+    indirect=True,
+)
+@pytest.mark.usefixtures("no_cloudpickle")
+def test_notebook_function_unpicklable(example_dir: ExampleDir):
+    """Functions defined in a notebook would pickle by reference to their cell module, which rebuilds the notebook."""
+    example_dir.runresult.assert_outcomes(passed=1, warnings=1)
+    example_dir.runresult.stdout.fnmatch_lines(["*Cannot checkpoint defined.ipynb[[]Cell0], unable to pickle: f"])
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "defined": [
+                    "# ipynb2: checkpoint\n"
+                    + record_execution.format(cell=0)
+                    + "x = 1\nf = lambda: x\n\ndef g():\n    return f()",
+                    add_ipytest_magic("def test_f():\n    assert f() == 1"),
+                    add_ipytest_magic("def test_g():\n    assert g() == 1"),
+                ],
+            },
+        ),
+    ],
+    indirect=True,
+)
+def test_notebook_function_cloudpickled(example_dir: ExampleDir):
+    pytest.importorskip("cloudpickle")
+    example_dir.runresult.assert_outcomes(passed=2)
+    assert (example_dir.path / "executions.txt").read_text() == "0"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "rebound": [
+                    "# ipynb2: checkpoint\n" + record_execution.format(cell=0) + "x = 1\n\ndef f():\n    return x",
+                    add_ipytest_magic("def test_before():\n    assert f() == 1"),
+                    "x = 2",
+                    add_ipytest_magic("def test_after():\n    assert f() == 2"),
+                ],
+            },
+        ),
+    ],
+    indirect=True,
+)
+def test_restored_functions_see_later_cells(example_dir: ExampleDir):
+    pytest.importorskip("cloudpickle")
+    example_dir.runresult.assert_outcomes(passed=2)
+    assert (example_dir.path / "executions.txt").read_text() == "0"
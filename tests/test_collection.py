@@ -5,7 +5,8 @@ import pytest
 
 import pytest_ipynb2
 import pytest_ipynb2.plugin
-from pytest_ipynb2._pytester_helpers import CollectionTree, ExampleDir, ExampleDirSpec
+from pytest_ipynb2._cellpath import CellPath
+from pytest_ipynb2._pytester_helpers import CollectionTree, ExampleDir, ExampleDirSpec, add_ipytest_magic
 
 if TYPE_CHECKING:
     from pytest_ipynb2.plugin import Cell
@@ -182,3 +183,90 @@ def test_cellmodule_contents(example_dir: ExampleDir):
     expected_attrs = ["x", "y", "adder", "@py_builtins", "@pytest_ar", "test_adder", "test_globals"]
     public_attrs = [attr for attr in cell._obj.__dict__ if not attr.startswith("__")]  # noqa: SLF001
     assert public_attrs == expected_attrs
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        pytest.param(
+            ExampleDirSpec(
+                notebooks={
+                    "tests": ["x = 1", add_ipytest_magic("def test_x():\n    assert x == 1")],
+                    "notests": ["x = 1", "# mentions ipytest, but not %%ipy-test"],
+                    "empty": [],
+                },
+            ),
+            id="Prefilter",
+        ),
+    ],
+    indirect=True,
+)
+def test_prefilter(example_dir: ExampleDir):
+    assert [item.nodeid for item in example_dir.items] == ["tests.ipynb[Cell1]::test_x"]
+    example_dir.runresult.assert_outcomes(passed=1)
+    example_dir.runresult.stdout.fnmatch_lines(["ipynb2: 2 of 3 notebooks contain no test cells"])
+
+
+@pytest.mark.parametrize(
+    ["example_dir", "expected"],
+    [
+        pytest.param(
+            ExampleDirSpec(
+                ini="norecursedirs = build",
+                notebooks={"tests": [add_ipytest_magic("def test_pass():\n    pass")]},
+            ),
+            1,
+            id="ignored",
+        ),
+        pytest.param(
+            ExampleDirSpec(
+                ini="norecursedirs = build\nipynb2_ignore_checkpoints = false",
+                notebooks={"tests": [add_ipytest_magic("def test_pass():\n    pass")]},
+            ),
+            2,
+            id="collected",
+        ),
+    ],
+    indirect=["example_dir"],
+)
+def test_ipynb_checkpoints(example_dir: ExampleDir, expected: int):
+    checkpoints = example_dir.path / ".ipynb_checkpoints"
+    checkpoints.mkdir(exist_ok=True)
+    (checkpoints / "tests-checkpoint.ipynb").write_bytes((example_dir.path / "tests.ipynb").read_bytes())
+    example_dir.runresult.assert_outcomes(passed=expected)
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        pytest.param(
+            ExampleDirSpec(
+                notebooks={
+                    "parametrized": [
+                        add_ipytest_magic(
+                            "\n".join(
+                                [
+                                    "import pytest",
+                                    "@pytest.mark.parametrize('n', range(3))",
+                                    "def test_n(n):",
+                                    "    pass",
+                                ],
+                            ),
+                        ),
+                        add_ipytest_magic("def test_other():\n    pass"),
+                    ],
+                },
+            ),
+            id="Parametrized",
+        ),
+    ],
+    indirect=True,
+)
+def test_reblessed_classes_shared(example_dir: ExampleDir):
+    itemtypes = {type(item) for item in example_dir.items}
+    assert len(example_dir.items) == 4
+    assert len(itemtypes) == 1
+    [itemtype] = itemtypes
+    assert issubclass(itemtype, pytest.Function)
+    assert issubclass(itemtype, CellPath.PytestItemMixin)
+    assert example_dir.items[0].reportinfo()[2] == "Cell0::test_n[0]"
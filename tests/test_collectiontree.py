@@ -133,3 +133,126 @@ def test_no_items():
     expected_msg = "Items list is empty."
     with pytest.raises(ValueError, match=expected_msg):
         CollectionTree.from_items([])
+
+
+def test_from_items_mixed_depth(pytester: pytest.Pytester):
+    pytester.makepyfile(
+        test_mixed="""
+        class TestClass:
+            def test_method(self):
+                pass
+
+        def test_function():
+            pass
+        """,
+    )
+    tree = CollectionTree.from_items(pytester.genitems([pytester.getpathnode(pytester.path)]))
+    expected = {
+        ("<Session  exitstatus='<UNSET>' testsfailed=0 testscollected=0>", pytest.Session): {
+            (f"<Dir {pytester.path.name}>", pytest.Dir): {
+                ("<Module test_mixed.py>", pytest.Module): {
+                    ("<Class TestClass>", pytest.Class): {
+                        ("<Function test_method>", pytest.Function): None,
+                    },
+                    ("<Function test_function>", pytest.Function): None,
+                },
+            },
+        },
+    }
+    assert tree == CollectionTree.from_dict(expected)
+
+
+def test_from_items_many(pytester: pytest.Pytester):
+    pytester.makepyfile(
+        test_many="""
+        import pytest
+
+        @pytest.mark.parametrize("n", range(5000))
+        def test_n(n):
+            pass
+        """,
+    )
+    tree = CollectionTree.from_items(pytester.genitems([pytester.getpathnode(pytester.path)]))
+    [directory] = tree.children
+    [module] = directory.children
+    assert [repr(function.node) for function in module.children] == [f"<Function test_n[{n}]>" for n in range(5000)]
+
+
+@pytest.fixture
+def two_module_tree() -> dict:
+    return {
+        ("<Session  exitstatus='<UNSET>' testsfailed=0 testscollected=0>", pytest.Session): {
+            ("<Dir tests>", pytest.Dir): {
+                ("<Module test_module.py>", pytest.Module): {
+                    ("<Function test_adder>", pytest.Function): None,
+                },
+                ("<Module test_othermodule.py>", pytest.Module): {
+                    ("<Function test_adder>", pytest.Function): None,
+                    ("<Function test_globals>", pytest.Function): None,
+                },
+            },
+        },
+    }
+
+
+def test_diff_equal(two_module_tree: dict):
+    assert CollectionTree.from_dict(two_module_tree).diff(CollectionTree.from_dict(two_module_tree)) == []
+
+
+def test_diff_node(two_module_tree: dict):
+    tree = CollectionTree.from_dict(two_module_tree)
+    module = two_module_tree[next(iter(two_module_tree))][("<Dir tests>", pytest.Dir)]
+    module[("<Module test_othermodule.py>", pytest.Module)] = {("<Function test_other>", pytest.Function): None}
+    assert tree.diff(CollectionTree.from_dict(two_module_tree)) == [
+        "First difference below:",
+        "<Session  exitstatus='<UNSET>' testsfailed=0 testscollected=0> (<class '_pytest.main.Session'>)",
+        "    <Dir tests> (<class '_pytest.main.Dir'>)",
+        "        <Module test_othermodule.py> (<class '_pytest.python.Module'>)",
+        "Left:",
+        "    <Function test_adder> (<class '_pytest.python.Function'>)",
+        "Right:",
+        "    <Function test_other> (<class '_pytest.python.Function'>)",
+    ]
+
+
+def test_diff_missing(two_module_tree: dict):
+    tree = CollectionTree.from_dict(two_module_tree)
+    module = two_module_tree[next(iter(two_module_tree))][("<Dir tests>", pytest.Dir)]
+    del module[("<Module test_othermodule.py>", pytest.Module)]
+    assert tree.diff(CollectionTree.from_dict(two_module_tree))[-6:] == [
+        "Left:",
+        "    <Module test_othermodule.py> (<class '_pytest.python.Module'>)",
+        "        <Function test_adder> (<class '_pytest.python.Function'>)",
+        "        <Function test_globals> (<class '_pytest.python.Function'>)",
+        "Right:",
+        "    (missing)",
+    ]
+
+
+def test_assertion_message(pytester: pytest.Pytester):
+    pytester.makeconftest('pytest_plugins = ["pytest_ipynb2._pytester_helpers"]')
+    pytester.makepyfile(
+        test_trees="""
+        import pytest
+        from pytest_ipynb2._pytester_helpers import CollectionTree
+
+        def test_trees():
+            session = ("<Session>", pytest.Session)
+            left = CollectionTree.from_dict({session: {("<Function a>", pytest.Function): None}})
+            right = CollectionTree.from_dict({session: {("<Function b>", pytest.Function): None}})
+            assert left == right
+        """,
+    )
+    result = pytester.runpytest()
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines(
+        [
+            "E*CollectionTrees are not equal",
+            "E*First difference below:",
+            "E*<Session> (<class '_pytest.main.Session'>)",
+            "E*Left:",
+            "E*<Function a> (<class '_pytest.python.Function'>)",
+            "E*Right:",
+            "E*<Function b> (<class '_pytest.python.Function'>)",
+        ],
+    )
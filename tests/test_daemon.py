@@ -0,0 +1,58 @@
+import sys
+
+import nbformat
+import pytest
+
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the daemon requires unix sockets")
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "warm": [
+                    (
+                        "open('executions.txt', 'a').write('.')\nx = [1, 2]\n\n"
+                        "def double():\n    return [i * 2 for i in x]"
+                    ),
+                    add_ipytest_magic("def test_double():\n    x.append(3)\n    assert double() == [2, 4, 6]"),
+                ],
+            },
+        ),
+    ],
+    indirect=True,
+)
+def test_daemon(example_dir: ExampleDir, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("PYTEST_IPYNB2_SOCKET", str(example_dir.path / "daemon.sock"))
+    executions = example_dir.path / "executions.txt"
+
+    def forward(*args: str) -> pytest.RunResult:
+        return example_dir.pytester.run(sys.executable, "-m", "pytest_ipynb2._forward", *args, timeout=60)
+
+    try:
+        first = forward()
+        first.assert_outcomes(passed=1)
+        assert first.ret == pytest.ExitCode.OK
+        assert executions.read_text() == "."
+
+        forward().assert_outcomes(passed=1)
+        assert executions.read_text() == ".", "setup cell should be restored from a snapshot"
+
+        notebook = nbformat.read(example_dir.path / "warm.ipynb", as_version=4)
+        notebook.cells[1].source = notebook.cells[1].source.replace("[2, 4, 6]", "[]")
+        nbformat.write(notebook, example_dir.path / "warm.ipynb")
+        failed = forward()
+        failed.assert_outcomes(failed=1)
+        assert failed.ret == pytest.ExitCode.TESTS_FAILED
+        assert executions.read_text() == ".", "setup cell is unchanged"
+
+        notebook.cells[0].source = notebook.cells[0].source.replace("[1, 2]", "[1]")
+        nbformat.write(notebook, example_dir.path / "warm.ipynb")
+        forward().assert_outcomes(failed=1)
+        assert executions.read_text() == "..", "setup cell has changed"
+    finally:
+        assert forward("stop").ret == 0
+    assert not (example_dir.path / "daemon.sock").exists()
@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import nbformat
+import pytest
+
+from pytest_ipynb2._pytester_helpers import ExampleDirSpec, ExampleDirStore, add_ipytest_magic, add_tags
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> ExampleDirStore:
+    return ExampleDirStore(tmp_path / "store", examples=Path("tests/assets").absolute())
+
+
+def test_created_once(store: ExampleDirStore):
+    spec = ExampleDirSpec(notebooks={"nb": ["x = 1", add_ipytest_magic("def test_x():\n    assert x == 1")]})
+    created = store.get(spec)
+    mtime = (created / "nb.ipynb").stat().st_mtime_ns
+    same = ExampleDirSpec(notebooks={"nb": ["x = 1", add_ipytest_magic("def test_x():\n    assert x == 1")]})
+    assert store.get(same) == created
+    assert (created / "nb.ipynb").stat().st_mtime_ns == mtime
+    assert list(store.path.iterdir()) == [created]
+
+
+def test_contents(store: ExampleDirStore):
+    spec = ExampleDirSpec(
+        path=Path("notebooks"),
+        conftest="import pytest\n",
+        ini="addopts = -v",
+        files=[Path("test_module.py")],
+        notebooks={"nb": [add_tags("x = 1", "slow")]},
+    )
+    created = store.get(spec)
+    assert (created / "conftest.py").read_text() == "import pytest"
+    assert (created / "tox.ini").read_text() == "[pytest]\naddopts = -v"
+    assert (created / "test_module.py").read_bytes() == Path("tests/assets/test_module.py").read_bytes()
+    notebook = nbformat.read(created / "notebooks" / "nb.ipynb", as_version=4)
+    assert notebook.cells[0].metadata["tags"] == ["slow"]
+
+
+@pytest.mark.parametrize(
+    "other",
+    [
+        pytest.param(ExampleDirSpec(notebooks={"nb": ["x = 2"]}), id="source"),
+        pytest.param(ExampleDirSpec(notebooks={"nb": [add_tags("x = 1", "slow")]}), id="tags"),
+        pytest.param(ExampleDirSpec(notebooks={"other": ["x = 1"]}), id="name"),
+        pytest.param(ExampleDirSpec(path=Path("sub"), notebooks={"nb": ["x = 1"]}), id="path"),
+    ],
+)
+def test_content_addressed(store: ExampleDirStore, other: ExampleDirSpec):
+    assert store.get(ExampleDirSpec(notebooks={"nb": ["x = 1"]})) != store.get(other)
+
+
+def test_file_contents_addressed(tmp_path: Path):
+    (tmp_path / "test_file.py").write_text("def test_one(): pass")
+    store = ExampleDirStore(tmp_path / "store", examples=tmp_path)
+    spec = ExampleDirSpec(files=[Path("test_file.py")])
+    before = store.get(spec)
+    (tmp_path / "test_file.py").write_text("def test_two(): pass")
+    after = store.get(spec)
+    assert before != after
+    assert (after / "test_file.py").read_text() == "def test_two(): pass"
+
+
+def test_concurrent_creation(store: ExampleDirStore, monkeypatch: pytest.MonkeyPatch):
+    """Another worker finishes creating the same directory first: use theirs and remove our partial copy."""
+    spec = ExampleDirSpec(notebooks={"nb": ["x = 1"]})
+    create = ExampleDirStore._create  # noqa: SLF001
+
+    def other_worker_first(self: ExampleDirStore, example: ExampleDirSpec, directory: Path) -> None:
+        create(self, example, directory)
+        theirs = self.path / self.digest(example)
+        theirs.mkdir()
+        (theirs / "worker").write_text("other")
+
+    monkeypatch.setattr(ExampleDirStore, "_create", other_worker_first)
+    created = store.get(spec)
+    assert (created / "worker").read_text() == "other"
+    assert list(store.path.iterdir()) == [created]
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import importlib.util
+import linecache
 import re
 from dataclasses import dataclass, field
 from pathlib import Path
 
 import pytest
 
-from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic
+import pytest_ipynb2.plugin
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic, add_tags
 
 LINESTART = "^"
 LINEEND = "$"
@@ -307,6 +310,38 @@ parametrized = pytest.mark.parametrize(
             ),
             id="Subdirectory verbose",
         ),
+        pytest.param(
+            ExampleDirSpec(
+                notebooks={
+                    "skiptags": [
+                        "x = 1",
+                        add_tags("x = 2\nraise RuntimeError('Expensive plot')", "ipynb2-skip"),
+                        add_ipytest_magic(Path("tests/assets/test_globals.py").read_text()),
+                    ],
+                },
+            ),
+            ExpectedResults(
+                outcomes={"passed": 1},
+            ),
+            id="Cell tagged ipynb2-skip",
+        ),
+        pytest.param(
+            ExampleDirSpec(
+                notebooks={
+                    "skiptags": [
+                        "x = 1",
+                        add_tags("raise RuntimeError('Expensive report')", "export"),
+                        add_tags("raise RuntimeError('Expensive download')", "parameters", "download"),
+                        add_ipytest_magic(Path("tests/assets/test_globals.py").read_text()),
+                    ],
+                },
+                ini="ipynb2_skip_tags =\n    export\n    download",
+            ),
+            ExpectedResults(
+                outcomes={"passed": 1},
+            ),
+            id="Configured skip tags",
+        ),
     ],
     indirect=["example_dir"],
 )
@@ -377,3 +412,287 @@ def test_failures(example_dir: ExampleDir, expected_results: ExpectedResults):
         results.stdout.re_match_lines(regexes, consecutive=True)
     else:
         assert re.search(f"{LINESTART}{regexes[0]}{LINEEND}", str(results.stdout), flags=re.MULTILINE) is None
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "setupfails": [
+                    "x = 1",
+                    "\n".join(
+                        [
+                            "with open('executions.txt', 'a') as log:",
+                            "    log.write('.')",
+                            "raise ValueError('expensive failure')",
+                        ],
+                    ),
+                    add_ipytest_magic(Path("tests/assets/test_globals.py").read_text()),
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                ],
+            },
+        ),
+    ],
+    indirect=True,
+)
+def test_setupcell_failure_not_repeated(example_dir: ExampleDir):
+    results = example_dir.runresult
+    results.assert_outcomes(errors=3)
+    results.stdout.re_match_lines(
+        [
+            f"{LINESTART}[_]* ERROR collecting setupfails.ipynb{re.escape('[Cell2]')} [_]*{LINEEND}",
+            *[
+                f".*{re.escape(line)}"
+                for line in ["raise ValueError('expensive failure')", "ValueError: expensive failure"]
+            ],
+            f"{LINESTART}[_]* ERROR collecting setupfails.ipynb{re.escape('[Cell3]')} [_]*{LINEEND}",
+            re.escape("Setup cell setupfails.ipynb[Cell1] failed while collecting setupfails.ipynb[Cell2]"),
+            re.escape("ValueError: expensive failure"),
+        ],
+    )
+    assert (example_dir.path / "executions.txt").read_text() == "."
+
+
+display_notebook = {
+    "display": [
+        "\n".join(
+            [
+                "from IPython.display import display as show",
+                "display('setup display')",
+                "show('setup show')",
+            ],
+        ),
+        add_ipytest_magic("def test_display():\n    assert display('test display') is None"),
+    ],
+}
+
+
+@pytest.mark.parametrize(
+    ["example_dir", "shown"],
+    [
+        pytest.param(ExampleDirSpec(notebooks=display_notebook, args=["-s"]), False, id="headless"),
+        pytest.param(
+            ExampleDirSpec(
+                notebooks=display_notebook,
+                ini="ipynb2_setup_output_limit = 0",
+                args=["-s", "--ipynb2-keep-display"],
+            ),
+            True,
+            id="keep display",
+        ),
+    ],
+    indirect=["example_dir"],
+)
+def test_display(example_dir: ExampleDir, shown: bool):  # noqa: FBT001
+    example_dir.runresult.assert_outcomes(passed=1)
+    for output in ["setup display", "setup show"]:
+        assert (output in str(example_dir.runresult.stdout)) is shown
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "plots": [
+                    "%matplotlib inline\nimport matplotlib\nimport matplotlib.pyplot as plt",
+                    "plt.plot([1, 2, 3])\nplt.show()",
+                    add_ipytest_magic("def test_backend():\n    assert matplotlib.get_backend() == 'agg'"),
+                ],
+            },
+            args=["-W", "error"],
+        ),
+    ],
+    indirect=True,
+)
+def test_matplotlib_backend(example_dir: ExampleDir, monkeypatch: pytest.MonkeyPatch):
+    pytest.importorskip("matplotlib")
+    monkeypatch.delenv("MPLBACKEND", raising=False)
+    example_dir.runresult.assert_outcomes(passed=1)
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            conftest="import matplotlib\n\nmatplotlib.use('svg')",
+            files=[Path("tests/assets/test_passing.py")],
+            notebooks={
+                "plots": [
+                    "import matplotlib\n\nbackend = matplotlib.get_backend()",
+                    add_ipytest_magic("def test_backend():\n    assert backend == 'agg'"),
+                ],
+            },
+        ),
+    ],
+    indirect=True,
+)
+def test_matplotlib_backend_restored(example_dir: ExampleDir, monkeypatch: pytest.MonkeyPatch):
+    if importlib.util.find_spec("matplotlib") is None:  # don't import it: an earlier inline run may have unloaded numpy
+        pytest.skip("could not import 'matplotlib'")
+    monkeypatch.delenv("MPLBACKEND", raising=False)
+    (example_dir.path / "test_restored.py").write_text(
+        "import matplotlib\n\ndef test_restored():\n    assert matplotlib.get_backend() == 'svg'",
+    )
+    # In a subprocess: the conftest changes matplotlib's global backend
+    example_dir.pytester.runpytest_subprocess().assert_outcomes(passed=3)
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            files=[Path("tests/assets/test_passing.py")],
+            notebooks={
+                "plots": [
+                    "import matplotlib\n\nbackend = matplotlib.get_backend()",
+                    add_ipytest_magic("def test_backend():\n    assert backend == 'agg'"),
+                ],
+            },
+        ),
+    ],
+    indirect=True,
+)
+def test_matplotlib_imported_by_cell_restored(example_dir: ExampleDir, monkeypatch: pytest.MonkeyPatch):
+    if importlib.util.find_spec("matplotlib") is None:  # don't import it: an earlier inline run may have unloaded numpy
+        pytest.skip("could not import 'matplotlib'")
+    monkeypatch.delenv("MPLBACKEND", raising=False)
+    (example_dir.path / "matplotlibrc").write_text("backend: svg")
+    (example_dir.path / "test_restored.py").write_text(
+        "import matplotlib\n\ndef test_restored():\n    assert matplotlib.get_backend() == 'svg'",
+    )
+    # In a subprocess: matplotlib is first imported by a cell, which sets its backend via `MPLBACKEND`
+    example_dir.pytester.runpytest_subprocess().assert_outcomes(passed=3)
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "output": [
+                    "for line in range(100):\n    print(f'progress {line}')",
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                    "import sys\nprint('loading', file=sys.stderr)\nprint('x' * 30)\nraise ValueError('failed')",
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                ],
+            },
+            ini="ipynb2_setup_output_limit = 20",
+            args=["-s"],
+        ),
+    ],
+    indirect=True,
+)
+def test_setupcell_output(example_dir: ExampleDir):
+    results = example_dir.runresult
+    results.assert_outcomes(errors=1)
+    results.stdout.no_fnmatch_line("progress *")
+    results.stdout.fnmatch_lines(
+        [
+            "*ValueError: failed",
+            "*- Captured stdout setup Cell2 -*",
+            "[[]... 11 characters truncated ...[]]",
+            "xxxxxxxxxxxxxxxxxxx",
+            "*- Captured stderr setup Cell2 -*",
+            "loading",
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "output": [
+                    "print('progress')\nraise ValueError('failed')",
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                ],
+            },
+            ini="ipynb2_setup_output_limit = 0",
+            args=["-s"],
+        ),
+    ],
+    indirect=True,
+)
+def test_setupcell_output_uncaptured(example_dir: ExampleDir):
+    results = example_dir.runresult
+    results.assert_outcomes(errors=1)
+    results.stdout.fnmatch_lines(["progress", "*ValueError: failed"])
+    results.stdout.no_fnmatch_line("*- Captured stdout setup Cell0 -*")
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={"output": [add_ipytest_magic(Path("tests/assets/test_passing.py").read_text())]},
+            ini="ipynb2_setup_output_limit = -1",
+        ),
+    ],
+    indirect=True,
+)
+def test_setupcell_output_negative_limit(example_dir: ExampleDir):
+    assert example_dir.runresult.ret == pytest.ExitCode.USAGE_ERROR
+    example_dir.runresult.stderr.fnmatch_lines(["*ipynb2_setup_output_limit must be a non-negative integer, not '-1'"])
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            conftest="def pytest_collection_modifyitems(items):\n    items[:] = [items[i] for i in (0, 2, 1, 3)]",
+            notebooks={
+                "interleaved": [
+                    "x = 1",
+                    add_ipytest_magic(
+                        "def test_first():\n    assert x == 1\n\ndef test_first_again():\n    assert x == 2",
+                    ),
+                    "y = 2",
+                    add_ipytest_magic("def test_second():\n    assert y == 2\n\ndef test_second_again():\n    pass"),
+                ],
+            },
+            args=["-v"],
+        ),
+    ],
+    indirect=True,
+)
+def test_interleaved_cells(example_dir: ExampleDir):
+    results = example_dir.runresult
+    results.assert_outcomes(passed=3, failed=1)
+    results.stdout.fnmatch_lines(
+        [
+            "*interleaved.ipynb[[]Cell1[]]::test_first PASSED*",
+            "*interleaved.ipynb[[]Cell3[]]::test_second PASSED*",
+            "*interleaved.ipynb[[]Cell1[]]::test_first_again FAILED*",
+            "*interleaved.ipynb[[]Cell3[]]::test_second_again PASSED*",
+            ">       assert x == 2",
+            "E       assert 1 == 2",
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            files=[Path("tests/assets/notebook_2tests.ipynb").absolute()],
+        ),
+    ],
+    indirect=True,
+)
+def test_namespaces_released(example_dir: ExampleDir):
+    reprec = example_dir.pytester.inline_run(example_dir.path)
+    reprec.assertoutcome(passed=3)
+    items = [call.item for call in reprec.getcalls("pytest_runtest_protocol")]
+    cells = {item.parent for item in items}
+    assert len(cells) == 2
+    for cell in cells:
+        assert cell._obj is None  # noqa: SLF001
+        assert pytest_ipynb2.plugin.ipynb2_notebook not in cell.stash
+    for item in items:
+        assert item.obj.__globals__ == {}
+    notebook = example_dir.path / "notebook_2tests.ipynb"
+    assert not [filename for filename in linecache.cache if filename.startswith(f"{notebook}[")]
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from pytest_ipynb2._locks import FileSemaphore
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic, add_tags
+
+conftest = "\n".join(
+    [
+        "from pathlib import Path",
+        "",
+        "from pytest_ipynb2.plugin import ipynb2_heavy",
+        "",
+        "def pytest_sessionstart(session):",
+        "    Path('slots.txt').write_text(str(session.config.stash[ipynb2_heavy].semaphore.directory))",
+    ],
+)
+
+record_slot = "\n".join(
+    [
+        "from pathlib import Path",
+        "from pytest_ipynb2._locks import _lock",
+        "",
+        "slots = Path(Path('slots.txt').read_text())",
+        "held = False",
+        "if slots.exists():",
+        "    with (slots / 'slot0.lock').open('a+b') as file:",
+        "        held = not _lock(file, blocking=False)",
+    ],
+)
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        pytest.param(
+            ExampleDirSpec(
+                conftest=conftest,
+                notebooks={
+                    "tagged": [
+                        add_tags(record_slot, "ipynb2-heavy"),
+                        add_ipytest_magic("def test_held():\n    assert held"),
+                    ],
+                    "light": [record_slot, add_ipytest_magic("def test_not_held():\n    assert not held")],
+                },
+            ),
+            id="tag",
+        ),
+        pytest.param(
+            ExampleDirSpec(
+                conftest=conftest,
+                ini="ipynb2_heavy_notebooks = heavy_*.ipynb",
+                notebooks={
+                    "heavy_globbed": [record_slot, add_ipytest_magic("def test_held():\n    assert held")],
+                    "light": [record_slot, add_ipytest_magic("def test_not_held():\n    assert not held")],
+                },
+            ),
+            id="glob",
+        ),
+    ],
+    indirect=True,
+)
+def test_heavy_holds_slot(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=2)
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            ini="ipynb2_heavy_concurrency = 0",
+            notebooks={"light": [add_ipytest_magic("def test_pass():\n    pass")]},
+        ),
+    ],
+    indirect=True,
+)
+def test_invalid_concurrency(example_dir: ExampleDir):
+    assert example_dir.runresult.ret == pytest.ExitCode.USAGE_ERROR
+    example_dir.runresult.stderr.fnmatch_lines(["*ipynb2_heavy_concurrency must be a positive integer, not '0'"])
+
+
+@pytest.mark.parametrize("slots", [1, 2])
+def test_semaphore_limits_concurrency(tmp_path, slots: int):
+    semaphore = FileSemaphore(tmp_path / "slots", slots)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def work() -> None:
+        with semaphore.slot() as slot:
+            with lock:
+                active.append(slot)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.remove(slot)
+
+    threads = [threading.Thread(target=work) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == slots
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import pytest
+
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "imports": [
+                    (
+                        "import sys\nfrom pathlib import Path\n\n"
+                        "Path('slowimport.py').write_text('import time\\ntime.sleep(0.2)')\nsys.path.insert(0, '.')"
+                    ),
+                    "import slowimport",
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                    "import slowimport as again",
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                ],
+            },
+            args=["--ipynb2-imports"],
+        ),
+    ],
+    indirect=True,
+)
+def test_import_report(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=2)
+    example_dir.runresult.stdout.re_match_lines(
+        [
+            r"^=+ ipynb2 imports =+$",
+            r"^\d\.\d\ds +1 modules imports\.ipynb$",
+            r"^    \d\.\d\ds +1 modules imports\.ipynb\[Cell1\]: slowimport \(cumulative \d\.\d\ds\)$",
+            r"^=+ 2 passed",
+        ],
+        consecutive=True,
+    )
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={"passing": [add_ipytest_magic(Path("tests/assets/test_passing.py").read_text())]},
+        ),
+    ],
+    indirect=True,
+)
+def test_no_import_report(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=1)
+    example_dir.runresult.stdout.no_fnmatch_line("*ipynb2 imports*")
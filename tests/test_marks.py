@@ -0,0 +1,95 @@
+from pathlib import Path
+
+import pytest
+
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic, add_tags
+
+tagged_notebook = {
+    "tagged": [
+        add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+        "raise RuntimeError('Expensive setup only needed for slow tests')",
+        add_tags(add_ipytest_magic(Path("tests/assets/test_failing.py").read_text()), "slow", "hide-input"),
+    ],
+}
+
+
+@pytest.mark.parametrize(
+    ["example_dir", "outcomes", "deselected_cells"],
+    [
+        pytest.param(
+            ExampleDirSpec(notebooks=tagged_notebook, args=["-m", "not slow"]),
+            {"passed": 1},
+            1,
+            id="deselect tagged cell",
+        ),
+        pytest.param(
+            ExampleDirSpec(notebooks=tagged_notebook, args=["-m", "slow"]),
+            {"errors": 1},
+            0,
+            id="select tagged cell",
+        ),
+        pytest.param(
+            ExampleDirSpec(notebooks=tagged_notebook, args=["-m", "not slow and not gpu"]),
+            {"passed": 1},
+            1,
+            id="unknown marker",
+        ),
+        pytest.param(
+            ExampleDirSpec(notebooks=tagged_notebook, args=["-m", "slow or gpu"]),
+            {"errors": 1},
+            0,
+            id="may match via other markers",
+        ),
+        pytest.param(
+            ExampleDirSpec(notebooks=tagged_notebook),
+            {"errors": 1},
+            0,
+            id="no marker expression",
+        ),
+    ],
+    indirect=["example_dir"],
+)
+def test_tags_as_markers(example_dir: ExampleDir, outcomes: dict[str, int], deselected_cells: int):
+    example_dir.runresult.assert_outcomes(**outcomes)
+    if deselected_cells:
+        example_dir.runresult.stdout.fnmatch_lines([f"ipynb2: {deselected_cells} cells deselected before collection"])
+    else:
+        example_dir.runresult.stdout.no_fnmatch_line("ipynb2: *")
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "tagged": [
+                    add_tags(add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()), "slow"),
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                ],
+            },
+        ),
+    ],
+    indirect=True,
+)
+def test_cell_markers(example_dir: ExampleDir):
+    tagged, untagged = example_dir.items
+    assert [mark.name for mark in tagged.iter_markers()] == ["slow"]
+    assert list(untagged.iter_markers()) == []
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "tagged": [
+                    add_tags(add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()), "parameters"),
+                ],
+            },
+            args=["--strict-markers", "-W", "error::pytest.PytestUnknownMarkWarning"],
+        ),
+    ],
+    indirect=True,
+)
+def test_tags_registered(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=1)
@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import pytest
+
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "memory": [
+                    "x = 1",
+                    "retained = bytearray(20 * 2**20)\ntemporary = bytearray(40 * 2**20)\ndel temporary",
+                    add_ipytest_magic(Path("tests/assets/test_globals.py").read_text()),
+                ],
+            },
+            args=["--ipynb2-memory"],
+        ),
+    ],
+    indirect=True,
+)
+def test_memory_report(example_dir: ExampleDir):
+    # pytester's in-process HookRecorder keeps cell modules alive via `pytest_generate_tests(metafunc)`
+    results = example_dir.pytester.runpytest_subprocess(*example_dir.args)
+    results.assert_outcomes(passed=1)
+    results.stdout.re_match_lines(
+        [
+            r"^=+ ipynb2 memory =+$",
+            r"^peak \+6\d\.\dMiB retained \+2\d\.\dMiB rss \S+ memory\.ipynb\[Cell2\] \(module\)$",
+            r"^peak \+6\d\.\dMiB retained \+2\d\.\dMiB rss \S+ memory\.ipynb\[Cell1\] \(setup for Cell2\)$",
+            r"^peak \S+ retained \S+ rss \S+ memory\.ipynb\[Cell0\] \(setup for Cell2\)$",
+        ],
+        consecutive=True,
+    )
+    results.stdout.no_fnmatch_line("cell modules still alive after teardown:")
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={"passing": [add_ipytest_magic(Path("tests/assets/test_passing.py").read_text())]},
+        ),
+    ],
+    indirect=True,
+)
+def test_no_memory_report(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=1)
+    example_dir.runresult.stdout.no_fnmatch_line("*ipynb2 memory*")
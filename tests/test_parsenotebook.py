@@ -1,9 +1,12 @@
+from __future__ import annotations
+
 from pathlib import Path
 from textwrap import dedent
 
+import nbformat
 import pytest
 
-from pytest_ipynb2._parser import CellSource, Notebook
+from pytest_ipynb2._parser import CellSource, Notebook, mayhavetests
 
 
 @pytest.fixture
@@ -223,3 +226,83 @@ def test_codecells_partial_slice(testnotebook: Notebook):
 def test_muggle(source: list[str], expected: list[str]):
     muggled = CellSource(source).muggled
     assert muggled == CellSource(expected)
+
+
+@pytest.mark.parametrize(
+    ["cell", "source", "changed"],
+    [
+        pytest.param(0, "# A renamed notebook", False, id="markdown cell"),
+        pytest.param(5, "another_function = None", False, id="code cell below"),
+        pytest.param(3, "adder = max", True, id="code cell above"),
+        pytest.param(4, "%%ipytest\n\ndef test_adder(): ...", True, id="test cell"),
+    ],
+)
+def test_fingerprint(tmp_path: Path, cell: int, source: str, changed: bool):  # noqa: FBT001
+    original = Path("tests/assets/notebook.ipynb").absolute()
+    nb = nbformat.read(original, as_version=4)
+    nb.cells[cell].source = source
+    nbformat.write(nb, tmp_path / "notebook.ipynb")
+    edited = Notebook(tmp_path / "notebook.ipynb")
+    assert (edited.fingerprint(4) != Notebook(original).fingerprint(4)) is changed
+
+
+@pytest.mark.parametrize(
+    ["skiptags", "expected"],
+    [
+        pytest.param(None, [3, 5], id="default tags"),
+        pytest.param(["slow"], [1, 5], id="configured tags"),
+        pytest.param([], [1, 3, 5], id="no tags"),
+    ],
+)
+def test_skiptags(tmp_path: Path, skiptags: list[str] | None, expected: list[int]):
+    nb = nbformat.read(Path("tests/assets/notebook.ipynb"), as_version=4)
+    nb.cells[1].metadata["tags"] = ["ipynb2-skip"]
+    nb.cells[3].metadata["tags"] = ["slow", "other"]
+    nbformat.write(nb, tmp_path / "notebook.ipynb")
+    kwargs = {} if skiptags is None else {"skiptags": skiptags}
+    assert list(Notebook(tmp_path / "notebook.ipynb", **kwargs).muggled_codecells.ids()) == expected
+
+
+def test_checkpoints(tmp_path: Path):
+    nb = nbformat.read(Path("tests/assets/notebook.ipynb"), as_version=4)
+    nb.cells[1].metadata["tags"] = ["ipynb2-checkpoint"]
+    nb.cells[3].source = f"# ipynb2: checkpoint\n{nb.cells[3].source}"
+    nbformat.write(nb, tmp_path / "notebook.ipynb")
+    assert Notebook(tmp_path / "notebook.ipynb").checkpoints == {1, 3}
+
+
+@pytest.mark.parametrize(
+    ["contents", "expected"],
+    [
+        pytest.param(b"", False, id="empty"),
+        pytest.param(b'{"cells": [{"source": ["x = 1"]}]}', False, id="no tests"),
+        pytest.param(b'{"cells": [{"source": ["%%ipytest\\n", "def test_x(): pass"]}]}', True, id="tests"),
+    ],
+)
+def test_mayhavetests(tmp_path: Path, contents: bytes, expected: bool):  # noqa: FBT001
+    notebook = tmp_path / "notebook.ipynb"
+    notebook.write_bytes(contents)
+    assert mayhavetests(notebook) is expected
+
+
+def test_mayhavetests_assets():
+    assert mayhavetests(Path("tests/assets/notebook.ipynb"))
+
+
+@pytest.mark.parametrize(
+    ["source", "expected"],
+    [
+        pytest.param("import os.path, numpy as np\nfrom x import y as z, w", {"os", "np", "z", "w"}, id="imports"),
+        pytest.param("a = b = 1\nc, (d, *e) = f\ng += 1\nh: int = 1", {"a", "b", "c", "d", "e", "g", "h"}, id="assign"),
+        pytest.param("def f(x):\n    y = x\n\nclass C:\n    z = 1\n\ng = lambda w: w", {"f", "C", "g"}, id="scopes"),
+        pytest.param("for i in []:\n    j = [k for k in i if (m := k)]", {"i", "j", "m"}, id="comprehension"),
+        pytest.param(
+            "with open('f') as f:\n    pass\ntry:\n    pass\nexcept E as e:\n    pass",
+            {"f", "e"},
+            id="blocks",
+        ),
+        pytest.param("globals()['f'] = 1\nfrom x import *", set(), id="indirect"),
+    ],
+)
+def test_bindings(source: str, expected: set[str]):
+    assert CellSource(source).bindings == expected
@@ -0,0 +1,95 @@
+import multiprocessing
+
+import pytest
+
+from pytest_ipynb2._cells import _decode, modulename
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic
+
+poolcell = "\n".join(
+    [
+        "import multiprocessing",
+        "from concurrent.futures import ProcessPoolExecutor",
+        "",
+        "def cube(x):",
+        "    return x ** 3",
+        "",
+        "def test_pool():",
+        "    context = multiprocessing.get_context('{method}')",
+        "    with ProcessPoolExecutor(max_workers=2, mp_context=context) as pool:",
+        "        assert list(pool.map(square, range(4))) == [0, 1, 4, 9]",
+        "        assert list(pool.map(cube, range(3))) == [0, 1, 8]",
+        "        assert pool.submit(Offset(10).add, 1).result() == 11",
+    ],
+)
+
+setupcell = "\n".join(
+    [
+        "def square(x):",
+        "    return x * x",
+        "",
+        "class Offset:",
+        "    def __init__(self, offset):",
+        "        self.offset = offset",
+        "",
+        "    def add(self, x):",
+        "        return x + self.offset",
+    ],
+)
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        pytest.param(
+            ExampleDirSpec(notebooks={"pool": [setupcell, add_ipytest_magic(poolcell.format(method=method))]}),
+            id=method,
+            marks=pytest.mark.skipif(
+                method not in multiprocessing.get_all_start_methods(),
+                reason=f"{method} is not available",
+            ),
+        )
+        for method in ("fork", "spawn")
+    ],
+    indirect=True,
+)
+def test_process_pool(example_dir: ExampleDir):
+    # In a subprocess: an inline run's copies of modules, e.g. concurrent.futures.process, can't be pickled
+    example_dir.pytester.runpytest_subprocess().assert_outcomes(passed=1)
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            conftest="\n".join(
+                [
+                    "import sys",
+                    "from pathlib import Path",
+                    "",
+                    "def pytest_sessionfinish(session):",
+                    "    cells = [name for name in sys.modules if name.startswith('pytest_ipynb2._cells.')]",
+                    "    Path('leftover.txt').write_text(' '.join(cells))",
+                ],
+            ),
+            notebooks={
+                "registered": [
+                    "import sys",
+                    add_ipytest_magic("def test_registered():\n    assert sys.modules[__name__].test_registered"),
+                ],
+            },
+        ),
+    ],
+    indirect=True,
+)
+def test_registered_during_tests_only(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=1)
+    assert (example_dir.path / "leftover.txt").read_text() == ""
+
+
+def test_modulename_roundtrip(tmp_path):
+    notebook = tmp_path / "dir with spaces" / "nötebook_1.ipynb"
+    name = modulename(notebook, 12)
+    assert name.startswith("pytest_ipynb2._cells.cell12_")
+    assert name.isascii()
+    assert all(part.isidentifier() for part in name.split("."))
+    assert _decode(name) == (notebook, 12)
@@ -0,0 +1,97 @@
+import pytest
+
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic
+
+record_execution = "open('executions.txt', 'a').write('{cell}')\n"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "flaky": [
+                    record_execution.format(cell=0) + "seen = []",
+                    add_ipytest_magic(
+                        "\n".join(
+                            [
+                                record_execution.format(cell=1),
+                                "def test_flaky():",
+                                "    seen.append(1)",
+                                "    with open('attempts.txt', 'a+') as attempts:",
+                                "        attempts.write('.')",
+                                "        attempts.seek(0)",
+                                "        tries = len(attempts.read())",
+                                "    assert seen == [1]",
+                                "    assert tries == 3",
+                                "",
+                                "def test_fails():",
+                                "    assert False",
+                                "",
+                                "def test_passes():",
+                                "    assert seen in ([], [1])",
+                            ],
+                        ),
+                    ),
+                ],
+            },
+            args=["--ipynb2-reruns=2"],
+        ),
+    ],
+    indirect=True,
+)
+def test_reruns(example_dir: ExampleDir):
+    assert example_dir.runresult.parseoutcomes() == {"passed": 2, "failed": 1, "rerun": 4}
+    example_dir.runresult.stdout.fnmatch_lines(["flaky.ipynb[[]Cell1] RR.RRF.*"])
+    assert (example_dir.path / "executions.txt").read_text() == "01"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "failing": [
+                    record_execution.format(cell=0),
+                    add_ipytest_magic("def test_fails():\n    assert False"),
+                ],
+            },
+        ),
+    ],
+    indirect=True,
+)
+def test_no_reruns_by_default(example_dir: ExampleDir, monkeypatch: pytest.MonkeyPatch):
+    def no_snapshots(_namespace: dict) -> dict:
+        msg = "namespaces should only be copied for reruns"
+        raise AssertionError(msg)
+
+    monkeypatch.setattr("pytest_ipynb2.plugin.copy_namespace", no_snapshots)
+    example_dir.runresult.assert_outcomes(failed=1)
+    assert "rerun" not in example_dir.runresult.parseoutcomes()
+
+
+record_interactions = """
+class Interactions:
+    def pytest_exception_interact(self, node, call, report):
+        with open("interactions.txt", "a") as interactions:
+            interactions.write(call.when)
+
+def pytest_configure(config):
+    config.pluginmanager.register(Interactions())
+"""
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            conftest=record_interactions,
+            notebooks={"failing": [add_ipytest_magic("def test_fails():\n    assert False")]},
+            args=["--ipynb2-reruns=1"],
+        ),
+    ],
+    indirect=True,
+)
+def test_exception_interact(example_dir: ExampleDir):
+    assert example_dir.runresult.parseoutcomes() == {"failed": 1, "rerun": 1}
+    assert (example_dir.path / "interactions.txt").read_text() == "callcall"
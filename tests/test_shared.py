@@ -0,0 +1,212 @@
+import pytest
+
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic
+
+record_execution = "open('executions.txt', 'a').write('{cell}')\n"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "shared": [
+                    "import math\n" + record_execution.format(cell=0) + "data = [math.pi] * 3",
+                    add_ipytest_magic("def test_data():\n    assert data == [math.pi] * 3"),
+                    add_ipytest_magic("def test_data_again():\n    assert data[0] == math.pi"),
+                    record_execution.format(cell=3) + "extra = len(data)",
+                    add_ipytest_magic("def test_extra():\n    assert extra == 3"),
+                    add_ipytest_magic("def test_extra_again():\n    assert extra == 3"),
+                ],
+            },
+            args=["--ipynb2-share-setup"],
+        ),
+    ],
+    indirect=True,
+)
+def test_setup_executed_once(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=4)
+    assert (example_dir.path / "executions.txt").read_text() == "03"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "shared": [
+                    record_execution.format(cell=0) + "data = [1, 2]",
+                    add_ipytest_magic("def test_data():\n    assert data == [1, 2]"),
+                    add_ipytest_magic("def test_data_again():\n    assert data == [1, 2]"),
+                ],
+            },
+        ),
+    ],
+    indirect=True,
+)
+def test_not_shared_by_default(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=2)
+    assert (example_dir.path / "executions.txt").read_text() == "00"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "unpicklable": [
+                    record_execution.format(cell=0) + "x = 1\nf = lambda: x",
+                    add_ipytest_magic("def test_f():\n    assert f() == 1"),
+                    add_ipytest_magic("def test_x():\n    assert x == 1"),
+                ],
+            },
+            args=["--ipynb2-share-setup"],
+        ),
+    ],
+    indirect=True,
+)
+@pytest.mark.usefixtures("no_cloudpickle")
+def test_unpicklable(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=2, warnings=1)
+    example_dir.runresult.stdout.fnmatch_lines(
+        [
+            (
+                "*Cannot share all of the setup of unpicklable.ipynb[[]Cell1], unable to pickle: f."
+                " Executing Cell0 again after restoring the rest instead."
+            ),
+        ],
+    )
+    assert (example_dir.path / "executions.txt").read_text() == "00"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "partial": [
+                    record_execution.format(cell=0) + "data = [1, 2]",
+                    record_execution.format(cell=1)
+                    + "factor = 1\n\ndef scaled():\n    return [d * factor for d in data]",
+                    record_execution.format(cell=2) + "factor = 2",
+                    add_ipytest_magic("def test_scaled():\n    assert scaled() == [2, 4]"),
+                    add_ipytest_magic("def test_scaled_again():\n    assert (factor, scaled()) == (2, [2, 4])"),
+                ],
+            },
+            args=["--ipynb2-share-setup"],
+        ),
+    ],
+    indirect=True,
+)
+@pytest.mark.usefixtures("no_cloudpickle")
+def test_unpicklable_reexecuted(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=2, warnings=1)
+    example_dir.runresult.stdout.fnmatch_lines(
+        ["*Cannot share all of the setup of partial.ipynb[[]Cell3], unable to pickle: scaled. Executing Cell1 again*"],
+    )
+    assert (example_dir.path / "executions.txt").read_text() == "0121"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "indirect": [
+                    record_execution.format(cell=0) + "globals()['f'] = lambda: 1",
+                    add_ipytest_magic("def test_f():\n    assert f() == 1"),
+                    add_ipytest_magic("def test_f_again():\n    assert f() == 1"),
+                ],
+            },
+            args=["--ipynb2-share-setup"],
+        ),
+    ],
+    indirect=True,
+)
+@pytest.mark.usefixtures("no_cloudpickle")
+def test_unpicklable_unattributed(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=2, warnings=1)
+    example_dir.runresult.stdout.fnmatch_lines(
+        ["*Cannot share the setup of indirect.ipynb[[]Cell1], unable to pickle: f. Executing the setup cells on each*"],
+    )
+    assert (example_dir.path / "executions.txt").read_text() == "00"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "defined": [
+                    record_execution.format(cell=0) + "x = 1\n\ndef f():\n    return x",
+                    record_execution.format(cell=1) + "class C:\n    y = 2",
+                    add_ipytest_magic("def test_f():\n    assert f() == 1"),
+                    add_ipytest_magic("def test_c():\n    assert C.y == 2"),
+                ],
+            },
+            args=["--ipynb2-share-setup"],
+        ),
+    ],
+    indirect=True,
+)
+def test_notebook_functions_cloudpickled(example_dir: ExampleDir):
+    """Classes defined in the notebook are not pickled, only the cell which defines them is executed again."""
+    pytest.importorskip("cloudpickle")
+    example_dir.runresult.assert_outcomes(passed=2, warnings=1)
+    example_dir.runresult.stdout.fnmatch_lines(["*unable to pickle: C. Executing Cell1 again*"])
+    assert (example_dir.path / "executions.txt").read_text() == "011"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            conftest="\n".join(
+                [
+                    "from pathlib import Path",
+                    "",
+                    "from pytest_ipynb2.plugin import ipynb2_sharedsetup",
+                    "",
+                    "def pytest_unconfigure(config):",
+                    "    Path('shared.txt').write_text(str(config.stash[ipynb2_sharedsetup].directory))",
+                ],
+            ),
+            notebooks={
+                "shared": [
+                    "data = [1, 2]",
+                    add_ipytest_magic("def test_data():\n    assert data == [1, 2]"),
+                ],
+            },
+            args=["--ipynb2-share-setup"],
+        ),
+    ],
+    indirect=True,
+)
+def test_directory_removed(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=1)
+    shared = example_dir.path / "shared.txt"
+    assert shared.read_text()
+    assert not (example_dir.path / shared.read_text()).exists()
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "rebound": [
+                    "" + record_execution.format(cell=0) + "x = 1\n\ndef f():\n    return x",
+                    add_ipytest_magic("def test_before():\n    assert f() == 1"),
+                    "x = 2",
+                    add_ipytest_magic("def test_after():\n    assert f() == 2"),
+                ],
+            },
+            args=["--ipynb2-share-setup"],
+        ),
+    ],
+    indirect=True,
+)
+def test_shared_functions_see_later_cells(example_dir: ExampleDir):
+    pytest.importorskip("cloudpickle")
+    example_dir.runresult.assert_outcomes(passed=2)
+    assert (example_dir.path / "executions.txt").read_text() == "0"
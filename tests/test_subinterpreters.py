@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import queue
+import threading
+from pathlib import Path
+
+import pytest
+
+from pytest_ipynb2 import _subinterpreters
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic, add_tags
+
+
+class InProcessInterpreters:
+    """
+    Stands in for `concurrent.interpreters` to test running notebooks in a separate session on any python.
+
+    Sessions are run one at a time in this interpreter, so only the exchange of requests and reports is tested, not
+    the isolation.
+    """
+
+    lock = threading.Lock()
+
+    def __init__(self, error: Exception | None = None) -> None:
+        self.error = error
+
+    def create(self) -> InProcessInterpreters:
+        return self
+
+    @staticmethod
+    def create_queue() -> queue.Queue:
+        return queue.Queue()
+
+    def prepare_main(self, **namespace: object) -> None:
+        self.namespace = namespace
+
+    def exec(self, code: str) -> None:
+        if self.error is not None:
+            raise self.error
+        with self.lock:
+            exec(code, dict(self.namespace))  # noqa: S102
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def in_process_interpreters(monkeypatch: pytest.MonkeyPatch) -> InProcessInterpreters:
+    interpreters = InProcessInterpreters()
+    monkeypatch.setattr(_subinterpreters, "interpreters", interpreters)
+    return interpreters
+
+
+notebooks = {
+    "isolated": [
+        "import pytest\nx = 1",
+        add_ipytest_magic("def test_x():\n    assert x == 1"),
+        add_tags(
+            add_ipytest_magic(
+                "\n".join(
+                    [
+                        "@pytest.mark.parametrize('y', [1, 2])",
+                        "def test_y(y):",
+                        "    assert y == x",
+                    ],
+                ),
+            ),
+            "slow",
+        ),
+    ],
+}
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [ExampleDirSpec(notebooks=notebooks, args=["--ipynb2-backend=subinterpreter", "-v"])],
+    indirect=True,
+)
+def test_reports_replayed(example_dir: ExampleDir, in_process_interpreters: InProcessInterpreters):
+    results = example_dir.runresult
+    results.assert_outcomes(passed=2, failed=1, warnings=0)
+    assert "isolated.ipynb" in in_process_interpreters.namespace["request"]
+    results.stdout.fnmatch_lines(
+        [
+            "*isolated.ipynb[[]Cell1[]]::test_x PASSED*",
+            "*isolated.ipynb[[]Cell2[]]::test_y[[]1[]] PASSED*",
+            "*isolated.ipynb[[]Cell2[]]::test_y[[]2[]] FAILED*",
+            "*assert 2 == 1",
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [ExampleDirSpec(notebooks=notebooks, args=["--ipynb2-backend=subinterpreter", "-m", "not slow"])],
+    indirect=True,
+)
+def test_selection(example_dir: ExampleDir, in_process_interpreters: InProcessInterpreters):  # noqa: ARG001
+    example_dir.runresult.assert_outcomes(passed=1, warnings=0)
+
+
+record_markers = """
+from pathlib import Path
+
+def pytest_collection_modifyitems(items):
+    if type(items[0]).__name__ == "IsolatedItem":
+        markers = [f"{mark.name} {mark.args} {mark.kwargs}" for item in items for mark in item.iter_markers()]
+        Path("markers.txt").write_text("\\n".join(markers))
+"""
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            conftest=record_markers,
+            ini="markers =\n    positional\n    unrepresentable",
+            notebooks={
+                "marked": [
+                    "import pytest",
+                    add_ipytest_magic(
+                        "\n".join(
+                            [
+                                "@pytest.mark.positional('first', 2, key='value')",
+                                "@pytest.mark.unrepresentable(object())",
+                                "def test_marked(): pass",
+                            ],
+                        ),
+                    ),
+                ],
+            },
+            args=["--ipynb2-backend=subinterpreter"],
+        ),
+    ],
+    indirect=True,
+)
+def test_marker_arguments_replayed(example_dir: ExampleDir, in_process_interpreters: InProcessInterpreters):  # noqa: ARG001
+    example_dir.runresult.assert_outcomes(passed=1, warnings=0)
+    assert (example_dir.path / "markers.txt").read_text().splitlines() == [
+        "unrepresentable () {}",
+        "positional ('first', 2) {'key': 'value'}",
+    ]
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "setupfails": [
+                    "raise ValueError('expensive failure')",
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                ],
+            },
+            args=["--ipynb2-backend=subinterpreter"],
+        ),
+    ],
+    indirect=True,
+)
+def test_collection_error(example_dir: ExampleDir, in_process_interpreters: InProcessInterpreters):  # noqa: ARG001
+    results = example_dir.runresult
+    results.assert_outcomes(errors=1, warnings=0)
+    results.stdout.fnmatch_lines(["*ERROR collecting setupfails.ipynb[[]Cell1[]]*", "*ValueError: expensive failure"])
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [ExampleDirSpec(notebooks={"fallback": notebooks["isolated"]}, args=["--ipynb2-backend=subinterpreter"])],
+    indirect=True,
+)
+def test_fallback_if_subinterpreter_fails(example_dir: ExampleDir, monkeypatch: pytest.MonkeyPatch):
+    failing = InProcessInterpreters(error=ImportError("module does not support loading in subinterpreters"))
+    monkeypatch.setattr(_subinterpreters, "interpreters", failing)
+    results = example_dir.runresult
+    results.assert_outcomes(passed=2, failed=1, warnings=1)
+    results.stdout.fnmatch_lines(
+        [
+            "*Could not run fallback.ipynb in a subinterpreter, running it in-process instead.",
+            "*ImportError: module does not support loading in subinterpreters",
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [ExampleDirSpec(notebooks=notebooks, args=["--ipynb2-backend=subinterpreter", "--ipynb2-threads=2"])],
+    indirect=True,
+)
+def test_incompatible_options(example_dir: ExampleDir, in_process_interpreters: InProcessInterpreters):  # noqa: ARG001
+    results = example_dir.runresult
+    results.assert_outcomes(passed=2, failed=1, warnings=1)
+    results.stdout.fnmatch_lines(["*it cannot be combined with --ipynb2-threads: running notebooks in-process"])
+
+
+@pytest.mark.skipif(_subinterpreters.interpreters is not None, reason="concurrent.interpreters is available")
+@pytest.mark.parametrize(
+    "example_dir",
+    [ExampleDirSpec(notebooks={"unavailable": notebooks["isolated"]}, args=["--ipynb2-backend=subinterpreter"])],
+    indirect=True,
+)
+def test_unavailable(example_dir: ExampleDir):
+    results = example_dir.runresult
+    results.assert_outcomes(passed=2, failed=1, warnings=1)
+    results.stdout.fnmatch_lines(["*concurrent.interpreters is not available in python 3.*: running*"])
+
+
+@pytest.mark.skipif(_subinterpreters.interpreters is None, reason="concurrent.interpreters is not available")
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "first": ["import sys\nsys.ipynb2_global = 'first'", add_ipytest_magic("def test_first(): pass")],
+                "second": [
+                    "import sys",
+                    add_ipytest_magic("def test_isolated():\n    assert not hasattr(sys, 'ipynb2_global')"),
+                ],
+            },
+            args=["--ipynb2-backend=subinterpreter"],
+        ),
+    ],
+    indirect=True,
+)
+def test_isolated(example_dir: ExampleDir):
+    # In a subprocess: an inline run's copies of modules cannot be shared with subinterpreters
+    example_dir.pytester.runpytest_subprocess(*example_dir.args).assert_outcomes(passed=2)
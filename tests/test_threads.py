@@ -0,0 +1,202 @@
+import io
+import sys
+import threading
+import warnings
+from pathlib import Path
+
+import pytest
+
+from pytest_ipynb2._capture import capture
+from pytest_ipynb2._display import headless
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic, add_tags
+
+record_thread = "import threading\nbuilt_on = threading.current_thread().name"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "threaded": [
+                    record_thread,
+                    add_ipytest_magic("def test_first():\n    assert built_on.startswith('ipynb2')"),
+                    "x = 1",
+                    add_ipytest_magic("def test_second():\n    assert built_on.startswith('ipynb2')"),
+                    add_ipytest_magic("def test_third():\n    assert x == 1"),
+                ],
+                "serial": [
+                    add_tags(record_thread, "ipynb2-serial"),
+                    add_ipytest_magic("def test_main():\n    assert built_on == 'MainThread'"),
+                ],
+            },
+            args=["--ipynb2-threads=2", "-v"],
+        ),
+    ],
+    indirect=True,
+)
+def test_built_on_threads(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=4)
+    example_dir.runresult.stdout.fnmatch_lines(
+        [
+            "ipynb2: executing cells on 2 threads (*)",
+            "*serial.ipynb[[]Cell1[]]::test_main PASSED*",
+            "*threaded.ipynb[[]Cell1[]]::test_first PASSED*",
+            "*threaded.ipynb[[]Cell3[]]::test_second PASSED*",
+            "*threaded.ipynb[[]Cell4[]]::test_third PASSED*",
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "output": [
+                    "for line in range(100):\n    print(f'progress {line}')",
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                    "import sys\nprint('loading', file=sys.stderr)\nraise ValueError('failed')",
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                ],
+            },
+            args=["-s", "--ipynb2-threads=2"],
+        ),
+    ],
+    indirect=True,
+)
+def test_failures_and_output(example_dir: ExampleDir):
+    results = example_dir.runresult
+    results.assert_outcomes(errors=1)
+    results.stdout.no_fnmatch_line("progress *")
+    results.stdout.fnmatch_lines(["*ERROR collecting output.ipynb[[]Cell3[]]*", "*ValueError: failed", "loading"])
+    results.stdout.no_fnmatch_line("*concurrent/futures*")
+
+
+count_executions = "from pathlib import Path\nwith Path('executions.txt').open('a') as log:\n    log.write('x')"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "failing": [
+                    "import time\ntime.sleep(0.1)",
+                    f"{count_executions}\nraise ValueError('failed')",
+                    *[add_ipytest_magic(Path("tests/assets/test_passing.py").read_text())] * 4,
+                ],
+            },
+            args=["--ipynb2-threads=4"],
+        ),
+    ],
+    indirect=True,
+)
+def test_failing_setup_executed_once(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(errors=4)
+    example_dir.runresult.stdout.fnmatch_lines(["*Setup cell failing.ipynb[[]Cell1[]] failed while collecting*"])
+    assert (example_dir.path / "executions.txt").read_text() == "x"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={"memory": [add_ipytest_magic(Path("tests/assets/test_passing.py").read_text())]},
+            args=["--ipynb2-threads=2", "--ipynb2-memory"],
+        ),
+    ],
+    indirect=True,
+)
+def test_ignored_when_measuring(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=1, warnings=1)
+    example_dir.runresult.stdout.fnmatch_lines(["*--ipynb2-threads is ignored with --ipynb2-memory*"])
+
+
+print_and_fail = (
+    "import time\ntime.sleep(0.1)\nprint('building {0}')\n"
+    "def test_{0}():\n    time.sleep(0.1)\n    print('{0} output')\n    assert False"
+)
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={"printing": [add_ipytest_magic(print_and_fail.format(name)) for name in ("a", "b", "c", "d")]},
+            args=["--ipynb2-threads=1"],
+        ),
+    ],
+    indirect=True,
+)
+def test_pytest_captures_tests_while_building(example_dir: ExampleDir):
+    results = example_dir.runresult
+    results.assert_outcomes(failed=4)
+    for name in ("a", "b", "c", "d"):
+        results.stdout.fnmatch_lines([f"*_ Cell*::test_{name} _*", "*- Captured stdout call -*", f"{name} output"])
+    results.stdout.no_fnmatch_line("building *")
+    results.stdout.no_fnmatch_line("*output*printing.ipynb*")
+
+
+def test_capture_keeps_streams_replaced_meanwhile():
+    stdout = sys.stdout
+    started = threading.Event()
+    finish = threading.Event()
+
+    def execute() -> None:
+        with capture(limit=100):
+            started.set()
+            finish.wait()
+
+    thread = threading.Thread(target=execute)
+    thread.start()
+    started.wait()
+    replaced = io.StringIO()
+    sys.stdout = replaced
+    try:
+        finish.set()
+        thread.join()
+        assert sys.stdout is replaced
+    finally:
+        sys.stdout = stdout
+
+
+def test_capture_per_thread():
+    stdout = sys.stdout
+    barrier = threading.Barrier(2)
+    outputs = {}
+
+    def write(name: str) -> None:
+        with capture(limit=100) as output:
+            barrier.wait()
+            print(name)  # noqa: T201
+            barrier.wait()
+        outputs[name] = output.stdout.getvalue()
+
+    threads = [threading.Thread(target=write, args=(name,)) for name in ("first", "second")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert outputs == {"first": "first\n", "second": "second\n"}
+    assert sys.stdout is stdout
+
+
+def test_warning_filters_across_threads():
+    started = threading.Event()
+    finish = threading.Event()
+
+    def execute() -> None:
+        with headless({}):
+            started.set()
+            finish.wait()
+
+    thread = threading.Thread(target=execute)
+    thread.start()
+    started.wait()
+    with headless({}):
+        warnings.filterwarnings("error", "added while cells were executing")
+        finish.set()
+        thread.join()
+    assert warnings.filters[0][1].pattern == "added while cells were executing"
+    assert not any("non-interactive" in getattr(filter_[1], "pattern", "") for filter_ in warnings.filters)
@@ -0,0 +1,108 @@
+import re
+from pathlib import Path
+
+import pytest
+
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic
+
+LINESTART = "^"
+LINEEND = "$"
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "hangs": [
+                    "x = 1",
+                    "def spin():\n    while True:\n        pass\n\nspin()",
+                    add_ipytest_magic(Path("tests/assets/test_globals.py").read_text()),
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                ],
+                "passing": [add_ipytest_magic(Path("tests/assets/test_passing.py").read_text())],
+            },
+            ini="ipynb2_setup_timeout = 0.2",
+        ),
+    ],
+    indirect=True,
+)
+def test_setupcell_timeout(example_dir: ExampleDir):
+    results = example_dir.runresult
+    results.assert_outcomes(errors=2)
+    results.stdout.re_match_lines(
+        [
+            r"^collected 1 item / 2 errors$",
+            f"{LINESTART}[_]* ERROR collecting hangs.ipynb{re.escape('[Cell2]')} [_]*{LINEEND}",
+            re.escape(
+                "Setup cell hangs.ipynb[Cell1] timed out while collecting hangs.ipynb[Cell2]"
+                " (ipynb2_setup_timeout = 0.2s)",
+            ),
+            re.escape("Stack (most recent call last):"),
+            r'  File ".*hangs\.ipynb\[Cell1\]", line 5, in <module>',
+            r"    spin\(\)",
+            r'  File ".*hangs\.ipynb\[Cell1\]", line [23], in spin',
+            f"{LINESTART}[_]* ERROR collecting hangs.ipynb{re.escape('[Cell3]')} [_]*{LINEEND}",
+            re.escape("Setup cell hangs.ipynb[Cell1] failed while collecting hangs.ipynb[Cell2]"),
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "slow": [
+                    "import time\ntime.sleep(0.3)",
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                    "time.sleep(0.3)",
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                ],
+            },
+            ini="ipynb2_setup_timeout = 5\nipynb2_notebook_setup_timeout = 0.8",
+        ),
+    ],
+    indirect=True,
+)
+def test_notebook_timeout(example_dir: ExampleDir):
+    results = example_dir.runresult
+    results.assert_outcomes(errors=1)
+    results.stdout.re_match_lines(
+        [
+            f"{LINESTART}[_]* ERROR collecting slow.ipynb{re.escape('[Cell3]')} [_]*{LINEEND}",
+            re.escape(
+                "Setup cell slow.ipynb[Cell2] timed out while collecting slow.ipynb[Cell3]"
+                " (ipynb2_notebook_setup_timeout = 0.8s)",
+            ),
+            re.escape("Stack (most recent call last):"),
+            r'  File ".*slow\.ipynb\[Cell2\]", line 1, in <module>',
+            r"    time\.sleep\(0\.3\)",
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    ["example_dir", "message"],
+    [
+        pytest.param(
+            ExampleDirSpec(ini="ipynb2_setup_timeout = -1"),
+            "ipynb2_setup_timeout must be a non-negative number of seconds, not '-1'",
+            id="negative",
+        ),
+        pytest.param(
+            ExampleDirSpec(ini="ipynb2_notebook_setup_timeout = inf"),
+            "ipynb2_notebook_setup_timeout must be a non-negative number of seconds, not 'inf'",
+            id="infinite",
+        ),
+        pytest.param(
+            ExampleDirSpec(ini="ipynb2_setup_timeout = soon"),
+            "ipynb2_setup_timeout must be a non-negative number of seconds, not 'soon'",
+            id="not a number",
+        ),
+    ],
+    indirect=["example_dir"],
+)
+def test_invalid_timeout(example_dir: ExampleDir, message: str):
+    assert example_dir.runresult.ret == pytest.ExitCode.USAGE_ERROR
+    example_dir.runresult.stderr.fnmatch_lines([f"*{message}"])
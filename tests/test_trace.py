@@ -0,0 +1,42 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "traced": [
+                    "x = 1",
+                    add_ipytest_magic(Path("tests/assets/test_passing.py").read_text()),
+                ],
+            },
+            args=["--ipynb2-trace=trace.json"],
+        ),
+    ],
+    indirect=True,
+)
+def test_trace(example_dir: ExampleDir):
+    example_dir.runresult.assert_outcomes(passed=1)
+    example_dir.runresult.stdout.fnmatch_lines([f"ipynb2: trace written to {example_dir.path / 'trace.json'}"])
+    events = json.loads((example_dir.path / "trace.json").read_text())["traceEvents"]
+    assert events[0] == {"name": "process_name", "ph": "M", "pid": events[0]["pid"], "args": {"name": "pytest"}}
+    spans = [(event["name"], event["args"]) for event in events if event["ph"] == "X"]
+    assert spans == [
+        ("read", {"path": str(example_dir.path / "traced.ipynb")}),
+        ("validate", {"path": str(example_dir.path / "traced.ipynb")}),
+        ("muggle", {"path": str(example_dir.path / "traced.ipynb"), "cell": 0}),
+        ("muggle", {"path": str(example_dir.path / "traced.ipynb"), "cell": 1}),
+        ("rewrite", {"nodeid": "traced.ipynb[Cell1]"}),
+        ("setup exec", {"nodeid": "traced.ipynb[Cell0]"}),
+        ("test exec", {"nodeid": "traced.ipynb[Cell1]"}),
+        ("setup traced.ipynb[Cell1]::test_pass", {"nodeid": "traced.ipynb[Cell1]::test_pass"}),
+        ("call traced.ipynb[Cell1]::test_pass", {"nodeid": "traced.ipynb[Cell1]::test_pass"}),
+        ("teardown traced.ipynb[Cell1]::test_pass", {"nodeid": "traced.ipynb[Cell1]::test_pass"}),
+    ]
+    assert all(event["dur"] >= 0 for event in events if event["ph"] == "X")
@@ -0,0 +1,77 @@
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import nbformat
+import pytest
+
+from pytest_ipynb2._pytester_helpers import ExampleDir, ExampleDirSpec, add_ipytest_magic
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="uses SIGINT to stop watching")
+
+
+class Output:
+    """Collect the output of a subprocess in the background, to wait for specific lines."""
+
+    def __init__(self, process: subprocess.Popen) -> None:
+        self.lines: list[str] = []
+        self._queue: queue.Queue[str] = queue.Queue()
+        threading.Thread(target=self._read, args=(process,), daemon=True).start()
+
+    def _read(self, process: subprocess.Popen) -> None:
+        for line in process.stdout:
+            self._queue.put(line.decode())
+
+    def wait_for(self, text: str, count: int = 1, timeout: float = 30) -> None:
+        deadline = time.monotonic() + timeout
+        while sum(text in line for line in self.lines) < count:
+            try:
+                self.lines.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:  # noqa: PERF203 - only raised once, when giving up
+                pytest.fail(f"{text!r} not found {count} times in output:\n{''.join(self.lines)}")
+
+
+@pytest.mark.parametrize(
+    "example_dir",
+    [
+        ExampleDirSpec(
+            notebooks={
+                "watched": [
+                    "open('executions.txt', 'a').write('0')\nx = 1",
+                    add_ipytest_magic("def test_x():\n    assert x == 1"),
+                    "open('executions.txt', 'a').write('2')\ny = 2",
+                    add_ipytest_magic("def test_y():\n    assert y == 2"),
+                ],
+            },
+        ),
+    ],
+    indirect=True,
+)
+def test_watch(example_dir: ExampleDir):
+    process = example_dir.pytester.popen(
+        [sys.executable, "-m", "pytest", "--ipynb2-watch", "-p", "no:cacheprovider"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    output = Output(process)
+    executions = example_dir.path / "executions.txt"
+    try:
+        output.wait_for("2 passed")
+        output.wait_for("ipynb2: watching notebooks for changes: 1")
+        assert executions.read_text() == "02"
+
+        notebook = nbformat.read(example_dir.path / "watched.ipynb", as_version=4)
+        notebook.cells[2].source = "open('executions.txt', 'a').write('2')\ny = 3"
+        nbformat.write(notebook, example_dir.path / "watched.ipynb")
+        output.wait_for("ipynb2: re-running 1 affected test cells")
+        output.wait_for("1 failed")
+        output.wait_for("ipynb2: watching notebooks for changes: 1", count=2)
+        assert executions.read_text() == "022", "only the changed cell should be executed again"
+        assert any("FAILED watched.ipynb[Cell3]::test_y" in line for line in output.lines)
+    finally:
+        process.send_signal(signal.SIGINT)
+        process.wait(timeout=30)
+    assert process.returncode == pytest.ExitCode.TESTS_FAILED